@@ -2,18 +2,42 @@
 
 from flask import Flask, jsonify
 from config import Config
-from models import db, User # 確保 User 模型有 set_password 和 check_password 方法
-from utils.email_service import mail
+from models import db
+from utils.email_service import init_email
+from utils.auth_decorators import init_role_cache
+from utils.password_hashing import password_hasher
+from utils.hash_executor import hash_executor, HashingOverloadedError
+from utils.pool_metrics import init_pool_metrics
+from utils.db_routing import replica_router
+from utils.table_versions import init_table_versions
+from utils.reset_tokens import reset_token_sweeper
+from utils.rate_limiter import rate_limiter
+from utils.token_revocation import token_revocation
+from utils.user_search import user_search_index
+from utils.audit_log import audit_log
+from utils.logging_config import configure_logging
+from utils.json_provider import init_json_provider
+from utils.instrumentation import request_instrumentation
+from utils.compression import response_compression
+from utils.boot_profile import BootTimer
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS # 導入 CORS
 from routes.auth import auth_bp
 from routes.users import users_bp
+from routes.audit import audit_bp
+from routes.metrics import metrics_bp
+from routes.health import health_bp
+from commands import register_commands, init_database
 import os
-import time
 
 def create_app():
+    # 各階段耗時記錄在 app.extensions['boot_timer']，以 flask boot-profile 檢視
+    boot_timer = BootTimer()
     app = Flask(__name__)
     app.config.from_object(Config)
+    configure_logging(app)
+    init_json_provider(app)
+    boot_timer.mark('config')
 
     # 初始化 CORS - 這是關鍵的添加/修改位置
     # 允許來自 'http://172.20.50.102:8000' (您的 Flutter Web 前端源) 的所有 /api/* 路徑請求
@@ -21,11 +45,34 @@ def create_app():
     CORS(app, resources={r"/api/*": {"origins": "http://172.20.50.102:8000"}})
     # 或者，如果您想先用最簡單的方式測試 (允許所有來源):
     # CORS(app)
+    boot_timer.mark('cors')
 
+    # 最先註冊 before_request，計時涵蓋其他 hook
+    request_instrumentation.init_app(app)
+    init_pool_metrics(app, db)
     db.init_app(app)
-    mail.init_app(app)
+    replica_router.init_app(app, db)
+    init_table_versions()
+    boot_timer.mark('database')
+    init_email(app)
+    init_role_cache(app)
+    password_hasher.init_app(app)
+    hash_executor.init_app(app)
+    reset_token_sweeper.init_app(app)
+    rate_limiter.init_app(app)
+    token_revocation.init_app(app)
+    user_search_index.init_app(app)
+    audit_log.init_app(app)
+    # after_request 依註冊的相反順序執行：壓縮在請求計時結束前完成，CPU 時間計入請求時間
+    response_compression.init_app(app)
+    boot_timer.mark('extensions')
     jwt = JWTManager(app)
 
+    # 只查行程內的撤銷清單 (O(1))，不查資料庫
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return token_revocation.is_revoked(jwt_payload)
+
     @jwt.unauthorized_loader
     def unauthorized_response(callback):
         return jsonify({"message": "缺少身份驗證令牌"}), 401
@@ -42,59 +89,33 @@ def create_app():
     def revoked_token_response(jwt_header, jwt_payload): # 修改了參數
         return jsonify({"message": "身份驗證令牌已被撤銷"}), 401
 
+    @app.errorhandler(HashingOverloadedError)
+    def hashing_overloaded_response(e):
+        response = jsonify({"message": "系統忙碌中，請稍後再試"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
+    boot_timer.mark('jwt')
+
     # 註冊藍圖 (Blueprint)
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(audit_bp, url_prefix='/api/audit')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    app.register_blueprint(health_bp)
+    register_commands(app)
     
     @app.route('/')
     def index():
         return jsonify({"message": "NAPP System Backend API is running!"}), 200
+    boot_timer.mark('routes')
 
-    with app.app_context():
-        max_retries = 30
-        retry_delay = 5
-        for i in range(max_retries):
-            try:
-                print(f"嘗試連接資料庫並創建資料表 (第 {i+1}/{max_retries} 次)...")
-                db.create_all()
-                print("資料庫連線成功並已創建所有資料表！")
-                break
-            except Exception as e:
-                print(f"資料庫連線失敗: {e}")
-                if i < max_retries - 1:
-                    print(f"等待 {retry_delay} 秒後重試...")
-                    time.sleep(retry_delay)
-                else:
-                    print("達到最大重試次數，無法連接資料庫。")
-                    # 在生產環境中，這裡可能需要更健壯的錯誤處理或退出機制
-                    # raise # 重新拋出異常可能會導致應用啟動失敗
-
-        admin_username = app.config.get('ADMIN_USERNAME', 'admin') # 從環境變數或配置獲取
-        admin_password = app.config.get('ADMIN_PASSWORD', 'admin123') # 從環境變數或配置獲取
-        admin_email = app.config.get('ADMIN_EMAIL', 'admin@example.com') # 從環境變數或配置獲取
-
-        if admin_username and admin_password and admin_email:
-            admin_user = User.query.filter_by(username=admin_username).first()
-            if not admin_user:
-                try:
-                    new_admin = User(name='Default Admin', username=admin_username, email=admin_email, role='admin')
-                    # 重要：密碼需要被雜湊儲存
-                    # 假設 User 模型中有一個 set_password 方法來處理雜湊
-                    new_admin.set_password(admin_password) # 例如： self.password_hash = generate_password_hash(password)
-                    db.session.add(new_admin)
-                    db.session.commit()
-                    print(f"已創建預設管理員帳號: {admin_username}")
-                except Exception as e:
-                    print(f"創建預設管理員時發生錯誤: {e}")
-                    db.session.rollback() # 出錯時回滾
-            else:
-                print(f"預設管理員帳號 {admin_username} 已存在。")
-        else:
-            print("警告: 預設管理員帳號的環境變數未完全設定，將不會自動創建。")
-
+    app.extensions['boot_timer'] = boot_timer
     return app
 
 if __name__ == '__main__':
     app = create_app()
+    # 開發模式直接啟動時順便初始化資料庫；正式環境請在部署時執行 flask init-db
+    init_database(app)
     port = int(os.environ.get('FLASK_RUN_PORT', 5000))
     app.run(host='0.0.0.0', port=port) # 不需要重複呼叫 create_app()
\ No newline at end of file
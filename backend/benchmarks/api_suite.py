@@ -0,0 +1,391 @@
+# backend/benchmarks/api_suite.py
+#
+# 認證與使用者管理 API 的基準測試套件。
+# 預設在本行程內以暫存的 SQLite 資料庫啟動後端 (Werkzeug 多執行緒伺服器)，
+# 預先建立 N 個使用者，再以指定的並行數依序測試各情境，輸出延遲百分位數、每秒請求數，
+# 以及每個請求執行的 SQL 次數 (取自回應的 Server-Timing 標頭)，結果可存成 JSON 供 compare.py 比較。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/api_suite.py --users 2000 -c 8 -d 10 --output results/before.json
+#   python benchmarks/api_suite.py --scenarios login,list,get -c 16 -d 20
+#   python benchmarks/api_suite.py --env PASSWORD_HASH_METHOD=pbkdf2 --env PASSWORD_PBKDF2_ITERATIONS=100000
+#   python benchmarks/api_suite.py --database-url mysql+pymysql://root:pw@127.0.0.1:3306/napp_bench
+#   python benchmarks/compare.py results/before.json results/after.json
+
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import open_connection, summarize
+
+SCENARIOS = ('login', 'list', 'get', 'create', 'update', 'change_password', 'delete')
+SEED_PASSWORD = 'bench-password-1'
+ALT_PASSWORD = 'bench-password-2'
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench-admin-password'
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+def parse_server_timing(header):
+    """從 Server-Timing 標頭取出 (資料庫毫秒數, SQL 次數)；沒有標頭時回傳 (None, None)。"""
+    match = _SERVER_TIMING_DB.search(header or '')
+    if not match:
+        return None, None
+    queries = int(match.group(2)) if match.group(2) is not None else None
+    return float(match.group(1)), queries
+
+
+class Scenario:
+    """
+    一個測試情境：next_request(worker, iteration) 回傳 (method, path, body dict)，
+    回傳 None 表示該 worker 已無請求可送 (例如可刪除的使用者已用完)。
+    """
+
+    name = None
+
+    def __init__(self, context):
+        self.context = context
+
+    def headers(self, worker):
+        return {'Authorization': f"Bearer {self.context['admin_token']}"}
+
+    def next_request(self, worker, iteration):
+        raise NotImplementedError
+
+    def on_response(self, worker, status, payload):
+        pass
+
+
+class LoginScenario(Scenario):
+    name = 'login'
+
+    def headers(self, worker):
+        return {}
+
+    def __init__(self, context):
+        super().__init__(context)
+        # 最後 concurrency 個使用者保留給 change_password 情境，其密碼可能已被修改
+        self.pool = context['seeded'][:-context['concurrency']] or context['seeded']
+
+    def next_request(self, worker, iteration):
+        username = self.pool[(worker * 7919 + iteration) % len(self.pool)][1]
+        return 'POST', '/api/auth/login', {'username': username, 'password': SEED_PASSWORD}
+
+
+class ListScenario(Scenario):
+    name = 'list'
+
+    def next_request(self, worker, iteration):
+        return 'GET', f"/api/users/?limit={self.context['page_size']}", None
+
+
+class GetScenario(Scenario):
+    name = 'get'
+
+    def next_request(self, worker, iteration):
+        user_id = random.choice(self.context['seeded'])[0]
+        return 'GET', f'/api/users/{user_id}', None
+
+
+class CreateScenario(Scenario):
+    name = 'create'
+
+    def next_request(self, worker, iteration):
+        username = f"bench_{self.context['run_id']}_{worker}_{iteration}"
+        return 'POST', '/api/users/', {
+            'name': username, 'username': username, 'email': f'{username}@bench.invalid',
+            'password': SEED_PASSWORD, 'role': 'user',
+        }
+
+    def on_response(self, worker, status, payload):
+        if status == 201 and payload:
+            with self.context['lock']:
+                self.context['created'].append(payload['user']['id'])
+
+
+class UpdateScenario(Scenario):
+    name = 'update'
+
+    def next_request(self, worker, iteration):
+        user_id = random.choice(self.context['seeded'])[0]
+        return 'PUT', f'/api/users/{user_id}', {'name': f'Bench User {worker}-{iteration}'}
+
+
+class ChangePasswordScenario(Scenario):
+    """每個 worker 以各自的使用者登入，在兩組密碼之間來回修改。"""
+
+    name = 'change_password'
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.tokens = {}
+
+    def headers(self, worker):
+        return {'Authorization': f"Bearer {self.tokens[worker]}"}
+
+    def prepare(self, base_url, concurrency):
+        for worker in range(concurrency):
+            username = self.context['seeded'][-(worker + 1)][1]
+            self.tokens[worker] = fetch_token(base_url, username, SEED_PASSWORD)
+
+    def next_request(self, worker, iteration):
+        old, new = (SEED_PASSWORD, ALT_PASSWORD) if iteration % 2 == 0 else (ALT_PASSWORD, SEED_PASSWORD)
+        return 'PUT', '/api/users/change-password', {'oldPassword': old, 'newPassword': new}
+
+
+class DeleteScenario(Scenario):
+    """刪除 create 情境建立的使用者，用完即停止。"""
+
+    name = 'delete'
+
+    def next_request(self, worker, iteration):
+        with self.context['lock']:
+            if not self.context['created']:
+                return None
+            user_id = self.context['created'].pop()
+        return 'DELETE', f'/api/users/{user_id}', None
+
+
+SCENARIO_CLASSES = {cls.name: cls for cls in (
+    LoginScenario, ListScenario, GetScenario, CreateScenario, UpdateScenario, ChangePasswordScenario, DeleteScenario,
+)}
+
+
+def fetch_token(base_url, username, password):
+    parsed = urllib.parse.urlparse(base_url)
+    connection = open_connection(parsed, 30)
+    connection.request('POST', '/api/auth/login', body=json.dumps({'username': username, 'password': password}),
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b'{}')
+    connection.close()
+    if response.status != 200:
+        raise SystemExit(f"{username} 登入失敗 ({response.status}): {payload}")
+    return payload['token']
+
+
+def run_scenario(base_url, scenario, concurrency, duration, timeout=30):
+    """以 concurrency 個執行緒在 duration 秒內執行情境，回傳含 SQL 統計的報告。"""
+    parsed = urllib.parse.urlparse(base_url)
+    latencies = []
+    statuses = []
+    db_times = []
+    query_counts = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        local = ([], [], [], [])
+        connection = open_connection(parsed, timeout)
+        headers = {'Content-Type': 'application/json', **scenario.headers(index)}
+        for iteration in itertools.count():
+            if time.perf_counter() >= deadline:
+                break
+            request = scenario.next_request(index, iteration)
+            if request is None:
+                break
+            method, path, body = request
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = connection.getresponse()
+                raw = response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                local[1].append('error')
+                local[0].append(time.perf_counter() - started)
+                connection.close()
+                connection = open_connection(parsed, timeout)
+                continue
+            local[0].append(time.perf_counter() - started)
+            local[1].append(status)
+            db_ms, queries = parse_server_timing(response.getheader('Server-Timing'))
+            if db_ms is not None:
+                local[2].append(db_ms)
+            if queries is not None:
+                local[3].append(queries)
+            try:
+                payload = json.loads(raw) if raw else None
+            except ValueError:
+                payload = None
+            scenario.on_response(index, status, payload)
+        connection.close()
+        with lock:
+            latencies.extend(local[0])
+            statuses.extend(local[1])
+            db_times.extend(local[2])
+            query_counts.extend(local[3])
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = summarize(latencies, statuses, time.perf_counter() - started)
+    report['db_ms_avg'] = round(sum(db_times) / len(db_times), 3) if db_times else None
+    report['queries_per_request'] = round(sum(query_counts) / len(query_counts), 2) if query_counts else None
+    report['queries_max'] = max(query_counts) if query_counts else None
+    failures = sum(1 for status in statuses if status == 'error' or status >= 400)
+    report['error_rate'] = round(failures / len(statuses), 4) if statuses else 0.0
+    return report
+
+
+def boot_local_app(database_url, users, env_overrides):
+    """
+    在本行程內啟動後端並建立測試資料，回傳 (base_url, server, seeded)。
+    seeded 為 [(id, username)]。所有環境變數必須在匯入 config 之前設定。
+    """
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'False') # login 情境會以同一 IP 大量登入
+    os.environ.setdefault('EMAIL_BACKEND', 'console')
+    os.environ.setdefault('RESET_TOKEN_SWEEPER_ENABLED', 'False')
+    os.environ['ADMIN_USERNAME'] = ADMIN_USERNAME
+    os.environ['ADMIN_PASSWORD'] = ADMIN_PASSWORD
+    os.environ['ADMIN_EMAIL'] = f'{ADMIN_USERNAME}@bench.invalid'
+    os.environ.update(env_overrides)
+
+    import logging
+    from werkzeug.serving import make_server
+    from app import create_app
+    from commands import init_database
+    from models import db, User
+    from utils.hash_executor import hash_executor
+
+    app = create_app()
+    # ConsoleBackend 的郵件紀錄與 Werkzeug 的存取紀錄每個請求都會輸出一行，測試時不需要
+    logging.getLogger('utils.email_service').setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if not init_database(app):
+        raise SystemExit("資料庫初始化失敗")
+
+    with app.app_context():
+        existing = db.session.execute(
+            db.select(db.func.count()).select_from(User).where(User.username.like('seed\\_%', escape='\\'))
+        ).scalar_one()
+        if existing < users:
+            # 所有種子使用者共用同一個密碼雜湊，避免建立資料時花上數分鐘計算雜湊
+            password_hash = hash_executor.hash(SEED_PASSWORD)
+            rows = [
+                {'name': f'Seed User {i}', 'username': f'seed_{i:07d}', 'email': f'seed_{i:07d}@bench.invalid',
+                 'role': 'user', 'password_hash': password_hash}
+                for i in range(existing, users)
+            ]
+            for start in range(0, len(rows), 1000):
+                db.session.execute(db.insert(User), rows[start:start + 1000])
+            db.session.commit()
+        seeded = db.session.execute(
+            db.select(User.id, User.username).where(User.username.like('seed\\_%', escape='\\')).order_by(User.id)
+        ).all()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server, [tuple(row) for row in seeded]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NAPP 認證與使用者管理 API 基準測試套件')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"逗號分隔，可用：{', '.join(SCENARIOS)}")
+    parser.add_argument('--users', type=int, default=1000, help='預先建立的使用者數')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='每個情境的測試秒數')
+    parser.add_argument('--page-size', type=int, default=50, help='list 情境的 limit 參數')
+    parser.add_argument('--database-url', default=None,
+                        help='預設為暫存的 SQLite 檔案；也可指定用完即丟的 MySQL 容器')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='啟動後端前設定的環境變數 (可重複)，例如 PASSWORD_HASH_METHOD=pbkdf2')
+    parser.add_argument('--output', default=None, help='將結果存成 JSON 檔')
+    parser.add_argument('--seed', type=int, default=1, help='隨機數種子，讓每次選取的使用者順序一致')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIO_CLASSES]
+    if unknown:
+        parser.error(f"未知的情境：{', '.join(unknown)}")
+    env_overrides = dict(item.split('=', 1) for item in args.env)
+    random.seed(args.seed)
+
+    temp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        temp_dir = tempfile.mkdtemp(prefix='napp-bench-')
+        database_url = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+
+    seed_started = time.perf_counter()
+    base_url, server, seeded = boot_local_app(database_url, args.users, env_overrides)
+    print(f"已建立 {len(seeded)} 個使用者 ({time.perf_counter() - seed_started:.1f} 秒)，伺服器：{base_url}", file=sys.stderr)
+
+    context = {
+        'admin_token': fetch_token(base_url, ADMIN_USERNAME, ADMIN_PASSWORD),
+        'seeded': seeded,
+        'created': [],
+        'lock': threading.Lock(),
+        'page_size': args.page_size,
+        'concurrency': args.concurrency,
+        'run_id': datetime.datetime.now().strftime('%H%M%S'),
+    }
+
+    results = {}
+    try:
+        for name in names:
+            scenario = SCENARIO_CLASSES[name](context)
+            if hasattr(scenario, 'prepare'):
+                scenario.prepare(base_url, args.concurrency)
+            report = run_scenario(base_url, scenario, args.concurrency, args.duration)
+            results[name] = report
+            print(f"{name:16s} {report['requests_per_sec']:>9} req/s  p50={report['p50_ms']}ms "
+                  f"p95={report['p95_ms']}ms p99={report['p99_ms']}ms  "
+                  f"sql/req={report['queries_per_request']}  status={report['status_codes']}", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    output = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'database': urllib.parse.urlparse(database_url).scheme,
+            'users': len(seeded),
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'env': env_overrides,
+        },
+        'scenarios': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
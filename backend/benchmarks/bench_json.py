@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_json.py
+#
+# 使用者列表序列化路徑的微基準測試，比較：
+#   orm+to_dict     ：查詢 ORM 物件 → User.to_dict() → 標準函式庫 JSON (原本的做法)
+#   rows+stdlib     ：只查需要的欄位 → RowSerializer → 標準函式庫 JSON
+#   rows+orjson     ：只查需要的欄位 → RowSerializer → orjson (需要安裝 orjson)
+# 分別量測「查詢 + 序列化」(SQLite 暫存資料庫) 與「只序列化」(資料已在記憶體中) 的時間。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/bench_json.py
+#   python benchmarks/bench_json.py --rows 1000,10000,100000 --repeat 5 --json
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best_of(fn, repeat):
+    """執行 repeat 次，回傳最短的秒數 (排除 GC 與其他干擾)。"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用者列表 JSON 序列化基準測試')
+    parser.add_argument('--rows', default='1000,10000,100000', help='逗號分隔的資料筆數')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.rows.split(',') if n]
+
+    temp_dir = tempfile.mkdtemp(prefix='napp-bench-json-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['JSON_PROVIDER'] = 'stdlib'
+
+    from flask import Flask
+    from app import create_app
+    from models import db, User
+    from utils.json_provider import StdlibJSONProvider, OrjsonJSONProvider, orjson
+    from utils.row_serializer import user_row_serializer
+
+    app = create_app()
+    providers = {'stdlib': StdlibJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonJSONProvider(app)
+    else:
+        print("未安裝 orjson，略過 rows+orjson", file=sys.stderr)
+
+    results = []
+    with app.app_context():
+        db.create_all(bind_key=None)
+        created = 0
+        now = datetime.datetime.now()
+        for size in sizes:
+            if created < size:
+                db.session.execute(db.insert(User), [
+                    {'name': f'User {i}', 'username': f'user_{i:07d}', 'email': f'user_{i:07d}@bench.invalid',
+                     'role': 'user', 'password_hash': 'x' * 100, 'created_at': now, 'updated_at': now}
+                    for i in range(created, size)
+                ])
+                db.session.commit()
+                created = size
+
+            orm_query = db.select(User).order_by(User.id).limit(size)
+            row_query = db.select(*user_row_serializer.select_columns).order_by(User.id).limit(size)
+
+            def orm_path():
+                users = db.session.scalars(orm_query).all()
+                body = providers['stdlib'].dumps({'users': [u.to_dict() for u in users]})
+                db.session.expunge_all()
+                return body
+
+            def rows_path(provider):
+                def run():
+                    rows = db.session.execute(row_query).all()
+                    return providers[provider].dumps({'users': user_row_serializer.serialize(rows)})
+                return run
+
+            users = db.session.scalars(orm_query).all()
+            rows = db.session.execute(row_query).all()
+            # 確認兩種做法輸出的內容相同
+            assert json.loads(providers['stdlib'].dumps({'users': [u.to_dict() for u in users]})) == \
+                json.loads(providers['stdlib'].dumps({'users': user_row_serializer.serialize(rows)}))
+
+            cases = {
+                'orm+to_dict': (orm_path, lambda: providers['stdlib'].dumps({'users': [u.to_dict() for u in users]})),
+                'rows+stdlib': (rows_path('stdlib'),
+                                lambda: providers['stdlib'].dumps({'users': user_row_serializer.serialize(rows)})),
+            }
+            if 'orjson' in providers:
+                cases['rows+orjson'] = (rows_path('orjson'),
+                                        lambda: providers['orjson'].dumps({'users': user_row_serializer.serialize(rows)}))
+
+            for name, (query_and_serialize, serialize_only) in cases.items():
+                results.append({
+                    'rows': size,
+                    'path': name,
+                    'query_and_serialize_ms': round(best_of(query_and_serialize, args.repeat) * 1000, 2),
+                    'serialize_only_ms': round(best_of(serialize_only, args.repeat) * 1000, 2),
+                })
+            db.session.expunge_all()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'rows':>8}  {'path':14s} {'query+serialize':>16s} {'serialize only':>15s}")
+    for r in results:
+        print(f"{r['rows']:>8}  {r['path']:14s} {r['query_and_serialize_ms']:>13.2f} ms {r['serialize_only_ms']:>12.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
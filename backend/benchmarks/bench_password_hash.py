@@ -0,0 +1,84 @@
+# backend/benchmarks/bench_password_hash.py
+#
+# 密碼雜湊成本參數的微基準測試：對每組設定量測單核心每秒可完成的雜湊次數，
+# 用來對照 /api/auth/login 的延遲目標選擇 Config 中的 PASSWORD_* 參數。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/bench_password_hash.py
+#   python benchmarks/bench_password_hash.py --pbkdf2 260000,600000 --scrypt 16384:8:1,32768:8:1 --argon2 2:19456:1
+#   python benchmarks/bench_password_hash.py --min-time 3 --json
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.password_hashing import PasswordHasher
+
+DEFAULT_PBKDF2 = '100000,260000,600000'
+DEFAULT_SCRYPT = '16384:8:1,32768:8:1,65536:8:1'
+
+
+def build_settings(args):
+    settings = []
+    for iterations in filter(None, args.pbkdf2.split(',')):
+        settings.append((f'pbkdf2 iterations={iterations}',
+                         PasswordHasher(method='pbkdf2', pbkdf2_iterations=int(iterations))))
+    for spec in filter(None, args.scrypt.split(',')):
+        n, r, p = (int(x) for x in spec.split(':'))
+        settings.append((f'scrypt N={n} r={r} p={p}',
+                         PasswordHasher(method='scrypt', scrypt_n=n, scrypt_r=r, scrypt_p=p)))
+    for spec in filter(None, args.argon2.split(',')):
+        t, m, p = (int(x) for x in spec.split(':'))
+        try:
+            hasher = PasswordHasher(method='argon2', argon2_time_cost=t, argon2_memory_cost=m, argon2_parallelism=p)
+        except RuntimeError as e:
+            print(f"略過 argon2 t={t} m={m} p={p}: {e}", file=sys.stderr)
+            continue
+        settings.append((f'argon2id t={t} m={m}KiB p={p}', hasher))
+    return settings
+
+
+def measure(hasher, min_time, password='correct horse battery staple'):
+    """重複雜湊直到累積至少 min_time 秒，回傳 (次數, 總秒數)。"""
+    hasher.hash(password) # 暖身
+    count = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or count < 3:
+        hasher.hash(password)
+        count += 1
+        elapsed = time.perf_counter() - started
+    return count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測各種密碼雜湊設定的每秒雜湊次數')
+    parser.add_argument('--pbkdf2', default=DEFAULT_PBKDF2, help='逗號分隔的 pbkdf2 迭代次數')
+    parser.add_argument('--scrypt', default=DEFAULT_SCRYPT, help='逗號分隔的 N:r:p')
+    parser.add_argument('--argon2', default='', help='逗號分隔的 time_cost:memory_cost_kib:parallelism')
+    parser.add_argument('--min-time', type=float, default=1.0, help='每組設定至少量測的秒數')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+
+    results = []
+    for label, hasher in build_settings(args):
+        count, elapsed = measure(hasher, args.min_time)
+        results.append({
+            'setting': label,
+            'hashes': count,
+            'hashes_per_sec': round(count / elapsed, 2),
+            'ms_per_hash': round(elapsed / count * 1000, 2),
+        })
+        if not args.json:
+            print(f"{label:<36} {count / elapsed:>10.2f} hashes/sec {elapsed / count * 1000:>10.2f} ms/hash")
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_search.py
+#
+# 使用者搜尋索引 (utils/user_search.py) 的微基準測試：以隨機產生的中文姓名 / 英文帳號建立索引，
+# 量測建立時間、記憶體用量，以及不同查詢 (單一中文字、姓名、帳號前綴、Email 網域、不存在的字串) 的延遲。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/bench_search.py
+#   python benchmarks/bench_search.py --users 100000 --repeat 200 --limit 10 --json
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SURNAMES = '陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周'
+GIVEN = '家怡志明建宏俊傑淑芬美玲雅婷冠宇承翰柏翰宗翰佳穎詩涵欣怡'
+QUERIES = ['王', '美玲', '陳家', 'user_00012', 'wang', 'example.org', 'zzzz']
+
+
+def fake_users(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        name = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN) for _ in range(rng.choice((1, 2))))
+        username = f'user_{i:07d}' if i % 10 else f'wang_{i:07d}'
+        yield i, name, username, f'{username}@{rng.choice(("example.com", "example.org", "mail.test"))}'
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用者搜尋索引基準測試')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+
+    from utils.user_search import UserSearchIndex
+
+    def build():
+        index = UserSearchIndex()
+        for user in fake_users(args.users):
+            index.upsert(*user)
+        index._ready = True
+        return index
+
+    started = time.perf_counter()
+    index = build()
+    build_ms = (time.perf_counter() - started) * 1000
+    # 另外建立一次量測記憶體 (tracemalloc 會拖慢建立速度)
+    del index
+    tracemalloc.start()
+    index = build()
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+
+    results = []
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            found = index.search(query, args.limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results.append({
+            'query': query, 'hits': len(found),
+            'p50_ms': round(percentile(timings, 50), 3), 'p99_ms': round(percentile(timings, 99), 3),
+        })
+
+    # 修改一筆資料後的第一次搜尋需要重新串接該段
+    timings = []
+    for i in range(args.repeat):
+        index.upsert(i + 1, '測試修改', f'edited_{i}', f'edited_{i}@example.com')
+        started = time.perf_counter()
+        index.search('測試修改', args.limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    results.append({'query': '(修改後) 測試修改', 'hits': args.limit,
+                    'p50_ms': round(percentile(timings, 50), 3), 'p99_ms': round(percentile(timings, 99), 3)})
+
+    if args.json:
+        print(json.dumps({'users': args.users, 'build_ms': round(build_ms, 1), 'memory_mb': round(memory_mb, 1),
+                          'results': results}, ensure_ascii=False, indent=2))
+        return
+    print(f"users={args.users}  build={build_ms:.0f} ms  memory={memory_mb:.1f} MB  limit={args.limit}")
+    for r in results:
+        print(f"  {r['query']:16s} hits={r['hits']:>3d}  p50={r['p50_ms']:.3f} ms  p99={r['p99_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
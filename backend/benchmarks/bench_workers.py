@@ -0,0 +1,166 @@
+# backend/benchmarks/bench_workers.py
+#
+# 比較 gunicorn 的 gthread worker (同步 WSGI，並行數 = 執行緒數) 與 gevent worker (協程)
+# 在以等待資料庫為主的端點上能同時處理多少請求。每種 worker 各啟動一個只有 1 個 worker 行程的 gunicorn，
+# 再以 load_test.run_load 在不同的並行數下壓測。
+#
+# 本機沒有 MySQL 時使用 SQLite，並以 --sql-latency-ms 模擬每個 SQL 的網路往返：
+# 在 before_cursor_execute 中 time.sleep()，gevent 下會與等待 MySQL socket 一樣讓出給其他請求。
+# 連到真正的 MySQL 時請加上 --sql-latency-ms 0。
+#
+# 用法 (於 backend/ 目錄執行，需安裝 gevent)：
+#   python benchmarks/bench_workers.py
+#   python benchmarks/bench_workers.py --concurrency 50,200,500 --sql-latency-ms 20 -d 10
+#   python benchmarks/bench_workers.py --database-url mysql+pymysql://... --sql-latency-ms 0 --pool-size 50
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench-admin-password'
+
+
+def latency_app():
+    """
+    gunicorn 載入的 app factory (benchmarks.bench_workers:latency_app())。
+    BENCH_SQL_LATENCY_MS 大於 0 時，每個 SQL 執行前先等待該毫秒數，模擬資料庫的網路往返。
+    """
+    import logging
+    from sqlalchemy import event
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    latency = float(os.environ.get('BENCH_SQL_LATENCY_MS', 0)) / 1000
+    if latency > 0:
+        with app.app_context():
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def _simulate_round_trip(*args):
+                time.sleep(latency) # gevent monkey patch 後為協作式等待
+    return app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, deadline=30):
+    started = time.monotonic()
+    while time.monotonic() - started < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/healthz')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"gunicorn 未在 {deadline} 秒內就緒 (port {port})")
+
+
+def start_gunicorn(worker_class, env, threads):
+    port = free_port()
+    env = dict(env)
+    env.update({
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': '1',
+        'GUNICORN_THREADS': str(threads),
+        'GUNICORN_PRELOAD': 'False',
+        'GUNICORN_MAX_REQUESTS': '0',
+        'GUNICORN_TIMEOUT': '120',
+        'GUNICORN_LOGLEVEL': 'warning',
+        'GUNICORN_PIDFILE': os.path.join(tempfile.gettempdir(), f'napp-bench-{worker_class}.pid'),
+    })
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.bench_workers:latency_app()'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        wait_until_ready(port)
+    except BaseException:
+        process.terminate()
+        raise
+    return process, f'http://127.0.0.1:{port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gthread 與 gevent worker 的並行能力比較')
+    parser.add_argument('--worker-classes', default='gthread,gevent')
+    parser.add_argument('--concurrency', default='50,200', help='逗號分隔的並行連線數')
+    parser.add_argument('-d', '--duration', type=float, default=8.0, help='每次測試的秒數')
+    parser.add_argument('--path', default='/api/users/1')
+    parser.add_argument('--threads', type=int, default=4, help='gthread worker 的執行緒數')
+    parser.add_argument('--pool-size', type=int, default=50, help='DB_POOL_SIZE (gevent 的實際並行上限)')
+    parser.add_argument('--sql-latency-ms', type=float, default=50.0, help='每個 SQL 模擬的網路往返毫秒數')
+    parser.add_argument('--database-url', default=None, help='預設為暫存的 SQLite 資料庫')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+
+    database_url = args.database_url or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='napp-bench-workers-'), 'bench.db')}"
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'LOG_LEVEL': 'WARNING',
+        'RATE_LIMIT_ENABLED': 'False',
+        'EMAIL_BACKEND': 'console',
+        'RESET_TOKEN_SWEEPER_ENABLED': 'False',
+        'SLOW_REQUEST_MS': '0', # 高並行下排隊的請求都會超過門檻，不輸出慢請求紀錄
+        'ADMIN_USERNAME': ADMIN_USERNAME,
+        'ADMIN_PASSWORD': ADMIN_PASSWORD,
+        'ADMIN_EMAIL': f'{ADMIN_USERNAME}@bench.invalid',
+        'DB_POOL_SIZE': str(args.pool_size),
+        'BENCH_SQL_LATENCY_MS': str(args.sql_latency_ms),
+    })
+
+    # 在本行程建立資料表與管理員帳號 (環境變數必須在匯入 config 之前設定)
+    os.environ.update({k: v for k, v in env.items() if k != 'BENCH_SQL_LATENCY_MS'})
+    from app import create_app
+    from commands import init_database
+    from load_test import fetch_token, run_load
+    if not init_database(create_app()):
+        raise SystemExit("資料庫初始化失敗")
+
+    results = []
+    for worker_class in [w for w in args.worker_classes.split(',') if w]:
+        process, base_url = start_gunicorn(worker_class, env, args.threads)
+        try:
+            headers = {'Authorization': f"Bearer {fetch_token(base_url, f'{ADMIN_USERNAME}:{ADMIN_PASSWORD}')}"}
+            for concurrency in [int(c) for c in args.concurrency.split(',') if c]:
+                report = run_load(base_url, 'GET', args.path, concurrency, args.duration, headers=headers)
+                report.update({'worker_class': worker_class, 'concurrency': concurrency})
+                results.append(report)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    if args.json:
+        print(json.dumps({
+            'path': args.path, 'sql_latency_ms': args.sql_latency_ms, 'threads': args.threads,
+            'pool_size': args.pool_size, 'results': results,
+        }, ensure_ascii=False, indent=2))
+        return
+    print(f"GET {args.path}  sql_latency={args.sql_latency_ms}ms  gthread threads={args.threads}  DB_POOL_SIZE={args.pool_size}")
+    print(f"{'worker':8s} {'conc':>5s} {'req/s':>9s} {'p50':>10s} {'p95':>10s} {'p99':>10s}  status")
+    for r in results:
+        print(f"{r['worker_class']:8s} {r['concurrency']:>5d} {r['requests_per_sec']:>9.1f} "
+              f"{r['p50_ms']:>7.1f} ms {r['p95_ms']:>7.1f} ms {r['p99_ms']:>7.1f} ms  {r['status_codes']}")
+
+
+if __name__ == '__main__':
+    main()
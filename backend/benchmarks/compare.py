@@ -0,0 +1,81 @@
+# backend/benchmarks/compare.py
+#
+# 比較兩次 api_suite.py 的 JSON 結果，任一情境退步超過門檻時以結束碼 1 結束，可用於 CI。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/compare.py results/before.json results/after.json
+#   python benchmarks/compare.py base.json new.json --latency-threshold 15 --throughput-threshold 10
+
+import argparse
+import json
+import sys
+
+
+def pct_change(before, after):
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline, current, latency_threshold, throughput_threshold):
+    """
+    回傳 (列表, 退步項目)。列表每一項為 (情境, 指標, 前, 後, 變化 %)；
+    p95 延遲上升或 req/s 下降超過門檻、每個請求的 SQL 次數增加，或錯誤率上升超過 1 個百分點時列為退步。
+    """
+    rows = []
+    regressions = []
+    for name, after in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric in ('requests_per_sec', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+            if before.get(metric) is None or after.get(metric) is None:
+                continue
+            change = pct_change(before[metric], after[metric])
+            rows.append((name, metric, before[metric], after[metric], change))
+            if change is None:
+                continue
+            if metric == 'requests_per_sec' and change < -throughput_threshold:
+                regressions.append(f"{name}: req/s 下降 {-change:.1f}%")
+            elif metric == 'p95_ms' and change > latency_threshold:
+                regressions.append(f"{name}: p95 延遲上升 {change:.1f}%")
+            elif metric == 'queries_per_request' and after[metric] > before[metric]:
+                regressions.append(f"{name}: 每個請求的 SQL 次數 {before[metric]} → {after[metric]}")
+        if after.get('error_rate', 0) - before.get('error_rate', 0) > 0.01:
+            regressions.append(f"{name}: 錯誤率 {before.get('error_rate', 0):.2%} → {after['error_rate']:.2%}")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比較兩次基準測試結果')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--latency-threshold', type=float, default=10.0, help='p95 延遲容許上升的百分比')
+    parser.add_argument('--throughput-threshold', type=float, default=10.0, help='req/s 容許下降的百分比')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    for key in ('users', 'concurrency', 'database', 'cpu_count'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"警告：兩次測試的 {key} 不同 ({baseline['meta'].get(key)} / {current['meta'].get(key)})，結果不宜直接比較")
+
+    rows, regressions = compare(baseline, current, args.latency_threshold, args.throughput_threshold)
+    print(f"{'情境':16s} {'指標':20s} {'前':>10s} {'後':>10s} {'變化':>8s}")
+    for name, metric, before, after, change in rows:
+        change_text = f"{change:+.1f}%" if change is not None else '-'
+        print(f"{name:16s} {metric:20s} {before:>10} {after:>10} {change_text:>8s}")
+
+    if regressions:
+        print("\n效能退步：")
+        for item in regressions:
+            print(f"  - {item}")
+        sys.exit(1)
+    print("\n沒有超過門檻的退步。")
+
+
+if __name__ == '__main__':
+    main()
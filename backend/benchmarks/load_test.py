@@ -0,0 +1,135 @@
+# backend/benchmarks/load_test.py
+#
+# 簡易 HTTP 壓力測試工具 (只使用標準函式庫)，用來比較不同的伺服器部署方式。
+# 每個並行執行緒使用各自的 keep-alive 連線，在指定時間內不斷送出同一個請求。
+#
+# 用法 (於 backend/ 目錄執行)：
+#   python benchmarks/load_test.py --base-url http://127.0.0.1:5000 --path / -c 16 -d 20
+#   python benchmarks/load_test.py --path /api/users/?limit=50 --login admin:admin123 -c 8
+#   python benchmarks/load_test.py --method POST --path /api/auth/login \
+#       --body '{"username": "admin", "password": "admin123"}' -c 4
+
+import argparse
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    """把原始延遲 (秒) 與狀態碼統計成報告 dict。"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'duration_sec': round(elapsed, 3),
+        'requests_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        'status_codes': dict(sorted(Counter(statuses).items(), key=lambda item: str(item[0]))),
+    }
+
+
+def open_connection(parsed_url, timeout):
+    connection_class = http.client.HTTPSConnection if parsed_url.scheme == 'https' else http.client.HTTPConnection
+    return connection_class(parsed_url.hostname, parsed_url.port, timeout=timeout)
+
+
+def fetch_token(base_url, credentials):
+    username, _, password = credentials.partition(':')
+    parsed = urllib.parse.urlparse(base_url)
+    connection = open_connection(parsed, 30)
+    connection.request('POST', '/api/auth/login', body=json.dumps({'username': username, 'password': password}),
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    payload = json.loads(response.read() or b'{}')
+    connection.close()
+    if response.status != 200:
+        raise SystemExit(f"登入失敗 ({response.status}): {payload}")
+    return payload['token']
+
+
+def run_load(base_url, method, path, concurrency, duration, headers=None, body=None, timeout=30):
+    """
+    以 concurrency 個執行緒在 duration 秒內重複送出請求，回傳 summarize() 的報告。
+    """
+    parsed = urllib.parse.urlparse(base_url)
+    headers = dict(headers or {})
+    if body is not None:
+        headers.setdefault('Content-Type', 'application/json')
+    latencies = []
+    statuses = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local_latencies = []
+        local_statuses = []
+        connection = open_connection(parsed, timeout)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                local_statuses.append(response.status)
+            except (OSError, http.client.HTTPException):
+                local_statuses.append('error')
+                connection.close()
+                connection = open_connection(parsed, timeout)
+            local_latencies.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.extend(local_statuses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NAPP 後端 HTTP 壓力測試')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--body', default=None, help='JSON 請求內容')
+    parser.add_argument('--login', default=None, help='帳號:密碼，先登入取得 Bearer token')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='測試秒數')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出結果')
+    args = parser.parse_args()
+
+    headers = {}
+    if args.login:
+        headers['Authorization'] = f"Bearer {fetch_token(args.base_url, args.login)}"
+
+    report = run_load(args.base_url, args.method.upper(), args.path, args.concurrency, args.duration,
+                      headers=headers, body=args.body.encode('utf-8') if args.body else None)
+    report.update({'method': args.method.upper(), 'path': args.path, 'concurrency': args.concurrency})
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{report['method']} {report['path']}  concurrency={args.concurrency}")
+        print(f"  requests: {report['requests']}  ({report['requests_per_sec']} req/s)")
+        print(f"  latency p50={report['p50_ms']}ms p95={report['p95_ms']}ms p99={report['p99_ms']}ms max={report['max_ms']}ms")
+        print(f"  status codes: {report['status_codes']}")
+
+
+if __name__ == '__main__':
+    main()
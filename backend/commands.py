@@ -0,0 +1,138 @@
+# backend/commands.py
+#
+# 一次性的維運指令，透過 Flask CLI 執行，例如：
+#   flask --app app:create_app init-db
+# 部署時於啟動 worker 之前執行一次，worker 啟動時不再執行任何 DDL 或 seed 查詢。
+
+import json
+import sys
+
+import click
+from flask import current_app
+
+from models import db, User
+from utils.boot_profile import measure_boot, profile_imports
+from utils.db_probe import wait_for_database
+from utils.reset_tokens import sweep_expired_tokens
+from utils.table_versions import ensure_version_rows
+
+
+def create_missing_indexes():
+    """
+    補建模型中定義、但既有資料表上還沒有的索引，回傳 [(資料表, 索引名稱)]。
+
+    create_all() 只建立不存在的資料表，不會修改既有的資料表；
+    在舊版建立的資料庫上執行 init-db 時由這裡補上新增的索引 (可重複執行)。
+    MySQL 8 的一般索引以 online DDL 建立，不阻擋寫入；第一次建立 FULLTEXT 索引會重建資料表並阻擋寫入，
+    大型資料表請在離峰時段執行。
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.info.get('bind_key') is not None or not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing = [index for index in table.indexes if index.name not in existing]
+        if not missing:
+            continue
+        for index in missing:
+            # 以 ddl_if 限定方言的索引 (只在 MySQL 建立的 FULLTEXT 索引) 在其他資料庫上不會執行
+            index.create(db.engine)
+        inspector.clear_cache()
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        created.extend((table.name, index.name) for index in missing if index.name in existing)
+    return sorted(created)
+
+
+def init_database(app):
+    """
+    等待資料庫就緒後建立資料表並建立預設管理員帳號。
+    回傳是否成功。
+    """
+    with app.app_context():
+        if not wait_for_database(db.engine, deadline=app.config['DB_STARTUP_DEADLINE']):
+            return False
+
+        db.create_all(bind_key=None) # 只在主資料庫建立資料表，唯讀副本由複寫同步
+        print("資料庫連線成功並已創建所有資料表！")
+        for table_name, index_name in create_missing_indexes():
+            print(f"已於既有資料表 {table_name} 建立索引 {index_name}")
+        ensure_version_rows()
+
+        admin_username = app.config.get('ADMIN_USERNAME', 'admin') # 從環境變數或配置獲取
+        admin_password = app.config.get('ADMIN_PASSWORD', 'admin123') # 從環境變數或配置獲取
+        admin_email = app.config.get('ADMIN_EMAIL', 'admin@example.com') # 從環境變數或配置獲取
+
+        if admin_username and admin_password and admin_email:
+            admin_user = User.query.filter_by(username=admin_username).first()
+            if not admin_user:
+                try:
+                    new_admin = User(name='Default Admin', username=admin_username, email=admin_email, role='admin')
+                    # 重要：密碼需要被雜湊儲存
+                    new_admin.set_password(admin_password)
+                    db.session.add(new_admin)
+                    db.session.commit()
+                    print(f"已創建預設管理員帳號: {admin_username}")
+                except Exception as e:
+                    print(f"創建預設管理員時發生錯誤: {e}")
+                    db.session.rollback() # 出錯時回滾
+                    return False
+            else:
+                print(f"預設管理員帳號 {admin_username} 已存在。")
+        else:
+            print("警告: 預設管理員帳號的環境變數未完全設定，將不會自動創建。")
+    return True
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """建立資料表並建立預設管理員帳號 (可重複執行)。"""
+        if not init_database(current_app._get_current_object()):
+            sys.exit(1)
+
+    @app.cli.command('wait-db')
+    @click.option('--deadline', type=float, default=None, help='最多等待的秒數')
+    def wait_db_command(deadline):
+        """等待資料庫可連線 (指數退避)，逾時則以非零狀態結束。"""
+        deadline = deadline if deadline is not None else current_app.config['DB_STARTUP_DEADLINE']
+        if not wait_for_database(db.engine, deadline=deadline):
+            sys.exit(1)
+        print("資料庫已就緒。")
+
+    @app.cli.command('sweep-reset-tokens')
+    @click.option('--batch-size', type=int, default=None, help='每批刪除的筆數')
+    def sweep_reset_tokens_command(batch_size):
+        """分批刪除已過期的密碼重設令牌 (可搭配 cron 定期執行)。"""
+        batch_size = batch_size or current_app.config['RESET_TOKEN_SWEEP_BATCH_SIZE']
+        deleted = sweep_expired_tokens(batch_size)
+        print(f"已清除 {deleted} 筆過期的密碼重設令牌。")
+
+    @app.cli.command('boot-profile')
+    @click.option('--repeat', type=int, default=5, help='量測次數 (取中位數)')
+    @click.option('--top', type=int, default=15, help='列出耗時最多的前幾個套件 / 模組')
+    @click.option('--budget-ms', type=float, default=None, help='啟動時間上限，預設為 BOOT_BUDGET_MS')
+    @click.option('--json', 'as_json', is_flag=True, help='以 JSON 輸出結果')
+    def boot_profile_command(repeat, top, budget_ms, as_json):
+        """量測 worker 啟動時間 (import app + create_app) 與各模組的 import 耗時，超過預算時以非零狀態結束。"""
+        budget_ms = budget_ms if budget_ms is not None else current_app.config['BOOT_BUDGET_MS']
+        boot = measure_boot(repeat)
+        imports = profile_imports(top)
+        within_budget = not budget_ms or boot['total_ms'] <= budget_ms
+        if as_json:
+            print(json.dumps({**boot, **imports, 'budget_ms': budget_ms, 'within_budget': within_budget}, ensure_ascii=False, indent=2))
+        else:
+            print(f"啟動時間 (中位數，{boot['runs']} 次)：import {boot['import_ms']:.1f} ms + "
+                  f"create_app {boot['create_app_ms']:.1f} ms = {boot['total_ms']:.1f} ms (預算 {budget_ms:.0f} ms)")
+            print("\ncreate_app 各階段：")
+            for phase, ms in boot['phases']:
+                print(f"  {phase:12s} {ms:8.2f} ms")
+            print("\n各套件的 import 耗時 (-X importtime，self time 加總)：")
+            for name, ms in imports['packages']:
+                print(f"  {name:28s} {ms:8.1f} ms")
+            print("\napp.py 直接匯入的模組 (累計，包含間接匯入)：")
+            for name, ms in imports['app_imports']:
+                print(f"  {name:28s} {ms:8.1f} ms")
+        if not within_budget:
+            print(f"啟動時間 {boot['total_ms']:.1f} ms 超過預算 {budget_ms:.0f} ms", file=sys.stderr)
+            sys.exit(1)
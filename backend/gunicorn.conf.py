@@ -0,0 +1,92 @@
+# backend/gunicorn.conf.py
+#
+# gunicorn 正式環境設定：gunicorn -c gunicorn.conf.py wsgi:app
+# 所有參數皆可用環境變數覆寫，未設定時依 CPU 核心數推算。
+#
+# - preload_app：在 master 行程中執行一次 create_app() (只載入程式碼與設定，不連線資料庫)，
+#   再 fork 出 worker，worker 之間以 copy-on-write 共用已載入的程式碼與資料。
+#   建立資料表與預設管理員請在啟動 gunicorn 之前執行 flask init-db。
+# - 平滑重啟：kill -HUP $(cat $GUNICORN_PIDFILE) 會依新設定逐一替換 worker；
+#   由於 preload_app 時程式碼載入在 master 中，部署新版程式碼請改用
+#   kill -USR2 (啟動新 master) 後再對舊 master 送 kill -WINCH 與 kill -QUIT。
+# - GUNICORN_WORKER_CLASS=gevent：協程 worker (需安裝 gevent)，見下方說明。
+
+import multiprocessing
+import os
+import sys
+
+# gevent worker：以 monkey patch 讓 socket / select / time.sleep / threading 變成協作式，
+# PyMySQL 與 smtplib 都是純 Python 的 socket 程式，等待 MySQL / SMTP 時會讓出給其他請求，
+# 單一行程可同時處理上千個請求而不需修改任何路由。必須在載入 app (preload_app) 之前 patch。
+if os.environ.get('GUNICORN_WORKER_CLASS') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('FLASK_RUN_PORT', 5000)}")
+
+# 每個 worker 的執行緒數；大於 1 時使用 gthread worker，讓等待 MySQL / SMTP 的請求不佔住整個 worker
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+# sync worker 一次只處理一個請求，採常見的 2 * 核心數 + 1；
+# gthread worker 已有多個執行緒，worker 數與核心數相當即可 (密碼雜湊等 CPU 工作受 GIL 限制)；
+# gevent worker 每個行程只用一顆核心，worker 數等於核心數
+if worker_class == 'gevent':
+    default_workers = cpu_count
+elif worker_class == 'gthread':
+    default_workers = cpu_count + 1
+else:
+    default_workers = cpu_count * 2 + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', 0)) or default_workers
+# gevent worker 每個行程同時處理的請求上限；實際能同時等待資料庫的請求數仍受 DB_POOL_SIZE + DB_MAX_OVERFLOW 限制
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# 定期回收 worker，避免長時間運行造成的記憶體膨脹；jitter 避免所有 worker 同時重啟
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+pidfile = os.environ.get('GUNICORN_PIDFILE', '/tmp/napp-gunicorn.pid')
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = os.environ.get('GUNICORN_ERRORLOG', '-')
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # 行程內的狀態 (限流計數) 每個 worker 各一份，多個 worker 時需要共用的儲存
+    from config import Config
+    if workers > 1 and Config.RATE_LIMIT_ENABLED and not Config.RATE_LIMIT_STORAGE_URL:
+        server.log.warning(
+            "RATE_LIMIT_STORAGE_URL 未設定：%d 個 worker 各自計數，登入 / 忘記密碼的限流實際上放寬為 %d 倍，"
+            "且 worker 回收 (max_requests) 後計數歸零。請設定 redis://... 共用計數。", workers, workers
+        )
+
+    # 撤銷清單只存在行程內時，在某個 worker 登出的令牌到其他 worker 仍然有效，拒絕啟動
+    revocation_in_memory = (Config.JWT_REVOCATION_ENABLED and Config.JWT_REVOCATION_STORE == 'memory'
+                            and not (Config.JWT_REVOCATION_STORAGE_URL or '').startswith('redis'))
+    if revocation_in_memory and workers > 1:
+        server.log.error(
+            "JWT_REVOCATION_STORE=memory 只在單一行程內生效，無法搭配 %d 個 worker："
+            "請改用 database (預設) 或設定 JWT_REVOCATION_STORAGE_URL=redis://...", workers
+        )
+        sys.exit(1)
+    if revocation_in_memory and max_requests:
+        server.log.warning("JWT_REVOCATION_STORE=memory：worker 回收 (max_requests) 後已撤銷的令牌會重新生效")
+
+
+def post_fork(server, worker):
+    # master 在 preload 階段建立的資料庫連線不可在多個行程間共用，
+    # fork 後捨棄繼承來的連線池 (不關閉 master 的 socket)，由 worker 自行建立新連線
+    if not preload_app:
+        return
+    from wsgi import app
+    from models import db
+    with app.app_context():
+        for engine in db.engines.values(): # 主資料庫與唯讀副本
+            engine.dispose(close=False)
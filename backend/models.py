@@ -1,12 +1,23 @@
 # backend/models.py
 
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.hash_executor import hash_executor # 依設定在目前執行緒或雜湊行程池中計算密碼雜湊
+from utils.password_hashing import password_hasher # 依 Config 的 PASSWORD_* 設定進行雜湊
+from utils.db_routing import RoutingSession
 from sqlalchemy.sql import func # 用於資料庫層面的預設時間戳
+from sqlalchemy.dialects import sqlite
 # import datetime # 如果使用 datetime.datetime.utcnow，則需要它
 
 # 初始化 SQLAlchemy 實例，但不在這裡綁定 Flask app，而是在 app.py 中進行
-db = SQLAlchemy()
+# RoutingSession 讓標記為唯讀的請求可以把查詢送往唯讀副本 (utils/db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# SQLite 以字串儲存時間：資料庫端的 CURRENT_TIMESTAMP 沒有微秒，SQLAlchemy 預設卻以 '.000000' 結尾綁定參數，
+# 字串比較 (例如 keyset 分頁的 created_at < 游標值) 會出錯；與 MySQL DATETIME 相同只保存到秒
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite',
+)
 
 class User(db.Model):
     __tablename__ = 'users' # 指定資料表名稱
@@ -17,12 +28,23 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False) # 儲存雜湊後的密碼
     role = db.Column(db.Enum('admin', 'user', name='user_roles_enum'), default='user', nullable=False) # 為 ENUM 指定一個名稱
-    reset_token = db.Column(db.String(255), nullable=True)
-    reset_token_expires = db.Column(db.DateTime, nullable=True)
+    # 密碼重設令牌已移至 PasswordResetToken (password_reset_tokens 資料表)
     
     # 使用 SQLAlchemy 的 func.now() 或 server_default 來處理時間戳，由資料庫生成
-    created_at = db.Column(db.DateTime, server_default=func.now())
-    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+    created_at = db.Column(Timestamp, server_default=func.now())
+    updated_at = db.Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+    # 使用者列表的 keyset 分頁與篩選所需的複合索引 (排序欄位 + id 作為 tie-breaker)
+    # username / email 已有 UNIQUE 索引，可直接支援前綴 (LIKE 'abc%') 查詢
+    __table_args__ = (
+        db.Index('idx_users_created_at_id', 'created_at', 'id'),
+        db.Index('idx_users_role_id', 'role', 'id'),
+        # 條件式 GET 的 MAX(updated_at) 聚合查詢
+        db.Index('idx_users_updated_at', 'updated_at'),
+        # 使用者搜尋在索引建立完成前的資料庫查詢 (MySQL 的 ngram parser 可比對中文)
+        db.Index('ft_users_search', 'name', 'username', 'email',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -37,13 +59,20 @@ class User(db.Model):
     def password(self, password_plaintext):
         if not password_plaintext:
             raise ValueError("Password cannot be empty or None")
-        self.password_hash = generate_password_hash(password_plaintext)
+        self.password_hash = hash_executor.hash(password_plaintext)
+
+    def set_password(self, password_plaintext):
+        self.password = password_plaintext
 
     # 驗證密碼
     def verify_password(self, password_plaintext):
         if not self.password_hash or not password_plaintext: # 確保兩者都存在
             return False
-        return check_password_hash(self.password_hash, password_plaintext)
+        return hash_executor.verify(self.password_hash, password_plaintext)
+
+    # 儲存的雜湊使用舊的演算法或成本參數時回傳 True (登入成功後可順便升級)
+    def password_needs_rehash(self):
+        return bool(self.password_hash) and password_hasher.needs_rehash(self.password_hash)
 
     # 序列化為字典 (用於 API 回應)
     def to_dict(self):
@@ -58,6 +87,99 @@ class User(db.Model):
             # 確保不返回 password_hash 或其他敏感資訊
         }
 
+class PasswordResetToken(db.Model):
+    """
+    密碼重設令牌。只儲存令牌的 SHA-256 摘要 (token_hash)，
+    驗證時以唯一索引做單點查詢；expires_at 索引供過期清理批次刪除使用。
+    """
+    __tablename__ = 'password_reset_tokens'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False) # 十六進位的 SHA-256 摘要
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+    user = db.relationship('User', lazy='joined', passive_deletes=True)
+
+    def __repr__(self):
+        return f'<PasswordResetToken user_id={self.user_id}>'
+
+class AuditEvent(db.Model):
+    """
+    使用者管理操作的稽核紀錄 (只新增、不修改)，由 utils/audit_log.py 的背景執行緒批次寫入。
+    actor_id / target_id 不設外鍵：使用者刪除後紀錄仍須保留。
+    created_at 為事件發生的時間 (不是寫入資料庫的時間)。
+    """
+    __tablename__ = 'audit_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True) # 操作者；重設密碼流程等未登入的操作為 NULL
+    action = db.Column(db.String(64), nullable=False)
+    target_id = db.Column(db.Integer, nullable=True) # 被操作的使用者
+    ip = db.Column(db.String(45), nullable=True)
+    changes = db.Column(db.JSON, nullable=True) # 修改時為 {欄位: [舊值, 新值]}
+
+    # 依對象查詢與依時間查詢的 keyset 分頁 (created_at DESC, id DESC)
+    __table_args__ = (
+        db.Index('idx_audit_events_target_created_id', 'target_id', 'created_at', 'id'),
+        db.Index('idx_audit_events_created_id', 'created_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<AuditEvent {self.action} target_id={self.target_id}>'
+
+class UserDeletion(db.Model):
+    """
+    使用者刪除紀錄 (tombstone)，與刪除在同一個交易中寫入。
+    其他 worker 的搜尋索引 (utils/user_search.py) 依 deleted_at 增量讀取並移除已刪除的使用者，
+    超過 USER_SEARCH_DELETION_RETENTION 秒的紀錄由同步執行緒刪除。user_id 不設外鍵 (使用者已不存在)。
+    """
+    __tablename__ = 'user_deletions'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(Timestamp, server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<UserDeletion user_id={self.user_id}>'
+
+class TableVersion(db.Model):
+    """
+    資料表的版本號 (utils/table_versions.py)：同一個交易中每次寫入受追蹤的資料表就加 1，
+    列表的 ETag 以此判斷內容是否變動 (DATETIME 只到秒，同一秒內的修改無法由 updated_at 看出)。
+    """
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name}={self.version}>'
+
+class RevokedToken(db.Model):
+    """
+    JWT 撤銷紀錄 (utils/token_revocation.py 的 DatabaseRevocationStore)，讓多個 worker 共用同一份撤銷清單。
+    kind 為 'jti' (單一令牌，subject 為 jti) 或 'user' (subject 為使用者 id，撤銷 revoked_before 之前簽發的令牌)。
+    exp 為紀錄可刪除的時間 (epoch 秒)，之後令牌本身已過期。
+    """
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(8), nullable=False)
+    subject = db.Column(db.String(64), nullable=False)
+    revoked_before = db.Column(db.BigInteger, nullable=False, default=0) # 單一令牌的紀錄為 0
+    exp = db.Column(db.BigInteger, nullable=False, index=True)
+
+    # 同一個 jti 只能撤銷一次：refresh 令牌輪替以此保證舊令牌只能換發一次
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'subject', 'revoked_before', name='uq_revoked_tokens_kind_subject'),
+    )
+
+    def __repr__(self):
+        return f'<RevokedToken {self.kind}:{self.subject}>'
+
 # 您可以在這裡定義其他的模型，例如與 NAPP 系統中特定 App 相關的模型
 # class YourAppModel(db.Model):
 #     __tablename__ = 'your_app_table_name'
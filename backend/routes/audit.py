@@ -0,0 +1,99 @@
+# backend/routes/audit.py
+
+import datetime
+import logging
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from models import AuditEvent, db
+from utils.auth_decorators import admin_required
+from utils.db_routing import use_replica, is_replica_error
+from utils.pagination import InvalidCursorError, encode_cursor, decode_cursor, keyset_filter
+
+audit_bp = Blueprint('audit', __name__)
+logger = logging.getLogger(__name__)
+
+AUDIT_EVENT_COLUMNS = (
+    AuditEvent.id, AuditEvent.created_at, AuditEvent.actor_id, AuditEvent.action,
+    AuditEvent.target_id, AuditEvent.ip, AuditEvent.changes,
+)
+
+
+def _parse_int_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"參數 {name} 必須為整數")
+
+
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"參數 {name} 必須為 ISO 8601 日期時間格式")
+
+
+# 查詢稽核紀錄 (需要管理員權限)，由新到舊排列，以 keyset (游標) 分頁。
+# 查詢參數：limit、cursor、target_id、actor_id、action、since、until
+# 帶 target_id 時使用 (target_id, created_at, id) 索引，否則使用 (created_at, id) 索引。
+# 事件由背景執行緒批次寫入，最近 AUDIT_FLUSH_INTERVAL 秒內的操作可能尚未出現。
+@audit_bp.route('/', methods=['GET', 'OPTIONS'])
+@jwt_required()
+@use_replica()
+@admin_required()
+def list_audit_events():
+    try:
+        limit = int(request.args.get('limit', current_app.config['AUDIT_PAGE_SIZE_DEFAULT']))
+    except ValueError:
+        return jsonify({"message": "參數 limit 必須為整數"}), 400
+    limit = max(1, min(limit, current_app.config['AUDIT_PAGE_SIZE_MAX']))
+
+    query = db.select(*AUDIT_EVENT_COLUMNS)
+    try:
+        target_id = _parse_int_arg('target_id')
+        if target_id is not None:
+            query = query.where(AuditEvent.target_id == target_id)
+        actor_id = _parse_int_arg('actor_id')
+        if actor_id is not None:
+            query = query.where(AuditEvent.actor_id == actor_id)
+        action = request.args.get('action')
+        if action:
+            query = query.where(AuditEvent.action == action)
+        since = _parse_datetime_arg('since')
+        if since:
+            query = query.where(AuditEvent.created_at >= since)
+        until = _parse_datetime_arg('until')
+        if until:
+            query = query.where(AuditEvent.created_at < until)
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_value, cursor_id = decode_cursor(cursor, 'created_at')
+            query = query.where(keyset_filter(AuditEvent.created_at, AuditEvent.id, cursor_value, cursor_id, descending=True))
+    except (ValueError, InvalidCursorError) as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        # 多取一筆用來判斷是否還有下一頁
+        rows = db.session.execute(
+            query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor('created_at', rows[-1].created_at, rows[-1].id) if has_more else None
+        return jsonify({
+            "events": [row._asdict() for row in rows],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }), 200
+    except Exception as e:
+        if is_replica_error(e):
+            raise # 由 use_replica() 改用主資料庫重試
+        logger.exception("list_audit_events 發生錯誤")
+        return jsonify({"message": "獲取稽核紀錄時發生伺服器內部錯誤", "error": str(e)}), 500
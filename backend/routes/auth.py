@@ -3,14 +3,36 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import User, db
 from utils.email_service import send_email
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, JWTManager
+from utils.rate_limiter import rate_limit, client_ip, json_field
+from utils.reset_tokens import create_reset_token, find_valid_reset_token, consume_reset_tokens
+from utils.auth_decorators import get_current_user
+from utils.token_revocation import token_revocation
+from utils.user_reads import get_user_credentials, update_password_hash
+from utils.audit_log import audit_log
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token, JWTManager
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 import datetime
-import secrets
+import logging
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _create_tokens(user, with_refresh=True):
+    """簽發 access (以及 refresh) 令牌。"""
+    # 啟用 JWT_ROLE_CLAIM_ENABLED 時把角色寫入已簽章的 claim，admin_required 可免查資料庫
+    additional_claims = {"role": user.role} if current_app.config.get('JWT_ROLE_CLAIM_ENABLED') else None
+    access_token = create_access_token(identity=user.id, additional_claims=additional_claims, expires_delta=datetime.timedelta(seconds=current_app.config['JWT_ACCESS_TOKEN_EXPIRES']))
+    if not with_refresh:
+        return access_token, None
+    refresh_token = create_refresh_token(identity=user.id, expires_delta=datetime.timedelta(seconds=current_app.config['JWT_REFRESH_TOKEN_EXPIRES']))
+    return access_token, refresh_token
+
 
 # 登入路由
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(('login_ip', client_ip), ('login_username', json_field('username')))
 def login():
     username = request.json.get('username', None)
     password = request.json.get('password', None)
@@ -18,13 +40,22 @@ def login():
     if not username or not password:
         return jsonify({"message": "請提供帳號和密碼"}), 400
 
-    user = User.query.filter_by(username=username).first()
+    # 只查詢回應與驗證需要的欄位，不載入 ORM 物件
+    user = get_user_credentials(username)
 
     if not user or not user.verify_password(password):
         return jsonify({"message": "帳號或密碼錯誤"}), 401
 
-    access_token = create_access_token(identity=user.id, expires_delta=datetime.timedelta(seconds=current_app.config['JWT_ACCESS_TOKEN_EXPIRES']))
-    refresh_token = create_refresh_token(identity=user.id, expires_delta=datetime.timedelta(seconds=current_app.config['JWT_REFRESH_TOKEN_EXPIRES']))
+    # 雜湊參數已調整時，趁使用者提供明文密碼的這次登入升級儲存的雜湊
+    if user.password_needs_rehash():
+        try:
+            update_password_hash(user.id, password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("升級使用者密碼雜湊失敗", extra={"user_id": user.id})
+
+    access_token, refresh_token = _create_tokens(user)
 
     return jsonify({
         "message": "登入成功",
@@ -33,8 +64,47 @@ def login():
         "user": user.to_dict()
     }), 200
 
+# 以 refresh 令牌換發新的 access 令牌
+# JWT_REFRESH_ROTATION 啟用時同時換發新的 refresh 令牌並撤銷舊的，被竊取的 refresh 令牌只能使用一次
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    user = get_current_user() # 帳號已刪除時不再換發
+    if not user:
+        return jsonify({"message": "找不到使用者或認證失敗"}), 401
+
+    rotate = current_app.config.get('JWT_REFRESH_ROTATION', True)
+    # 先撤銷再換發：同一個 refresh 令牌同時送到多個 worker 時，只有一個請求能撤銷成功
+    if rotate and not token_revocation.revoke_token(get_jwt(), exclusive=True):
+        return jsonify({"message": "身份驗證令牌已被撤銷"}), 401
+    access_token, refresh_token = _create_tokens(user, with_refresh=rotate)
+    response = {"message": "令牌已更新", "token": access_token}
+    if rotate:
+        response["refresh_token"] = refresh_token
+    return jsonify(response), 200
+
+# 登出：撤銷目前使用的令牌；請求內容附上 refresh_token 時一併撤銷
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    current = get_jwt()
+    token_revocation.revoke_token(current)
+
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token') if isinstance(data, dict) else None
+    if refresh_token:
+        try:
+            refresh_payload = decode_token(refresh_token)
+        except (PyJWTError, JWTExtendedException):
+            refresh_payload = None # 已過期或無效的令牌不需要撤銷
+        if refresh_payload and str(refresh_payload.get('sub')) == str(current.get('sub')):
+            token_revocation.revoke_token(refresh_payload)
+
+    return jsonify({"message": "已登出"}), 200
+
 # 忘記密碼 / 請求重設密碼 (寄送重設連結)
 @auth_bp.route('/forgot-password', methods=['POST'])
+@rate_limit(('forgot_password_ip', client_ip), ('forgot_password_email', json_field('email')))
 def forgot_password():
     email = request.json.get('email', None)
 
@@ -46,13 +116,9 @@ def forgot_password():
     if not user:
         return jsonify({"message": "如果電子郵件存在，密碼重設連結已發送。"}), 200
 
-    reset_token = secrets.token_urlsafe(32)
-    reset_token_expires = datetime.datetime.now() + datetime.timedelta(hours=1)
-
-    user.reset_token = reset_token
-    user.reset_token_expires = reset_token_expires
-    db.session.add(user)
+    reset_token = create_reset_token(user, current_app.config['RESET_TOKEN_LIFETIME'])
     db.session.commit()
+    audit_log.record('password.reset_request', user.id)
 
     reset_url = f"{current_app.config['FRONTEND_URL']}/reset-password?token={reset_token}"
 
@@ -64,7 +130,7 @@ def forgot_password():
         <p>您收到了來自 NAPP 系統的密碼重設請求。</p>
         <p>請點擊以下連結重設您的密碼：</p>
         <a href="{reset_url}">{reset_url}</a>
-        <p>此連結將於 1 小時後失效。</p>
+        <p>此連結將於 {current_app.config['RESET_TOKEN_LIFETIME'] // 60} 分鐘後失效。</p>
         <p>如果您沒有請求重設密碼，請忽略此郵件。</p>
         """
     )
@@ -82,18 +148,18 @@ def reset_password(token):
     if not new_password:
         return jsonify({"message": "請提供新密碼"}), 400
 
-    user = User.query.filter_by(reset_token=token).filter(
-        User.reset_token_expires > datetime.datetime.now()
-    ).first()
+    reset_token = find_valid_reset_token(token)
 
-    if not user:
+    if not reset_token:
         return jsonify({"message": "密碼重設令牌無效或已過期。"}), 400
 
+    user = reset_token.user
     user.password = new_password
-    user.reset_token = None
-    user.reset_token_expires = None
-    db.session.add(user)
+    consume_reset_tokens(user.id)
     db.session.commit()
+    # 重設密碼代表帳號可能已外洩，讓先前簽發的所有令牌失效
+    token_revocation.revoke_user(user.id)
+    audit_log.record('password.reset', user.id)
 
     send_email(
         to=user.email,
@@ -0,0 +1,20 @@
+# backend/routes/health.py
+
+from flask import Blueprint, jsonify
+from models import db
+from utils.db_probe import check_database
+
+health_bp = Blueprint('health', __name__)
+
+# 存活檢查 (liveness)：只確認行程能處理請求，不觸碰資料庫
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+# 就緒檢查 (readiness)：資料庫可連線時才回 200，否則回 503 讓負載平衡器暫不導入流量
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    ok, error = check_database(db.engine)
+    if not ok:
+        return jsonify({"status": "unavailable", "database": error}), 503
+    return jsonify({"status": "ok", "database": "ok"}), 200
@@ -0,0 +1,29 @@
+# backend/routes/metrics.py
+
+import hmac
+
+from flask import Blueprint, jsonify, request, current_app, Response
+from flask_jwt_extended import jwt_required
+from utils.auth_decorators import admin_required
+from utils.metrics import collect_metrics
+from utils.instrumentation import request_instrumentation
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# 系統運行指標 (郵件佇列等)，需要管理員權限
+@metrics_bp.route('/', methods=['GET', 'OPTIONS'])
+@jwt_required()
+@admin_required()
+def get_metrics():
+    return jsonify(collect_metrics()), 200
+
+# Prometheus 抓取用的文字格式指標，以 METRICS_TOKEN 作為 Bearer token 驗證 (抓取程式不走登入流程)
+@metrics_bp.route('/prometheus', methods=['GET'])
+def get_prometheus_metrics():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return jsonify({"message": "找不到資源"}), 404
+    provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(provided.encode(), token.encode()):
+        return jsonify({"message": "缺少身份驗證令牌"}), 401
+    return Response(request_instrumentation.render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -1,50 +1,266 @@
 # backend/routes/users.py
 
-from flask import Blueprint, request, jsonify, current_app
-from models import User, db
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from models import User, PasswordResetToken, db
 from flask_jwt_extended import jwt_required, get_jwt_identity # 從 flask_jwt_extended 導入
-from utils.auth_decorators import admin_required
-from utils.email_service import send_email
+from utils.auth_decorators import admin_required, get_current_user, invalidate_user_role
+from utils.db_routing import use_replica, is_replica_error
+from utils.email_service import send_email, email_queue
+from utils.token_revocation import token_revocation
+from utils.hash_executor import hash_executor, HashingOverloadedError
+from utils.bulk_import import read_import_rows, validate_import_rows, validate_new_user, error_result, chunked, identity_key
+from utils.batch_users import BatchTooLargeError, parse_batch_ids, parse_batch_updates, id_result
+from utils.pagination import (
+    InvalidCursorError, encode_cursor, decode_cursor, keyset_filter,
+    escape_like, estimate_table_rows, count_query
+)
+from utils.user_export import parse_export_columns, iter_ndjson, iter_csv
+from utils.conditional import make_etag, conditional_response, add_validators
+from utils.table_versions import current_version
+from utils.row_serializer import user_row_serializer
+from utils.user_reads import get_user_view, get_user_views
+from utils.user_search import user_search_index, search_users_in_database
+from utils.audit_log import audit_log, diff_changes
+from sqlalchemy.exc import IntegrityError
 import datetime
+import logging
 # import traceback
 
 users_bp = Blueprint('users', __name__)
+logger = logging.getLogger(__name__)
 
-# 3-1. 列出所有使用者清單 (需要管理員權限)
+# 使用者列表可用的排序欄位 (皆有 (欄位, id) 索引或本身即為唯一索引)
+USER_SORT_COLUMNS = {
+    'id': User.id,
+    'created_at': User.created_at,
+    'username': User.username,
+}
+
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"參數 {name} 必須為 ISO 8601 日期時間格式")
+
+def _build_user_list_query():
+    """
+    依查詢參數組出使用者列表的篩選條件 (不含排序與分頁)。
+
+    支援的參數：role、username (前綴)、email (前綴)、created_from、created_to。
+    參數格式錯誤時拋出 ValueError。
+    """
+    query = db.select(User)
+
+    role = request.args.get('role')
+    if role:
+        if role not in ('admin', 'user'):
+            raise ValueError("參數 role 必須為 admin 或 user")
+        query = query.where(User.role == role)
+
+    username_prefix = request.args.get('username')
+    if username_prefix:
+        query = query.where(User.username.like(escape_like(username_prefix) + '%', escape='\\'))
+
+    email_prefix = request.args.get('email')
+    if email_prefix:
+        query = query.where(User.email.like(escape_like(email_prefix) + '%', escape='\\'))
+
+    created_from = _parse_datetime_arg('created_from')
+    if created_from:
+        query = query.where(User.created_at >= created_from)
+    created_to = _parse_datetime_arg('created_to')
+    if created_to:
+        query = query.where(User.created_at < created_to)
+
+    return query
+
+# 3-1. 列出使用者清單 (需要管理員權限)
+# 以 keyset (游標) 分頁，避免一次載入整張 users 資料表。
+# 查詢參數：limit、cursor、sort (id/created_at/username)、order (asc/desc)、
+#           role、username、email、created_from、created_to、include_total
 @users_bp.route('/', methods=['GET', 'OPTIONS'])
 @jwt_required()
+@use_replica()
 @admin_required()
 def get_all_users():
-    print(f"--- Request received at GET /api/users/ (inside get_all_users function) ---")
+    sort_key = request.args.get('sort', 'id')
+    if sort_key not in USER_SORT_COLUMNS:
+        return jsonify({"message": f"不支援的排序欄位：{sort_key}"}), 400
+    order = request.args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        return jsonify({"message": "參數 order 必須為 asc 或 desc"}), 400
+    descending = order == 'desc'
+
     try:
-        print("--- Attempting to query all users from database ---")
-        users = User.query.all()
-        print(f"--- Successfully queried {len(users)} users from database ---")
-        
-        users_data = []
-        for u in users:
-            if hasattr(u, 'to_dict') and callable(getattr(u, 'to_dict')):
-                users_data.append(u.to_dict())
+        limit = int(request.args.get('limit', current_app.config['USERS_PAGE_SIZE_DEFAULT']))
+    except ValueError:
+        return jsonify({"message": "參數 limit 必須為整數"}), 400
+    limit = max(1, min(limit, current_app.config['USERS_PAGE_SIZE_MAX']))
+
+    try:
+        filtered_query = _build_user_list_query()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # 條件式請求：以 users 的版本號 (每次寫入都加 1，utils/table_versions.py) 與篩選結果的
+    # count / max(updated_at) / max(id) 判斷列表是否變動，未變動時直接回應 304，不查詢也不序列化任何資料列。
+    # 查詢參數 (分頁、排序) 也納入 ETag。版本號涵蓋 updated_at (只到秒) 看不出的同一秒內的修改。
+    # 列表只使用 ETag、不提供 Last-Modified：刪除使用者不會讓 max(updated_at) 變大，If-Modified-Since 會誤回 304
+    users_version = current_version(User.__tablename__)
+    row_count, max_updated_at, max_id = db.session.execute(
+        filtered_query.with_only_columns(db.func.count(), db.func.max(User.updated_at), db.func.max(User.id))
+        .order_by(None)
+    ).one()
+    etag = make_etag('users', request.full_path, users_version, row_count, max_updated_at, max_id)
+    not_modified = conditional_response(etag)
+    if not_modified is not None:
+        return not_modified
+
+    sort_column = USER_SORT_COLUMNS[sort_key]
+    page_query = filtered_query
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_value, cursor_id = decode_cursor(cursor, sort_key)
+        except InvalidCursorError as e:
+            return jsonify({"message": str(e)}), 400
+        page_query = page_query.where(keyset_filter(sort_column, User.id, cursor_value, cursor_id, descending))
+
+    if sort_column is User.id:
+        order_by = (User.id.desc(),) if descending else (User.id.asc(),)
+    elif descending:
+        order_by = (sort_column.desc(), User.id.desc())
+    else:
+        order_by = (sort_column.asc(), User.id.asc())
+
+    try:
+        # 多取一筆用來判斷是否還有下一頁，不需要額外的 COUNT 查詢
+        # 只選取回應需要的欄位，直接由資料列 tuple 組出回應，不建立 ORM 物件
+        users = db.session.execute(
+            page_query.with_only_columns(*user_row_serializer.select_columns)
+            .order_by(*order_by).limit(limit + 1)
+        ).all()
+        has_more = len(users) > limit
+        users = users[:limit]
+
+        next_cursor = None
+        if has_more:
+            last = users[-1]
+            next_cursor = encode_cursor(sort_key, getattr(last, sort_key), last.id)
+
+        response = {
+            "users": user_row_serializer.serialize(users),
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+
+        # total 為選用欄位：未帶篩選條件時使用資料庫統計的估計值，否則對篩選結果計數
+        if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+            if filtered_query.whereclause is None:
+                response["total"] = estimate_table_rows(db.session, User.__tablename__)
+                response["total_is_estimate"] = db.engine.dialect.name == 'mysql'
             else:
-                print(f"--- User {u.username} is missing to_dict() method. Falling back to manual dict. ---")
-                users_data.append({
-                    'id': u.id, 'name': u.name, 'username': u.username,
-                    'email': u.email, 'role': u.role
-                })
-        
-        print(f"--- Returning {len(users_data)} users data to client ---")
-        return jsonify({"users": users_data, "total": len(users_data)}), 200
+                response["total"] = count_query(db.session, filtered_query)
+                response["total_is_estimate"] = False
+
+        logger.debug("回傳使用者列表", extra={"count": len(users), "has_more": has_more})
+        return add_validators(jsonify(response), etag), 200
     except Exception as e:
-        print(f"--- ERROR in get_all_users: {e} ---")
-        # traceback.print_exc()
+        if is_replica_error(e):
+            raise # 由 use_replica() 改用主資料庫重試
+        logger.exception("get_all_users 發生錯誤")
         return jsonify({"message": "獲取使用者列表時發生伺服器內部錯誤", "error": str(e)}), 500
 
+# 3-1-1. 匯出使用者資料 (需要管理員權限)
+# 以串流方式輸出 NDJSON 或 CSV：資料庫端使用 server-side cursor (stream_results + yield_per)，
+# 只查詢需要的欄位而不建立 ORM 物件，記憶體用量不隨資料筆數成長。
+# 查詢參數：format (ndjson/csv)、columns (逗號分隔)，以及與列表相同的篩選參數
+@users_bp.route('/export', methods=['GET', 'OPTIONS'])
+@jwt_required()
+@use_replica()
+@admin_required()
+def export_users():
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"message": "參數 format 必須為 ndjson 或 csv"}), 400
+
+    try:
+        columns = parse_export_columns(request.args.get('columns'))
+        query = _build_user_list_query()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    batch_size = current_app.config['USERS_EXPORT_BATCH_SIZE']
+    query = (
+        query.with_only_columns(*(getattr(User, c) for c in columns))
+        .order_by(User.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+
+    def generate():
+        result = db.session.execute(query)
+        try:
+            rows = result.tuples()
+            if export_format == 'csv':
+                yield from iter_csv(rows, columns, batch_size)
+            else:
+                yield from iter_ndjson(rows, columns, batch_size)
+        finally:
+            result.close()
+
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    if export_format == 'csv':
+        mimetype = 'text/csv'
+        filename = f'users-{timestamp}.csv'
+    else:
+        mimetype = 'application/x-ndjson'
+        filename = f'users-{timestamp}.ndjson'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# 3-1-2. 搜尋使用者 (需要管理員權限)，供管理介面的即時搜尋 (typeahead) 使用
+# 查詢參數：q (比對姓名、帳號、Email 的任一部分，不分大小寫與全形 / 半形)、limit
+# 結果先列出欄位開頭相符的使用者，再列出欄位中間相符的使用者
+@users_bp.route('/search', methods=['GET', 'OPTIONS'])
+@jwt_required()
+@use_replica()
+@admin_required()
+def search_users():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"message": "請提供搜尋字串 q"}), 400
+    if len(query) > 100:
+        return jsonify({"message": "搜尋字串不可超過 100 個字元"}), 400
+    try:
+        limit = int(request.args.get('limit', current_app.config['USER_SEARCH_LIMIT_DEFAULT']))
+    except ValueError:
+        return jsonify({"message": "參數 limit 必須為整數"}), 400
+    limit = max(1, min(limit, current_app.config['USER_SEARCH_LIMIT_MAX']))
+
+    user_ids = user_search_index.search(query, limit)
+    if user_ids is None:
+        # 索引停用或尚在建立中
+        users = user_row_serializer.serialize(search_users_in_database(query, limit))
+        source = "database"
+    else:
+        # 回應的欄位一律以資料庫為準 (索引只保存正規化後的比對字串)
+        users = [user.to_dict() for user in get_user_views(user_ids)]
+        source = "index"
+    return jsonify({"users": users, "source": source}), 200
+
 # 3-2. 新增使用者 (需要管理員權限)
 @users_bp.route('/', methods=['POST', 'OPTIONS']) # <--- 添加 OPTIONS
 @jwt_required()
 @admin_required()
 def create_user():
-    print(f"--- Request received at POST /api/users/ (inside create_user function) ---")
     data = request.get_json()
     if not data:
         return jsonify({"message": "請求中未包含 JSON 資料"}), 400
@@ -55,10 +271,10 @@ def create_user():
     password = data.get('password')
     role = data.get('role', 'user')
 
-    if not all([name, username, email, password]):
-        return jsonify({"message": "請提供所有必要欄位：姓名、帳號、Email、密碼"}), 400
+    error = validate_new_user(name, username, email, password, role, current_app.config['MIN_PASSWORD_LENGTH'])
+    if error:
+        return jsonify({"message": error}), 400
 
-    print(f"--- Checking if user {username} or email {email} already exists ---")
     existing_user = User.query.filter(
         (User.username == username) | (User.email == email)
     ).first()
@@ -70,44 +286,374 @@ def create_user():
             return jsonify({"message": "電子郵件已存在"}), 409
 
     try:
-        print(f"--- Creating new user: {username} ---")
         new_user = User(name=name, username=username, email=email, role=role)
         new_user.set_password(password) # <--- 使用 set_password 進行雜湊
 
         db.session.add(new_user)
         db.session.commit()
-        print(f"--- User {username} created successfully. ID: {new_user.id} ---")
+        user_search_index.upsert_user(new_user)
+        audit_log.record('user.create', new_user.id, diff_changes({}, {'name': name, 'username': username, 'email': email, 'role': role}))
+        logger.info("已新增使用者", extra={"user_id": new_user.id, "username": username})
 
         try:
             send_email(to=new_user.email, subject='NAPP 系統：您的帳號已創建', template=f"帳號 {new_user.username} 已創建。")
         except Exception as email_e:
-            print(f"--- Failed to send account creation email to {new_user.email}: {email_e} ---")
+            logger.warning("帳號建立通知郵件排入失敗", extra={"to": new_user.email, "error": str(email_e)})
 
         return jsonify({"message": "使用者新增成功", "user": new_user.to_dict()}), 201
+    except HashingOverloadedError:
+        db.session.rollback()
+        raise # 交給 app 的 errorhandler 回應 503 + Retry-After
     except Exception as e:
         db.session.rollback()
-        print(f"--- ERROR in create_user: {e} ---")
-        # traceback.print_exc()
+        logger.exception("create_user 發生錯誤")
         return jsonify({"message": "新增使用者時發生伺服器內部錯誤", "error": str(e)}), 500
 
+# 3-2-1. 批次匯入使用者 (需要管理員權限)
+# 接受 JSON 陣列或上傳的 CSV 檔案 (欄位：name,username,email,password,role)。
+# 欄位檢查與單筆新增相同 (密碼不去除空白、長度至少 MIN_PASSWORD_LENGTH)。
+# 帳號 / Email 衝突以集合查詢一次檢查，密碼一律在雜湊行程池中平行計算 (行程池忙碌時回應 503；
+# 預估雜湊時間超過 USERS_BULK_HASH_BUDGET_SECONDS 時在開始前回應 413)，
+# 再以 executemany 分段 INSERT 並在同一個交易中提交，最後把通知信排入郵件佇列。
+# 回應包含每一列的處理結果；?notify=false 可不寄送帳號建立通知，
+# 超過 USERS_BULK_NOTIFY_MAX 或郵件佇列放不下時不寄送，回應的 notifications_skipped 為未寄送的筆數。
+@users_bp.route('/bulk', methods=['POST', 'OPTIONS'])
+@jwt_required()
+@admin_required()
+def bulk_create_users():
+    try:
+        rows = read_import_rows(request)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    max_rows = current_app.config['USERS_BULK_MAX_ROWS']
+    if len(rows) > max_rows:
+        return jsonify({"message": f"單次最多匯入 {max_rows} 筆使用者"}), 413
+    if not rows:
+        return jsonify({"message": "沒有要匯入的使用者資料"}), 400
+
+    chunk_size = current_app.config['USERS_BULK_CHUNK_SIZE']
+    candidates, results = validate_import_rows(rows, current_app.config['MIN_PASSWORD_LENGTH'])
+
+    # 以集合查詢找出已存在的帳號與 Email (依 chunk_size 分段，避免 IN 清單過長)。
+    # IN 比對依資料庫的 collation (MySQL 不分大小寫，可使用索引)，回傳的值與批次資料以 identity_key() 比對
+    existing_usernames = set()
+    existing_emails = set()
+    for chunk in chunked(candidates, chunk_size):
+        usernames = [row['username'] for _, row in chunk]
+        emails = [row['email'] for _, row in chunk]
+        for existing_username, existing_email in db.session.execute(
+            db.select(User.username, User.email).where(
+                User.username.in_(usernames) | User.email.in_(emails)
+            )
+        ):
+            existing_usernames.add(identity_key(existing_username))
+            existing_emails.add(identity_key(existing_email))
+
+    to_insert = []
+    for index, row in candidates:
+        if identity_key(row['username']) in existing_usernames:
+            results[index] = error_result(index, row['username'], "帳號已存在")
+        elif identity_key(row['email']) in existing_emails:
+            results[index] = error_result(index, row['username'], "電子郵件已存在")
+        else:
+            to_insert.append((index, row))
+
+    # 在開始雜湊之前拒絕無法在請求逾時前完成的批次，而不是中途逾時
+    budget = current_app.config['USERS_BULK_HASH_BUDGET_SECONDS']
+    estimate = hash_executor.estimate_many_seconds(len(to_insert))
+    if estimate > budget:
+        rows_within_budget = max(1, int(len(to_insert) * budget / estimate))
+        return jsonify({
+            "message": f"預估密碼雜湊需要 {estimate:.0f} 秒，超過單次匯入的上限 {budget:.0f} 秒，請分批匯入 (每批約 {rows_within_budget} 筆以內)",
+            "max_rows": rows_within_budget,
+        }), 413
+
+    try:
+        password_hashes = hash_executor.hash_many(row['password'] for _, row in to_insert)
+        for chunk in chunked(list(zip(to_insert, password_hashes)), chunk_size):
+            db.session.execute(db.insert(User), [
+                {
+                    'name': row['name'], 'username': row['username'], 'email': row['email'],
+                    'role': row['role'], 'password_hash': password_hash,
+                }
+                for (_, row), password_hash in chunk
+            ])
+        db.session.commit()
+    except HashingOverloadedError:
+        db.session.rollback()
+        raise # 交給 app 的 errorhandler 回應 503 + Retry-After
+    except IntegrityError as e:
+        # 檢查之後才新增的同名帳號，或 collation 視為相同但大小寫以外也不同的值 (例如重音符號)
+        db.session.rollback()
+        logger.warning("批次匯入的帳號或電子郵件與既有資料衝突", extra={"error": str(e.orig)})
+        return jsonify({"message": "帳號或電子郵件與既有使用者重複，所有資料皆未寫入，請修正後重新匯入", "error": str(e.orig)}), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("bulk_create_users 發生錯誤")
+        return jsonify({"message": "批次匯入使用者時發生伺服器內部錯誤，所有資料皆未寫入", "error": str(e)}), 500
+
+    created_ids = {}
+    for chunk in chunked([row['username'] for _, row in to_insert], chunk_size):
+        created_ids.update(db.session.execute(
+            db.select(User.username, User.id).where(User.username.in_(chunk))
+        ).all())
+
+    created_changes = {
+        created_ids[row['username']]: diff_changes({}, {field: row[field] for field in ('name', 'username', 'email', 'role')})
+        for _, row in to_insert if row['username'] in created_ids
+    }
+    audit_log.record_many('user.create', list(created_changes), changes_by_id=created_changes)
+    for index, row in to_insert:
+        results[index] = {"row": index, "username": row['username'], "status": "created", "id": created_ids.get(row['username'])}
+
+    # 通知信超過 USERS_BULK_NOTIFY_MAX 或郵件佇列放不下時整批不寄送 (不讓佇列滿載後逐筆丟棄)，並回報略過的筆數
+    notify = request.args.get('notify', 'true').lower() != 'false'
+    notified = 0
+    if notify:
+        notify_limit = current_app.config['USERS_BULK_NOTIFY_MAX']
+        free_slots = email_queue.free_slots() if email_queue.enabled else None
+        if free_slots is not None:
+            notify_limit = min(notify_limit, free_slots)
+        if len(to_insert) <= notify_limit:
+            notified = sum(
+                send_email(to=row['email'], subject='NAPP 系統：您的帳號已創建', template=f"帳號 {row['username']} 已創建。")
+                for _, row in to_insert
+            )
+        else:
+            logger.warning("批次匯入筆數超過通知上限，未寄送帳號建立通知",
+                           extra={"created_count": len(to_insert), "notify_limit": notify_limit})
+
+    logger.info("批次匯入完成", extra={"created_count": len(to_insert), "failed": len(rows) - len(to_insert)})
+    return jsonify({
+        "message": "批次匯入完成",
+        "created": len(to_insert),
+        "failed": len(rows) - len(to_insert),
+        "notified": notified,
+        "notifications_skipped": len(to_insert) - notified if notify else 0,
+        "results": [results[i] for i in range(len(rows))],
+    }), 200
+
+def _resolve_batch_targets(ids):
+    """
+    決定批次操作的對象，回傳 (存在的 id 列表, 不存在的 id 集合)。
+    ids 為 None 時改用與列表相同的查詢參數篩選 (必須至少有一個篩選條件，避免誤改全部使用者)。
+    數量超過 USERS_BATCH_MAX_IDS 時拋出 BatchTooLargeError。
+    """
+    max_ids = current_app.config['USERS_BATCH_MAX_IDS']
+    chunk_size = current_app.config['USERS_BULK_CHUNK_SIZE']
+    if ids is None:
+        filtered_query = _build_user_list_query()
+        if filtered_query.whereclause is None:
+            raise ValueError("請提供 ids 或至少一個篩選條件 (role、username、email、created_from、created_to)")
+        targets = db.session.scalars(
+            filtered_query.with_only_columns(User.id).order_by(User.id).limit(max_ids + 1)
+        ).all()
+        if len(targets) > max_ids:
+            raise BatchTooLargeError(f"符合條件的使用者超過單次上限 {max_ids} 筆，請縮小篩選範圍")
+        return list(targets), set()
+
+    if len(ids) > max_ids:
+        raise BatchTooLargeError(f"單次最多處理 {max_ids} 位使用者")
+    existing = set()
+    for chunk in chunked(ids, chunk_size):
+        existing.update(db.session.scalars(db.select(User.id).where(User.id.in_(chunk))))
+    return [i for i in ids if i in existing], set(ids) - existing
+
+def _deleted_changes(row):
+    """刪除事件的稽核內容：{欄位: [刪除前的值, None]}。"""
+    if not row:
+        return None
+    row = {field: value for field, value in row.items() if field != 'id'}
+    return diff_changes(row, dict.fromkeys(row))
+
+def _batch_response(message, action, results):
+    succeeded = sum(1 for r in results if r['status'] == action)
+    return jsonify({
+        "message": message,
+        action: succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }), 200
+
+# 3-2-2. 批次修改使用者 (需要管理員權限)
+# 兩種格式：
+#   {"updates": [{"id": 1, "name": "...", "email": "...", "role": "user"}, ...]}   逐筆修改
+#   {"ids": [1, 2, 3], "set": {"role": "user"}}                                    相同修改套用到多位使用者
+#   {"set": {"role": "user"}} 搭配查詢參數 (?role=admin&username=test_ 等) 篩選對象
+# Email 唯一性以一次集合查詢檢查；相同的修改內容合併為 UPDATE ... WHERE id IN (...)，
+# 全部在同一個交易中分段執行，回應包含每個 id 的處理結果。
+@users_bp.route('/batch', methods=['PATCH', 'OPTIONS'])
+@jwt_required()
+@admin_required()
+def batch_update_users():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "請求中未包含 JSON 資料"}), 400
+    try:
+        ids, shared_changes, per_id_changes, invalid = parse_batch_updates(data)
+        if per_id_changes is not None:
+            ids = list(per_id_changes)
+        targets, missing = _resolve_batch_targets(ids)
+    except BatchTooLargeError as e:
+        return jsonify({"message": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    chunk_size = current_app.config['USERS_BULK_CHUNK_SIZE']
+    results = {user_id: id_result(user_id, "error", message) for user_id, message in invalid.items()}
+    for user_id in missing:
+        results[user_id] = id_result(user_id, "not_found", "找不到使用者")
+    changes_by_id = per_id_changes if per_id_changes is not None else {user_id: shared_changes for user_id in targets}
+
+    # Email 唯一性：批次內重複，或已被其他使用者使用
+    email_owner = {}
+    for user_id in targets:
+        email = changes_by_id[user_id].get('email')
+        if email is None:
+            continue
+        if email in email_owner:
+            results[user_id] = id_result(user_id, "error", f"電子郵件與 id {email_owner[email]} 重複")
+        else:
+            email_owner[email] = user_id
+    for chunk in chunked(list(email_owner), chunk_size):
+        for owner_id, email in db.session.execute(db.select(User.id, User.email).where(User.email.in_(chunk))):
+            target_id = email_owner[email]
+            if owner_id != target_id and target_id not in results:
+                results[target_id] = id_result(target_id, "error", "電子郵件已存在")
+
+    to_update = [user_id for user_id in targets if user_id not in results]
+    # 修改內容相同的 id 合併成一條 UPDATE ... WHERE id IN (...)；只出現一次的修改依欄位組合以 executemany 執行
+    groups = {}
+    for user_id in to_update:
+        groups.setdefault(tuple(sorted(changes_by_id[user_id].items())), []).append(user_id)
+    singles = {}
+    try:
+        # 稽核紀錄需要修改前的值，在同一個交易中分段讀取
+        before = {}
+        if audit_log.enabled:
+            for chunk in chunked(to_update, chunk_size):
+                before.update((row.id, row._asdict()) for row in db.session.execute(
+                    db.select(User.id, User.name, User.email, User.role).where(User.id.in_(chunk))
+                ))
+        for changes, group_ids in groups.items():
+            if len(group_ids) == 1:
+                singles.setdefault(tuple(field for field, _ in changes), []).append((group_ids[0], dict(changes)))
+                continue
+            for chunk in chunked(group_ids, chunk_size):
+                db.session.execute(
+                    db.update(User).where(User.id.in_(chunk)).values(dict(changes))
+                    .execution_options(synchronize_session=False)
+                )
+        users_table = User.__table__
+        for fields, items in singles.items():
+            statement = (
+                db.update(users_table).where(users_table.c.id == db.bindparam('_id'))
+                .values({field: db.bindparam(f'_{field}') for field in fields})
+            )
+            for chunk in chunked(items, chunk_size):
+                db.session.execute(statement, [
+                    {'_id': user_id, **{f'_{field}': value for field, value in changes.items()}}
+                    for user_id, changes in chunk
+                ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("batch_update_users 發生錯誤")
+        return jsonify({"message": "批次修改使用者時發生伺服器內部錯誤，所有修改皆未寫入", "error": str(e)}), 500
+
+    for user_id in to_update:
+        results[user_id] = id_result(user_id, "updated")
+        if 'role' in changes_by_id[user_id]:
+            invalidate_user_role(user_id)
+    audit_log.record_many('user.update', to_update, changes_by_id={
+        user_id: diff_changes(before.get(user_id, {}), changes_by_id[user_id]) for user_id in to_update
+    })
+
+    # 依請求中的順序回傳結果
+    order = [item['id'] for item in data['updates']] if per_id_changes is not None else (ids if ids is not None else targets)
+    logger.info("批次修改使用者完成", extra={"updated": len(to_update), "failed": len(results) - len(to_update)})
+    return _batch_response("批次修改完成", "updated", [results[i] for i in dict.fromkeys(order)])
+
+# 3-2-3. 批次刪除使用者 (需要管理員權限)
+# {"ids": [1, 2, 3]}，或不帶 ids 而以查詢參數 (?role=user&created_to=... 等) 篩選對象。
+# 分段 DELETE ... WHERE id IN (...) 並在同一個交易中提交；目前登入的管理員不會被刪除。
+@users_bp.route('/batch', methods=['DELETE', 'OPTIONS'])
+@jwt_required()
+@admin_required()
+def batch_delete_users():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"message": "請求內容必須為 JSON 物件"}), 400
+    try:
+        ids = parse_batch_ids(data)
+        targets, missing = _resolve_batch_targets(ids)
+    except BatchTooLargeError as e:
+        return jsonify({"message": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    current_user = get_current_user()
+    results = {user_id: id_result(user_id, "not_found", "找不到使用者") for user_id in missing}
+    if current_user is not None and current_user.id in targets:
+        results[current_user.id] = id_result(current_user.id, "error", "無法刪除目前登入的帳號")
+    to_delete = [user_id for user_id in targets if user_id not in results]
+
+    chunk_size = current_app.config['USERS_BULK_CHUNK_SIZE']
+    deleted_rows = {}
+    try:
+        for chunk in chunked(to_delete, chunk_size):
+            if audit_log.enabled:
+                deleted_rows.update((row.id, row._asdict()) for row in db.session.execute(
+                    db.select(User.id, User.username, User.email, User.role).where(User.id.in_(chunk))
+                ))
+            # 資料庫的外鍵設定為 ON DELETE CASCADE；明確刪除讓未啟用外鍵檢查的資料庫 (SQLite) 結果一致
+            db.session.execute(db.delete(PasswordResetToken).where(PasswordResetToken.user_id.in_(chunk)))
+            db.session.execute(
+                db.delete(User).where(User.id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+            user_search_index.record_deletions(chunk)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("batch_delete_users 發生錯誤")
+        return jsonify({"message": "批次刪除使用者時發生伺服器內部錯誤，所有使用者皆未刪除", "error": str(e)}), 500
+
+    for user_id in to_delete:
+        results[user_id] = id_result(user_id, "deleted")
+        invalidate_user_role(user_id)
+        user_search_index.remove(user_id)
+        token_revocation.revoke_user(user_id) # 已刪除帳號的令牌立即失效
+    audit_log.record_many('user.delete', to_delete, changes_by_id={
+        user_id: _deleted_changes(deleted_rows.get(user_id)) for user_id in to_delete
+    })
+
+    logger.info("批次刪除使用者完成", extra={"deleted": len(to_delete), "failed": len(results) - len(to_delete)})
+    order = ids if ids is not None else targets
+    return _batch_response("批次刪除完成", "deleted", [results[i] for i in order])
+
 # 3-3. 獲取單一使用者資訊
 @users_bp.route('/<int:user_id>', methods=['GET', 'OPTIONS'])
 @jwt_required()
+@use_replica()
 @admin_required()
 def get_user(user_id):
-    print(f"--- Request received at GET /api/users/{user_id} (inside get_user function) ---")
-    user = User.query.get(user_id)
+    user = get_user_view(user_id) # 只查詢公開欄位，不建立 ORM 物件
     if not user:
         return jsonify({"message": "找不到使用者"}), 404
-    return jsonify(user.to_dict()), 200
+    # updated_at 只到秒，一併納入會回傳的欄位，避免同一秒內的修改被視為未變動
+    etag = make_etag('user', user.id, user.updated_at, user.name, user.email, user.role)
+    not_modified = conditional_response(etag, user.updated_at)
+    if not_modified is not None:
+        return not_modified
+    return add_validators(jsonify(user.to_dict()), etag, user.updated_at), 200
 
 # 3-3. 編輯使用者
 @users_bp.route('/<int:user_id>', methods=['PUT', 'OPTIONS']) # <--- 添加 OPTIONS
 @jwt_required()
 @admin_required()
 def update_user(user_id):
-    print(f"--- Request received at PUT /api/users/{user_id} (inside update_user function) ---")
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id) # 若為 admin_required 已載入的使用者，直接取自 identity map
     if not user:
         return jsonify({"message": "找不到使用者"}), 404
 
@@ -115,41 +661,43 @@ def update_user(user_id):
     if not data:
         return jsonify({"message": "請求中未包含 JSON 資料"}), 400
     
-    print(f"--- Attempting to update user ID: {user_id} with data: {data} ---")
+    logger.debug("更新使用者", extra={"user_id": user_id, "fields": sorted(data)})
     
     name = data.get('name')
     email = data.get('email')
     role = data.get('role')
 
+    before = {'name': user.name, 'email': user.email, 'role': user.role}
     try:
         if email and email != user.email:
             existing_user_email = User.query.filter(User.email == email, User.id != user_id).first()
             if existing_user_email:
                 return jsonify({"message": "電子郵件已存在"}), 409
             user.email = email
-            print(f"--- User ID: {user_id}, email WILL BE updated to: {email} ---")
 
         if name:
             user.name = name
-            print(f"--- User ID: {user_id}, name WILL BE updated to: {name} ---")
         if role:
             user.role = role
-            print(f"--- User ID: {user_id}, role WILL BE updated to: {role} ---")
         
         db.session.commit()
-        print(f"--- User {user.username} (ID: {user_id}) update committed to DB successfully. New name: {user.name} ---")
+        if role:
+            invalidate_user_role(user_id)
+        user_search_index.upsert_user(user)
+        changes = diff_changes(before, {'name': user.name, 'email': user.email, 'role': user.role})
+        if changes:
+            audit_log.record('user.update', user_id, changes)
+        logger.info("已更新使用者", extra={"user_id": user_id, "fields": [f for f in ('email', 'name', 'role') if data.get(f)]})
         return jsonify({"message": "使用者資訊更新成功", "user": user.to_dict()}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"--- ERROR in update_user for ID {user_id}: {e} ---")
-        # traceback.print_exc()
+        logger.exception("update_user 發生錯誤")
         return jsonify({"message": "更新使用者時發生伺服器內部錯誤", "error": str(e)}), 500
 
 # 4-1. 修改密碼
 @users_bp.route('/change-password', methods=['PUT', 'OPTIONS']) # <--- 添加 OPTIONS
 @jwt_required()
 def change_password_route(): 
-    print(f"--- Request received at PUT /api/users/change-password (inside change_password_route function) ---")
     data = request.get_json()
     if not data:
         return jsonify({"message": "請求中未包含 JSON 資料"}), 400
@@ -164,43 +712,45 @@ def change_password_route():
     try:
         current_user_id = int(current_user_id_str)
     except ValueError:
-        print(f"--- Invalid user identity in JWT for password change: {current_user_id_str} ---")
+        logger.warning("修改密碼時 JWT 身份無效", extra={"identity": current_user_id_str})
         return jsonify({"message": "無效的使用者身份"}), 422
 
-    user = User.query.get(current_user_id)
+    user = get_current_user()
 
     if not user:
-        print(f"--- User with ID {current_user_id} not found for password change ---")
+        logger.warning("修改密碼時找不到使用者", extra={"user_id": current_user_id})
         return jsonify({"message": "找不到使用者或認證失敗"}), 404
 
     if not hasattr(user, 'verify_password') or not callable(getattr(user, 'verify_password')): # <--- 修正為 verify_password
-         print(f"--- ERROR: User model is missing verify_password method for user {user.username} ---")
+         logger.error("User 模型缺少 verify_password 方法")
          return jsonify({"message": "伺服器配置錯誤：無法驗證密碼（開發者提示：User模型缺少verify_password）"}), 500
     
     if not user.verify_password(old_password): # <--- 修正為 verify_password
-        print(f"--- Old password incorrect for user {user.username} ---")
+        logger.info("修改密碼時舊密碼不正確", extra={"user_id": user.id})
         return jsonify({"message": "舊密碼不正確"}), 401
     
-    if len(new_password) < current_app.config.get('MIN_PASSWORD_LENGTH', 6):
-        return jsonify({"message": f"新密碼長度至少需要 {current_app.config.get('MIN_PASSWORD_LENGTH', 6)} 個字元"}), 400
+    if len(new_password) < current_app.config['MIN_PASSWORD_LENGTH']:
+        return jsonify({"message": f"新密碼長度至少需要 {current_app.config['MIN_PASSWORD_LENGTH']} 個字元"}), 400
 
     try:
-        print(f"--- Setting new password for user {user.username} ---")
         user.set_password(new_password) # <--- 使用 set_password 進行雜湊
         
         db.session.commit()
-        print(f"--- Password changed successfully for user {user.username} ---")
+        audit_log.record('password.change', user.id)
+        logger.info("使用者已修改密碼", extra={"user_id": user.id})
 
         try:
             send_email(to=user.email, subject='NAPP 系統：您的密碼已修改', template=f"您的密碼已成功修改。")
         except Exception as email_e:
-            print(f"--- Failed to send password change email to {user.email}: {email_e} ---")
+            logger.warning("密碼修改通知郵件排入失敗", extra={"to": user.email, "error": str(email_e)})
 
         return jsonify({"message": "密碼修改成功"}), 200
+    except HashingOverloadedError:
+        db.session.rollback()
+        raise # 交給 app 的 errorhandler 回應 503 + Retry-After
     except Exception as e:
         db.session.rollback()
-        print(f"--- ERROR in change_password_route for user {user.username}: {e} ---")
-        # traceback.print_exc()
+        logger.exception("change_password_route 發生錯誤")
         return jsonify({"message": "修改密碼時發生伺服器內部錯誤", "error": str(e)}), 500
 
 # 刪除使用者
@@ -208,19 +758,21 @@ def change_password_route():
 @jwt_required()
 @admin_required()
 def delete_user(user_id):
-    print(f"--- Request received at DELETE /api/users/{user_id} (inside delete_user function) ---")
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id) # 若為 admin_required 已載入的使用者，直接取自 identity map
     if not user:
         return jsonify({"message": "找不到使用者"}), 404
 
     try:
-        print(f"--- Deleting user {user.username} (ID: {user_id}) ---")
         db.session.delete(user)
+        user_search_index.record_deletions([user_id])
         db.session.commit()
-        print(f"--- User {user.username} (ID: {user_id}) deleted successfully ---")
+        invalidate_user_role(user_id)
+        user_search_index.remove(user_id)
+        token_revocation.revoke_user(user_id) # 已刪除帳號的令牌立即失效
+        audit_log.record('user.delete', user_id, _deleted_changes({'username': user.username, 'email': user.email, 'role': user.role}))
+        logger.info("已刪除使用者", extra={"user_id": user_id, "username": user.username})
         return jsonify({"message": "使用者刪除成功"}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"--- ERROR in delete_user for ID {user_id}: {e} ---")
-        # traceback.print_exc()
-        return jsonify({"message": "刪除使用者時發生伺服器內部錯誤", "
\ No newline at end of file
+        logger.exception("delete_user 發生錯誤")
+        return jsonify({"message": "刪除使用者時發生伺服器內部錯誤", "error": str(e)}), 500
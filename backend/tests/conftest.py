@@ -0,0 +1,90 @@
+# backend/tests/conftest.py
+#
+# 測試使用暫存目錄中的 SQLite 資料庫；設定在匯入 app 之前寫入環境變數 (Config 於匯入時讀取)。
+# 關閉背景執行緒 (搜尋索引、稽核紀錄、令牌清除) 與日誌緩衝，並使用低成本的密碼雜湊參數。
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix='napp-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_DB_DIR, 'test.db')
+os.environ.update({
+    'PASSWORD_HASH_METHOD': 'pbkdf2',
+    'PASSWORD_PBKDF2_ITERATIONS': '1000',
+    'EMAIL_BACKEND': 'memory',
+    'LOG_LEVEL': 'WARNING',
+    'LOG_BUFFERED': 'False',
+    'RESET_TOKEN_SWEEPER_ENABLED': 'False',
+    'USER_SEARCH_INDEX_ENABLED': 'False',
+    'AUDIT_LOG_ENABLED': 'False',
+    # 撤銷紀錄的同步執行緒不在測試期間輪詢 (測試直接呼叫 load / fetch_since)
+    'JWT_REVOCATION_SYNC_INTERVAL': '3600',
+})
+
+import pytest
+
+from app import create_app
+from models import db, User
+from utils.auth_decorators import role_cache
+from utils.rate_limiter import rate_limiter
+
+ADMIN_PASSWORD = 'admin123'
+
+
+@pytest.fixture(scope='session')
+def app():
+    # 擴充套件皆為模組層級的單例，整個測試只建立一次 app
+    return create_app()
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """每個測試使用全新的資料表與一位管理員 (id 1)。"""
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        admin = User(name='Default Admin', username='admin', email='admin@example.com', role='admin')
+        admin.password = ADMIN_PASSWORD
+        db.session.add(admin)
+        db.session.commit()
+        db.session.remove()
+    role_cache.clear()
+    rate_limiter.store.reset()
+    yield
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    def login(username='admin', password=ADMIN_PASSWORD):
+        response = client.post('/api/auth/login', json={'username': username, 'password': password})
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': 'Bearer ' + response.get_json()['token']}
+    return login
+
+
+@pytest.fixture
+def admin_headers(login):
+    return login()
+
+
+@pytest.fixture
+def make_users(app):
+    """直接寫入資料庫建立 count 位一般使用者，回傳其 id。"""
+    def make_users(count, prefix='user'):
+        with app.app_context():
+            users = [
+                User(name=f'User {i}', username=f'{prefix}{i:04d}', email=f'{prefix}{i:04d}@example.com',
+                     role='user', password_hash='x')
+                for i in range(count)
+            ]
+            db.session.add_all(users)
+            db.session.commit()
+            ids = [user.id for user in users]
+            db.session.remove()
+        return ids
+    return make_users
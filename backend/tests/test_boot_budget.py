@@ -0,0 +1,18 @@
+# backend/tests/test_boot_budget.py
+#
+# worker 啟動時間的回歸測試：在全新的子行程中量測 import app + create_app() 的中位數，
+# 不得超過 BOOT_BUDGET_MS (設為 0 時略過)。與 flask boot-profile 使用相同的量測。
+
+import pytest
+
+from utils.boot_profile import measure_boot
+
+
+def test_boot_time_is_within_budget(app):
+    budget_ms = app.config['BOOT_BUDGET_MS']
+    if not budget_ms:
+        pytest.skip("BOOT_BUDGET_MS=0：未設定啟動時間預算")
+    boot = measure_boot(repeat=3)
+    assert boot['total_ms'] <= budget_ms, (
+        f"啟動時間 {boot['total_ms']:.1f} ms 超過預算 {budget_ms:.0f} ms (各階段：{boot['phases']})"
+    )
@@ -0,0 +1,100 @@
+# backend/tests/test_bulk_import.py
+
+import pytest
+
+from models import User, db
+from utils.bulk_import import validate_import_rows
+from utils.hash_executor import hash_executor, HashingOverloadedError
+
+
+def _row(i, **fields):
+    row = {'name': f'Bulk {i}', 'username': f'bulk{i}', 'email': f'bulk{i}@example.com', 'password': 'secret123'}
+    row.update(fields)
+    return row
+
+
+def test_password_is_not_stripped():
+    valid, results = validate_import_rows([_row(0, password='  spaced  ', username=' bulk0 ')], 6)
+    assert results == {}
+    assert valid[0][1]['password'] == '  spaced  '
+    assert valid[0][1]['username'] == 'bulk0'
+
+
+def test_rows_follow_single_user_rules():
+    rows = [_row(0, password='short'), _row(1, role='owner'), _row(2, email=''), _row(3)]
+    valid, results = validate_import_rows(rows, 6)
+    assert [index for index, _ in valid] == [3]
+    assert '密碼長度' in results[0]['message']
+    assert '角色' in results[1]['message']
+    assert '必要欄位' in results[2]['message']
+
+
+def test_bulk_endpoint_imports_with_exact_password(app, client, admin_headers, login):
+    rows = [_row(0, password=' with spaces '), _row(1, password='123')]
+    response = client.post('/api/users/bulk?notify=false', json=rows, headers=admin_headers)
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['created'] == 1
+    assert body['results'][1]['status'] == 'error'
+    login('bulk0', ' with spaces ')
+
+
+def test_single_user_creation_enforces_min_length(client, admin_headers):
+    response = client.post('/api/users/', json=_row(0, password='123'), headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_bulk_endpoint_returns_503_when_hashing_is_overloaded(app, client, admin_headers, monkeypatch):
+    def overloaded(passwords, chunksize=16):
+        raise HashingOverloadedError(3)
+    monkeypatch.setattr(hash_executor, 'hash_many', overloaded)
+    response = client.post('/api/users/bulk?notify=false', json=[_row(0)], headers=admin_headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(User)).scalar() == 1
+
+
+def test_bulk_endpoint_rejects_batches_over_the_hashing_budget(app, client, admin_headers, monkeypatch):
+    monkeypatch.setattr(hash_executor, 'estimate_many_seconds', lambda count: count * 10.0)
+    monkeypatch.setattr(hash_executor, 'hash_many', lambda *args, **kwargs: pytest.fail("超過預算時不可開始雜湊"))
+    response = client.post('/api/users/bulk?notify=false', json=[_row(i) for i in range(4)], headers=admin_headers)
+    assert response.status_code == 413
+    assert response.get_json()['max_rows'] == 2 # 預算 20 秒
+
+
+def test_bulk_notifications_are_skipped_when_the_queue_cannot_hold_them(client, admin_headers, monkeypatch):
+    from utils.email_service import email_queue
+    sent = []
+    monkeypatch.setattr(email_queue, 'enabled', True)
+    monkeypatch.setattr(email_queue, 'free_slots', lambda: 2)
+    monkeypatch.setattr('routes.users.send_email', lambda **kwargs: sent.append(kwargs['to']) or True)
+
+    response = client.post('/api/users/bulk', json=[_row(i) for i in range(3)], headers=admin_headers)
+    body = response.get_json()
+    assert body['created'] == 3
+    assert body['notified'] == 0 and body['notifications_skipped'] == 3
+    assert sent == []
+
+    response = client.post('/api/users/bulk', json=[_row(i) for i in range(3, 5)], headers=admin_headers)
+    assert response.get_json()['notified'] == 2
+    assert len(sent) == 2
+
+
+def test_usernames_and_emails_differing_only_in_case_are_duplicates():
+    rows = [_row(0), _row(1, username='BULK0'), _row(2, email='Bulk0@Example.com')]
+    valid, results = validate_import_rows(rows, 6)
+    assert [index for index, _ in valid] == [0]
+    assert '帳號與第 0 列重複' in results[1]['message']
+    assert '電子郵件與第 0 列重複' in results[2]['message']
+
+
+def test_duplicate_key_from_the_database_is_reported_as_conflict(app, client, admin_headers):
+    # 模擬 MySQL 不分大小寫的唯一索引 (SQLite 的 IN 比對區分大小寫，衝突只會在 INSERT 時出現)
+    with app.app_context():
+        db.session.execute(db.text("CREATE UNIQUE INDEX uq_test_users_username_nocase ON users (lower(username))"))
+        db.session.commit()
+    response = client.post('/api/users/bulk?notify=false', json=[_row(0, username='ADMIN'), _row(1)], headers=admin_headers)
+    assert response.status_code == 409
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(User)).scalar() == 1
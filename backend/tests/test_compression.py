@@ -0,0 +1,73 @@
+# backend/tests/test_compression.py
+
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def large_list(make_users):
+    make_users(20) # 使用者列表超過 COMPRESSION_MIN_SIZE (1024 位元組)
+
+
+def _get(client, headers, path='/api/users/?limit=50', accept_encoding=None):
+    if accept_encoding is not None:
+        headers = {**headers, 'Accept-Encoding': accept_encoding}
+    return client.get(path, headers=headers)
+
+
+def test_gzip_response_decompresses_to_the_same_json(client, admin_headers, large_list):
+    plain = _get(client, admin_headers)
+    compressed = _get(client, admin_headers, accept_encoding='gzip')
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
+
+
+def test_client_q_values_take_precedence_over_server_preference(client, admin_headers, large_list):
+    pytest.importorskip('brotli')
+    response = _get(client, admin_headers, accept_encoding='br;q=0.5, gzip;q=1.0')
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_server_preference_breaks_ties(client, admin_headers, large_list):
+    zstandard = pytest.importorskip('zstandard')
+    response = _get(client, admin_headers, accept_encoding='gzip, br, zstd')
+    assert response.headers['Content-Encoding'] == 'zstd'
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(response.get_data())
+    assert len(json.loads(body)['users']) == 21
+
+
+@pytest.mark.parametrize('accept_encoding', ['identity', 'gzip;q=0', ''])
+def test_identity_is_not_compressed(client, admin_headers, large_list, accept_encoding):
+    response = _get(client, admin_headers, accept_encoding=accept_encoding)
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(response.get_json()['users']) == 21
+
+
+def test_small_responses_are_not_compressed(client, admin_headers):
+    response = _get(client, admin_headers, path='/api/users/1', accept_encoding='gzip')
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_export_is_compressed(client, admin_headers, make_users):
+    make_users(3)
+    response = _get(client, admin_headers, path='/api/users/export?format=ndjson', accept_encoding='gzip')
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    lines = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+    assert len(lines) == 4
+
+
+def test_not_modified_responses_are_not_compressed(client, admin_headers, large_list):
+    first = _get(client, admin_headers, accept_encoding='gzip')
+    headers = {**admin_headers, 'If-None-Match': first.headers['ETag']}
+    response = _get(client, headers, accept_encoding='gzip')
+    assert response.status_code == 304
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b''
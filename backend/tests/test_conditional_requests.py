@@ -0,0 +1,69 @@
+# backend/tests/test_conditional_requests.py
+
+import datetime
+from email.utils import format_datetime
+
+
+def test_user_list_returns_304_for_matching_etag(client, admin_headers, make_users):
+    make_users(3)
+    first = client.get('/api/users/', headers=admin_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert 'Last-Modified' not in first.headers
+
+    cached = client.get('/api/users/', headers={**admin_headers, 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+
+
+def test_user_list_ignores_if_modified_since_after_delete(client, admin_headers, make_users):
+    ids = make_users(3)
+    first = client.get('/api/users/', headers=admin_headers)
+    assert client.delete(f'/api/users/{ids[-1]}', headers=admin_headers).status_code == 200
+
+    # 刪除不會讓 max(updated_at) 變大：列表不能以 If-Modified-Since 判斷為未變動
+    future = format_datetime(datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1), usegmt=True)
+    response = client.get('/api/users/', headers={**admin_headers, 'If-Modified-Since': future})
+    assert response.status_code == 200
+    assert len(response.get_json()['users']) == 3
+
+    stale = client.get('/api/users/', headers={**admin_headers, 'If-None-Match': first.headers['ETag']})
+    assert stale.status_code == 200
+
+
+def test_single_user_honors_if_modified_since(client, admin_headers):
+    first = client.get('/api/users/1', headers=admin_headers)
+    assert first.status_code == 200
+    last_modified = first.headers['Last-Modified']
+
+    cached = client.get('/api/users/1', headers={**admin_headers, 'If-Modified-Since': last_modified})
+    assert cached.status_code == 304
+
+
+def test_user_list_etag_changes_on_same_second_edit(client, admin_headers, make_users):
+    ids = make_users(2)
+    first = client.get('/api/users/', headers=admin_headers)
+    # 同一秒內修改：count、max(updated_at)、max(id) 都可能不變
+    response = client.patch('/api/users/batch', headers=admin_headers,
+                            json={'updates': [{'id': ids[0], 'name': 'Renamed'}]})
+    assert response.status_code == 200
+    second = client.get('/api/users/', headers={**admin_headers, 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert 'Renamed' in [user['name'] for user in second.get_json()['users']]
+
+
+def test_table_version_is_bumped_by_orm_and_statement_writes(app, make_users):
+    from models import db, User
+    from utils.table_versions import current_version
+    with app.app_context():
+        before = current_version('users')
+        user = db.session.get(User, 1)
+        user.name = 'Changed'
+        db.session.commit()
+        assert current_version('users') == before + 1
+        db.session.execute(db.update(User).where(User.id == 1).values(name='Again'))
+        db.session.commit()
+        assert current_version('users') == before + 2
+        db.session.execute(db.update(User).where(User.id == 1).values(name='Rolled back'))
+        db.session.rollback()
+        assert current_version('users') == before + 2
@@ -0,0 +1,56 @@
+# backend/tests/test_db_routing.py
+
+import pytest
+from flask import g
+from sqlalchemy import create_engine, event, exc
+
+from models import db, User
+from utils.db_routing import replica_router
+
+
+@pytest.fixture
+def replica(app, monkeypatch):
+    """以同一個 SQLite 檔案的第二個 engine 模擬唯讀副本 (不啟動健康檢查執行緒)。"""
+    with app.app_context():
+        engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+        monkeypatch.setitem(db.engines, 'replica_0', engine)
+    monkeypatch.setattr(replica_router, 'db', db)
+    monkeypatch.setattr(replica_router, 'bind_keys', ['replica_0'])
+    monkeypatch.setattr(replica_router, '_healthy', {'replica_0': True})
+    monkeypatch.setattr(replica_router, 'retries', 0)
+    yield engine
+    engine.dispose()
+
+
+def test_get_bind_without_clause_keeps_replica_routing(app, replica):
+    with app.test_request_context('/api/users/'):
+        g.db_use_replica = True
+        assert db.session.get_bind().dialect.name == 'sqlite'
+        assert db.session.get_bind(clause=db.select(User.id)) is replica
+        assert g.db_replica_key == 'replica_0'
+        db.session.remove()
+
+
+def test_flush_switches_back_to_primary(app, replica):
+    with app.test_request_context('/api/users/'):
+        g.db_use_replica = True
+        db.session.add(User(name='N', username='n', email='n@example.com', password_hash='x'))
+        db.session.flush()
+        assert db.session.get_bind(clause=db.select(User.id)) is not replica
+        db.session.rollback()
+        db.session.remove()
+
+
+def test_user_list_retries_on_primary_when_replica_fails(client, admin_headers, make_users, replica):
+    make_users(2)
+
+    @event.listens_for(replica, 'before_cursor_execute')
+    def fail_page_query(conn, cursor, statement, parameters, context, executemany):
+        if 'LIMIT' in statement:
+            raise exc.OperationalError(statement, parameters, Exception('replica connection lost'))
+
+    response = client.get('/api/users/', headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['users']) == 3
+    assert replica_router.retries == 1
+    assert replica_router._healthy['replica_0'] is False
@@ -0,0 +1,116 @@
+# backend/tests/test_email_queue.py
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.email_service import EmailDeliveryError, EmailQueue, SMTPBackend
+
+
+class ExclusiveBackend:
+    """模擬單一 SMTP 連線：同一個實例被兩個執行緒同時使用時記錄錯誤。"""
+
+    instances = []
+
+    def __init__(self):
+        self.sent = []
+        self.errors = 0
+        self.threads = set()
+        self._busy = threading.Lock()
+        ExclusiveBackend.instances.append(self)
+
+    def send_messages(self, messages):
+        if not self._busy.acquire(blocking=False):
+            self.errors += 1
+            return
+        try:
+            self.threads.add(threading.get_ident())
+            time.sleep(0.005)
+            self.sent.extend(messages)
+        finally:
+            self._busy.release()
+
+    def close(self):
+        pass
+
+
+def test_each_worker_thread_has_its_own_backend():
+    ExclusiveBackend.instances = []
+    app = Flask(__name__)
+    app.config.update(
+        EMAIL_BACKEND=f'{__name__}:ExclusiveBackend',
+        EMAIL_QUEUE_WORKERS=4,
+        EMAIL_BATCH_SIZE=1,
+    )
+    email_queue = EmailQueue()
+    email_queue.init_app(app)
+    try:
+        for i in range(40):
+            assert email_queue.enqueue(f'message-{i}')
+        assert email_queue.flush(timeout=10)
+    finally:
+        email_queue.shutdown(timeout=1)
+
+    backends = ExclusiveBackend.instances
+    assert len(backends) == 4
+    assert sum(backend.errors for backend in backends) == 0
+    assert all(len(backend.threads) <= 1 for backend in backends)
+    assert sorted(m for backend in backends for m in backend.sent) == sorted(f'message-{i}' for i in range(40))
+
+
+class FlakyBackend:
+    """第一次寄送時在第 2 封之後中斷連線 (前 2 封已被伺服器接受)。"""
+
+    def __init__(self):
+        self.delivered = []
+        self.calls = 0
+
+    def send_messages(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            self.delivered.extend(messages[:2])
+            raise EmailDeliveryError(2, ConnectionResetError("連線中斷"))
+        self.delivered.extend(messages)
+
+    def close(self):
+        pass
+
+
+def test_retry_resends_only_undelivered_messages():
+    email_queue = EmailQueue()
+    email_queue.retry_backoff = 0
+    email_queue.max_retries = 2
+    backend = FlakyBackend()
+    email_queue._deliver([(f'message-{i}', time.monotonic()) for i in range(5)], backend)
+    assert backend.delivered == [f'message-{i}' for i in range(5)]
+    assert email_queue.sent == 5 and email_queue.failed == 0
+
+
+def test_smtp_backend_reports_messages_sent_before_failure(monkeypatch):
+    class Connection:
+        def __init__(self):
+            self.sent = []
+
+        def send(self, message):
+            if len(self.sent) == 3:
+                raise ConnectionResetError("連線中斷")
+            self.sent.append(message)
+
+    backend = SMTPBackend()
+    backend._connection = Connection()
+    backend._last_used = time.monotonic()
+    monkeypatch.setattr(backend, 'close', lambda: None)
+    with pytest.raises(EmailDeliveryError) as excinfo:
+        backend.send_messages(['a', 'b', 'c', 'd'])
+    assert excinfo.value.sent == 3
+
+
+def test_sync_sending_uses_the_configured_backend(app, monkeypatch):
+    from utils.email_service import email_queue, send_email
+    monkeypatch.setattr(email_queue, 'enabled', False)
+    with app.app_context():
+        assert send_email('someone@example.com', '主旨', '內容')
+    outbox = [message for backend in email_queue.sync_backends for message in backend.outbox]
+    assert [message.recipients for message in outbox][-1] == ['someone@example.com']
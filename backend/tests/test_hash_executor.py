@@ -0,0 +1,121 @@
+# backend/tests/test_hash_executor.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.hash_executor import HashExecutor, HashingOverloadedError
+
+
+def _executor_with_threads(workers=1, max_pending=1, timeout=0.05):
+    """以執行緒池取代行程池 (不需啟動子行程)，其餘行為與正式環境相同。"""
+    executor = HashExecutor()
+    executor.enabled = True
+    executor.workers = workers
+    executor.max_pending = max_pending
+    executor.timeout = timeout
+    executor._executor = ThreadPoolExecutor(max_workers=workers)
+    executor._slots = threading.BoundedSemaphore(max_pending)
+    executor._pid = os.getpid()
+    executor._hash_seconds = 1.0 # 固定的單次雜湊秒數：hash_many 一律使用 (執行緒) 池
+    return executor
+
+
+def test_timed_out_task_keeps_its_slot_until_it_finishes():
+    # 行程池還有空閒的 worker，只受 max_pending=1 限制
+    executor = _executor_with_threads(workers=2, max_pending=1)
+    release = threading.Event()
+    try:
+        with pytest.raises(HashingOverloadedError):
+            executor._submit(release.wait, 5) # 已開始執行，逾時後無法取消
+        # 仍在執行的工作佔用唯一的名額，新的工作立即被拒絕
+        with pytest.raises(HashingOverloadedError):
+            executor._submit(lambda: 'ok')
+        release.set()
+        executor._executor.shutdown(wait=True) # 等待原本的工作結束並歸還名額
+        executor._executor = ThreadPoolExecutor(max_workers=2)
+        assert executor._submit(lambda: 'ok') == 'ok'
+        assert executor.rejected == 2
+    finally:
+        release.set()
+        executor._executor.shutdown(wait=True)
+
+
+def test_completed_tasks_release_slots():
+    executor = _executor_with_threads(max_pending=2, timeout=5)
+    try:
+        assert [executor._submit(pow, 2, n) for n in range(10)] == [2 ** n for n in range(10)]
+        assert executor.completed == 10
+    finally:
+        executor._executor.shutdown(wait=True)
+
+
+def test_hash_many_hashes_small_batches_inline(monkeypatch):
+    executor = HashExecutor()
+    executor._hash_seconds = 0.001
+    monkeypatch.setattr(executor, '_get_executor', lambda: pytest.fail("小批次不需要建立行程池"))
+    hashes = executor.hash_many(['secret1', 'secret2'])
+    assert len(hashes) == 2 and hashes[0] != hashes[1]
+
+
+def test_hash_many_uses_pool_even_when_login_executor_disabled():
+    executor = _executor_with_threads(workers=2, max_pending=4, timeout=5)
+    executor.enabled = False
+    executor._hash_seconds = 0.2 # 20 個密碼依序計算需 4 秒
+    submitted = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(len(args[0]))
+            return super().submit(fn, *args)
+
+    executor._executor = RecordingPool(max_workers=2)
+    try:
+        assert len(executor.hash_many([f'password{i}' for i in range(20)], chunksize=5)) == 20
+        assert submitted == [5, 5, 5, 5]
+        assert executor.estimate_many_seconds(20) == pytest.approx(2.0)
+    finally:
+        executor._executor.shutdown(wait=True)
+
+
+def test_hash_many_leaves_slots_for_logins():
+    executor = _executor_with_threads(workers=4, max_pending=4, timeout=5)
+    in_flight = []
+    peak = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            future = super().submit(fn, *args)
+            future.add_done_callback(lambda _: in_flight.pop())
+            return future
+
+    executor._executor = CountingPool(max_workers=4)
+    try:
+        hashes = executor.hash_many([f'password{i}' for i in range(40)], chunksize=4)
+        assert len(hashes) == 40
+        assert max(peak) <= 2 # 最多佔用一半的名額
+        # 批次結束後所有名額都已歸還
+        assert all(executor._slots.acquire(blocking=False) for _ in range(4))
+    finally:
+        executor._executor.shutdown(wait=True)
+
+
+def test_broken_pool_is_reported_as_overload_and_recreated():
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        def submit(self, fn, *args):
+            raise BrokenProcessPool("worker 已終止")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    executor = _executor_with_threads()
+    executor._executor = BrokenPool()
+    with pytest.raises(HashingOverloadedError):
+        executor._submit(pow, 2, 2)
+    assert executor._executor is None and executor._pid is None
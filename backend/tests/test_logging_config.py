@@ -0,0 +1,44 @@
+# backend/tests/test_logging_config.py
+
+import io
+import json
+import logging
+
+from utils.logging_config import BufferedHandler, JsonFormatter
+
+
+def _buffered_json_logger(name):
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    handler = BufferedHandler(target)
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger, handler, stream
+
+
+def test_buffered_records_keep_exc_info_field():
+    logger, handler, stream = _buffered_json_logger('tests.buffered.exc')
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("處理 %s 失敗", 'request', extra={"user_id": 7})
+    handler.close()
+
+    payload = json.loads(stream.getvalue().strip())
+    assert payload['message'] == '處理 request 失敗'
+    assert payload['user_id'] == 7
+    assert 'ValueError: boom' in payload['exc_info']
+    assert 'Traceback' not in payload['message']
+
+
+def test_flush_does_not_stop_the_listener():
+    logger, handler, stream = _buffered_json_logger('tests.buffered.flush')
+    logger.info("first")
+    handler.flush()
+    logger.info("second")
+    handler.close()
+    messages = [json.loads(line)['message'] for line in stream.getvalue().splitlines()]
+    assert messages == ['first', 'second']
@@ -0,0 +1,82 @@
+# backend/tests/test_rate_limiter.py
+
+import time
+
+import pytest
+
+from utils.rate_limiter import MemoryStore, client_ip, parse_rate, rate_limiter
+
+
+def test_parse_rate():
+    assert parse_rate('5/60') == (5, 60.0)
+    assert parse_rate('') is None
+
+
+def test_sliding_window_blocks_then_recovers():
+    store = MemoryStore()
+    for _ in range(3):
+        assert store.hit('k', 3, 60, now=0)[0]
+    allowed, retry_after = store.hit('k', 3, 60, now=10)
+    assert not allowed and retry_after == 50
+    # 下一個視窗的前段仍以上一個視窗的計數加權：3 × 59/60 + 0 < 3，3 × 58/60 + 1 >= 3
+    assert store.hit('k', 3, 60, now=61)[0]
+    assert not store.hit('k', 3, 60, now=62)[0]
+    # 兩個視窗之後完全重新計算
+    assert store.hit('k', 3, 60, now=130)[0]
+
+
+def test_short_window_hits_do_not_evict_live_long_window_counters():
+    store = MemoryStore(max_keys=10)
+    for i in range(9):
+        store.hit(f'login_ip:10.0.0.{i}', 30, 60, now=0)
+    for _ in range(3):
+        assert store.hit('forgot_password_email:a@example.com', 3, 3600, now=0)[0]
+    # 超過 max_keys 時由 60 秒規則的請求觸發清除：只移除已到期的鍵，
+    # 3600 秒規則的計數仍在有效期內，不可被當成過期清掉
+    store.hit('login_ip:10.0.0.99', 30, 60, now=600)
+    assert len(store) == 2
+    assert not store.hit('forgot_password_email:a@example.com', 3, 3600, now=601)[0]
+
+
+def test_expired_keys_are_dropped():
+    store = MemoryStore(max_keys=100)
+    for i in range(50):
+        store.hit(f'old{i}', 5, 60, now=0)
+    store.hit('fresh', 5, 60, now=1000)
+    assert len(store) == 1
+
+
+def test_max_keys_is_enforced_with_live_keys():
+    store = MemoryStore(max_keys=100)
+    started = time.perf_counter()
+    for i in range(20000):
+        store.hit(f'login_ip:{i}', 30, 60, now=0)
+    assert len(store) == 100
+    assert time.perf_counter() - started < 2
+
+
+def test_login_is_rate_limited_per_username(app, client):
+    limit, _ = rate_limiter.rules['login_username']
+    for _ in range(limit):
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrong'})
+        assert response.status_code == 401
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'wrong'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+@pytest.mark.parametrize('hops, forwarded, expected', [
+    (1, 'spoofed, 203.0.113.7', '203.0.113.7'), # 用戶端自行填寫的位址在左邊
+    (2, 'spoofed, 203.0.113.7, 10.0.0.2', '203.0.113.7'),
+    (2, '203.0.113.7', '127.0.0.1'), # 少於代理層數：未經過全部代理
+])
+def test_client_ip_uses_the_address_appended_by_trusted_proxies(app, monkeypatch, hops, forwarded, expected):
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_TRUST_PROXY', True)
+    monkeypatch.setitem(app.config, 'RATE_LIMIT_PROXY_HOPS', hops)
+    with app.test_request_context(headers={'X-Forwarded-For': forwarded}, environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        assert client_ip() == expected
+
+
+def test_client_ip_ignores_forwarded_for_without_trusted_proxy(app):
+    with app.test_request_context(headers={'X-Forwarded-For': '203.0.113.7'}, environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        assert client_ip() == '127.0.0.1'
@@ -0,0 +1,93 @@
+# backend/tests/test_token_revocation.py
+
+import time
+
+from models import db, RevokedToken
+from utils.token_revocation import DatabaseRevocationStore, TokenRevocation, token_revocation
+
+
+def _login(client):
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _bearer(token):
+    return {'Authorization': 'Bearer ' + token}
+
+
+def test_logout_revokes_access_token(client):
+    tokens = _login(client)
+    assert client.post('/api/auth/logout', headers=_bearer(tokens['token'])).status_code == 200
+    assert client.get('/api/users/', headers=_bearer(tokens['token'])).status_code == 401
+
+
+def test_refresh_token_can_be_rotated_only_once(client):
+    tokens = _login(client)
+    first = client.post('/api/auth/refresh', headers=_bearer(tokens['refresh_token']))
+    assert first.status_code == 200
+    assert client.post('/api/auth/refresh', headers=_bearer(tokens['refresh_token'])).status_code == 401
+    assert client.post('/api/auth/refresh', headers=_bearer(first.get_json()['refresh_token'])).status_code == 200
+
+
+def test_exclusive_revocation_is_enforced_by_the_shared_store(app, client):
+    # 另一個 worker 剛撤銷、尚未同步到本行程：唯一索引讓第二次換發失敗
+    payload = {'jti': 'shared-jti', 'exp': int(time.time()) + 600}
+    with app.app_context():
+        other_worker = TokenRevocation()
+        other_worker.init_app(app)
+        assert other_worker.revoke_token(payload, exclusive=True)
+        assert not token_revocation.revoke_token(payload, exclusive=True)
+        assert token_revocation.is_revoked(payload)
+
+
+def test_new_worker_loads_revocations_from_database(app, client):
+    tokens = _login(client)
+    client.post('/api/auth/logout', headers=_bearer(tokens['token']))
+    with app.app_context():
+        recycled = TokenRevocation()
+        recycled.init_app(app)
+        row = db.session.execute(db.select(RevokedToken)).scalars().one()
+        assert recycled.is_revoked({'jti': row.subject, 'sub': '1', 'iat': int(time.time())})
+
+
+def test_fetch_since_returns_rows_published_after_subscribe(app):
+    with app.app_context():
+        store = DatabaseRevocationStore(app)
+        store.publish('jti', 'a', None, int(time.time()) + 600)
+        entries, last_id = store.fetch_since(0)
+        assert [entry['key'] for entry in entries] == ['a']
+        store.publish('user', '7', 100, int(time.time()) + 600)
+        entries, _ = store.fetch_since(last_id)
+        assert entries == [{'kind': 'user', 'key': '7', 'value': 100, 'exp': entries[0]['exp']}]
+
+
+def test_sweep_deletes_expired_rows(app):
+    with app.app_context():
+        store = DatabaseRevocationStore(app, sweep_batch_size=2)
+        for i in range(5):
+            store.publish('jti', f'old{i}', None, int(time.time()) - 1)
+        store.publish('jti', 'live', None, int(time.time()) + 600)
+        assert store.sweep() == 5
+        assert [entry['key'] for entry in store.load()] == ['live']
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.calls = []
+
+    def subscribe(self):
+        self.calls.append('subscribe')
+        return lambda callback: None
+
+    def load(self):
+        self.calls.append('load')
+        return []
+
+
+def test_subscribes_before_loading(app):
+    revocation = TokenRevocation()
+    revocation.init_app(app)
+    revocation.store = _RecordingStore()
+    revocation.is_revoked({'jti': 'x', 'sub': '1', 'iat': 0})
+    assert revocation.store.calls == ['subscribe', 'load']
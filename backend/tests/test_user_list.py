@@ -0,0 +1,86 @@
+# backend/tests/test_user_list.py
+
+import sqlite3
+
+from commands import create_missing_indexes
+from models import db
+from utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+import pytest
+
+
+def _all_pages(client, headers, query):
+    ids, cursor = [], None
+    while True:
+        url = f'/api/users/?{query}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        ids.extend(user['id'] for user in body['users'])
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            return ids
+        cursor = body['next_cursor']
+
+
+def test_default_page_is_limited(client, admin_headers, make_users):
+    make_users(60)
+    body = client.get('/api/users/', headers=admin_headers).get_json()
+    assert len(body['users']) == 50
+    assert body['has_more'] is True
+    assert 'total' not in body
+
+
+@pytest.mark.parametrize('query', [
+    'limit=7',
+    'limit=7&order=desc',
+    'limit=7&sort=username',
+    'limit=7&sort=created_at&order=desc',
+])
+def test_cursor_pages_cover_every_row_once(client, admin_headers, make_users, query):
+    expected = sorted([1] + make_users(23))
+    ids = _all_pages(client, admin_headers, query)
+    assert sorted(ids) == expected
+    assert len(ids) == len(set(ids))
+
+
+def test_filters_and_total(client, admin_headers, make_users):
+    make_users(5)
+    make_users(3, prefix='staff')
+    body = client.get('/api/users/?username=staff&include_total=true', headers=admin_headers).get_json()
+    assert [user['username'] for user in body['users']] == ['staff0000', 'staff0001', 'staff0002']
+    assert body['total'] == 3
+    assert client.get('/api/users/?role=owner', headers=admin_headers).status_code == 400
+
+
+def test_cursor_is_bound_to_sort_key():
+    cursor = encode_cursor('username', 'user0003', 4)
+    assert decode_cursor(cursor, 'username') == ('user0003', 4)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 'id')
+    with pytest.raises(InvalidCursorError):
+        decode_cursor('not-a-cursor', 'id')
+
+
+def test_create_missing_indexes_upgrades_existing_table(app, tmp_path):
+    # 舊版資料表 (沒有列表用的索引)
+    path = tmp_path / 'old.db'
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, username VARCHAR(255) NOT NULL UNIQUE, "
+        "email VARCHAR(255) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL, role VARCHAR(5) NOT NULL, "
+        "reset_token VARCHAR(255), reset_token_expires DATETIME, created_at DATETIME, updated_at DATETIME)"
+    )
+    connection.commit()
+    connection.close()
+
+    engine = db.create_engine(f'sqlite:///{path}')
+    with app.app_context():
+        original = db.engines[None]
+        db.engines[None] = engine
+        try:
+            created = create_missing_indexes()
+            assert ('users', 'idx_users_created_at_id') in created
+            assert ('users', 'idx_users_role_id') in created
+            assert create_missing_indexes() == [] # 可重複執行
+        finally:
+            db.engines[None] = original
+            engine.dispose()
@@ -0,0 +1,58 @@
+# backend/tests/test_user_search.py
+
+from models import db, UserDeletion
+from utils.user_search import UserSearchIndex, user_search_index
+
+
+def _other_worker_index(app):
+    """模擬另一個 worker 的索引 (不啟動背景執行緒，測試直接呼叫 rebuild / sync)。"""
+    index = UserSearchIndex()
+    index.app = app
+    index.enabled = True
+    with app.app_context():
+        index.rebuild()
+    return index
+
+
+def test_sync_removes_users_deleted_by_another_worker(app, client, admin_headers, make_users, monkeypatch):
+    monkeypatch.setattr(user_search_index, 'enabled', True)
+    ids = make_users(3, prefix='alice')
+    other = _other_worker_index(app)
+    assert len(other.search('alice', 10)) == 3
+
+    # 同一個同步間隔內一新增一刪除，筆數不變
+    make_users(1, prefix='bob')
+    assert client.delete(f'/api/users/{ids[0]}', headers=admin_headers).status_code == 200
+    with app.app_context():
+        other.sync()
+    assert sorted(other.search('alice', 10)) == ids[1:]
+    assert len(other.search('bob', 10)) == 1
+
+
+def test_batch_delete_records_deletions(app, client, admin_headers, make_users, monkeypatch):
+    monkeypatch.setattr(user_search_index, 'enabled', True)
+    ids = make_users(4)
+    other = _other_worker_index(app)
+    response = client.delete('/api/users/batch', headers=admin_headers, json={'ids': ids[:2]})
+    assert response.status_code == 200
+    with app.app_context():
+        other.sync()
+    assert sorted(other.search('user', 10)) == ids[2:]
+
+
+def test_deletions_are_not_recorded_when_index_disabled(app, client, admin_headers, make_users):
+    ids = make_users(1)
+    assert client.delete(f'/api/users/{ids[0]}', headers=admin_headers).status_code == 200
+    with app.app_context():
+        assert db.session.execute(db.select(db.func.count()).select_from(UserDeletion)).scalar() == 0
+
+
+def test_purge_keeps_recent_deletions(app):
+    with app.app_context():
+        index = _other_worker_index(app)
+        index.record_deletions([100, 101])
+        db.session.commit()
+        index.sync()
+        assert index.purge_deletions() == 0
+        index.deletion_retention = -60
+        assert index.purge_deletions() == 2
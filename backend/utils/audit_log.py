@@ -0,0 +1,248 @@
+# backend/utils/audit_log.py
+
+import atexit
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+
+from models import db, AuditEvent
+from utils.metrics import LatencyStats, register_metrics_source
+from utils.rate_limiter import client_ip
+
+logger = logging.getLogger(__name__)
+
+# 背景執行緒等待佇列時，每隔這麼多秒檢查一次是否正在結束
+_POLL_SECONDS = 0.25
+
+
+def _current_actor_id():
+    """目前請求的登入者 id；未登入 (例如重設密碼流程) 或不在請求中時回傳 None。"""
+    user = g.get('current_user') if has_request_context() else None
+    if user is not None:
+        return user.id
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        return None
+    try:
+        return int(identity) if identity is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def diff_changes(before, after):
+    """比較兩個欄位字典，回傳 {欄位: [舊值, 新值]} (只包含有變動的欄位)。"""
+    return {field: [before.get(field), value] for field, value in after.items() if before.get(field) != value}
+
+
+class AuditLog:
+    """
+    使用者管理操作的稽核紀錄 (audit_events 資料表，只新增不修改)，以 write-behind 方式寫入。
+
+    record() 只把事件放進有上限的佇列後立即返回，請求不會多一次 INSERT 與 commit；
+    背景執行緒累積到 batch_size 筆，或第一筆事件等待超過 flush_interval 秒時，
+    以一條多列 INSERT 寫入並提交。寫入失敗時以指數退避重試同一批，期間新事件繼續在佇列中累積；
+    佇列已滿時丟棄事件並把內容寫到日誌 (不阻塞請求)。行程結束時 (atexit) 先寫完佇列中的事件。
+    背景執行緒在第一次記錄時才啟動，fork 後的子行程會自行重啟。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.maxsize = 0
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.max_retries = 3
+        self.retry_backoff = 0.5
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.flush_latency = LatencyStats()
+        self.delivery_latency = LatencyStats()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('AUDIT_LOG_ENABLED', True)
+        self.maxsize = app.config.get('AUDIT_BUFFER_SIZE', 50000)
+        self.batch_size = app.config.get('AUDIT_FLUSH_BATCH_SIZE', 500)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', 1.0)
+        self.max_retries = app.config.get('AUDIT_FLUSH_MAX_RETRIES', 3)
+        self.retry_backoff = app.config.get('AUDIT_FLUSH_RETRY_BACKOFF', 0.5)
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        register_metrics_source('audit', self.stats)
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 之後父行程的執行緒不會存在於子行程，佇列也要重新建立
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def record(self, action, target_id=None, changes=None, actor_id=None):
+        """
+        記錄一筆事件 (請在資料庫 commit 成功後呼叫)，回傳是否成功排入佇列。
+
+        Args:
+            action (str): 事件種類，例如 'user.update'、'password.reset'。
+            target_id (int): 被操作的使用者 id。
+            changes (dict): 事件內容，修改時為 {欄位: [舊值, 新值]}；不可包含密碼或令牌。
+            actor_id (int): 操作者 id，預設為目前登入的使用者。
+        """
+        if not self.enabled:
+            return False
+        if actor_id is None:
+            actor_id = _current_actor_id()
+        return self._enqueue({
+            'created_at': datetime.datetime.now().replace(microsecond=0),
+            'actor_id': actor_id,
+            'action': action,
+            'target_id': target_id,
+            'ip': client_ip() if has_request_context() else None,
+            'changes': changes or None,
+        })
+
+    def record_many(self, action, target_ids, changes=None, changes_by_id=None, actor_id=None):
+        """批次操作：每個對象各記錄一筆事件 (可依對象查詢)，共用同一個操作者與時間。"""
+        if not self.enabled or not target_ids:
+            return 0
+        if actor_id is None:
+            actor_id = _current_actor_id()
+        now = datetime.datetime.now().replace(microsecond=0)
+        ip = client_ip() if has_request_context() else None
+        recorded = 0
+        for target_id in target_ids:
+            recorded += self._enqueue({
+                'created_at': now,
+                'actor_id': actor_id,
+                'action': action,
+                'target_id': target_id,
+                'ip': ip,
+                'changes': (changes_by_id or {}).get(target_id, changes) or None,
+            })
+        return recorded
+
+    def _enqueue(self, event):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((event, time.monotonic()))
+        except queue.Full:
+            self.dropped += 1
+            # 稽核事件不可無聲遺失：至少留在日誌中
+            logger.error("稽核紀錄佇列已滿，事件改寫入日誌", extra={"audit_event": event})
+            return False
+        self.recorded += 1
+        return True
+
+    def _next_batch(self):
+        """
+        等待第一筆事件，再持續收集到 batch_size 筆或第一筆事件已等待 flush_interval 秒為止；
+        每次最多等待 _POLL_SECONDS 秒後檢查是否正在結束，結束中只取出佇列中現有的事件。
+        """
+        batch = [self._queue.get(timeout=min(self.flush_interval, _POLL_SECONDS))]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, _POLL_SECONDS)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while not (self._stopping.is_set() and self._queue.empty()):
+                try:
+                    batch = self._next_batch()
+                except queue.Empty:
+                    continue
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        events = [event for event, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                # 一條多列 INSERT ... VALUES (...), (...) 並在同一個交易中提交
+                with db.engine.begin() as connection:
+                    connection.execute(db.insert(AuditEvent).values(events))
+            except Exception as e:
+                if attempt < self.max_retries and not self._stopping.is_set():
+                    self.retried += 1
+                    delay = self.retry_backoff * (2 ** attempt)
+                    logger.warning("寫入稽核紀錄失敗，稍後重試", extra={"count": len(events), "attempt": attempt + 1, "retry_in": delay, "error": str(e)})
+                    time.sleep(delay)
+                    continue
+                self.failed += len(events)
+                logger.error("寫入稽核紀錄失敗，事件改寫入日誌", extra={"count": len(events), "error": str(e), "audit_events": events})
+                return
+            finished = time.monotonic()
+            self.flush_latency.observe(finished - started)
+            for _, enqueued_at in batch:
+                self.delivery_latency.observe(finished - enqueued_at)
+            self.batches += 1
+            self.written += len(events)
+            return
+
+    def flush(self, timeout=10):
+        """等待佇列中的事件寫入 (最多 timeout 秒)，回傳佇列是否已清空。"""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def shutdown(self, timeout=10):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        # 設定 _stopping 後背景執行緒不再等待湊滿一批，直接寫完佇列中剩下的事件
+        self._stopping.set()
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "buffer_depth": self._queue.qsize() if self._queue is not None else 0,
+            "buffer_maxsize": self.maxsize,
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retried": self.retried,
+            "flush_latency": self.flush_latency.snapshot(),
+            "delivery_latency": self.delivery_latency.snapshot(),
+        }
+
+
+audit_log = AuditLog()
+atexit.register(audit_log.shutdown)
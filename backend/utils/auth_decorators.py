@@ -1,11 +1,108 @@
 # backend/utils/auth_decorators.py
 
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify # 導入 request 以便檢查 request.method
-from flask_jwt_extended import get_jwt_identity
+import logging
+import threading
+import time
+from flask import request, jsonify, g, current_app # 導入 request 以便檢查 request.method
+from flask_jwt_extended import get_jwt_identity, get_jwt
 # 假設 User 模型在 backend/models.py 中，並且 Python 的導入路徑已正確設定
 # 如果 models.py 與 utils 在同一 backend/ 目錄下，可以直接 from models import User
-from models import User
+from models import User, db
+
+logger = logging.getLogger(__name__)
+
+class RoleCache:
+    """
+    以 user id 為鍵的行程內 (process-level) TTL + LRU 角色快取。
+
+    只快取角色字串而非 ORM 物件 (ORM 物件綁定在各請求的 session 上)。
+    每個 worker 行程各有一份快取，update_user / delete_user 會呼叫 invalidate()
+    清除本行程的項目；其他行程最多在 TTL 秒後看到角色變更。
+    """
+
+    def __init__(self, ttl=30, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            role, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return role
+
+    def set(self, user_id, role):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (role, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+role_cache = RoleCache()
+
+def init_role_cache(app):
+    """依 app.config 設定角色快取的 TTL 與容量。"""
+    role_cache.ttl = app.config.get('ROLE_CACHE_TTL', 30)
+    role_cache.max_size = app.config.get('ROLE_CACHE_MAX_SIZE', 1024)
+    role_cache.clear()
+
+def invalidate_user_role(user_id):
+    """使用者角色變更或帳號刪除時呼叫，清除快取中的角色。"""
+    role_cache.invalidate(_normalize_user_id(user_id))
+
+def _normalize_user_id(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return user_id
+
+def get_current_user():
+    """
+    取得目前 JWT 身份對應的 User，並在同一個請求內重複使用 (存放在 flask.g)。
+    admin_required 若已載入過使用者，視圖函數呼叫此函數不會再查詢資料庫。
+    """
+    if 'current_user' not in g:
+        current_user_id = _normalize_user_id(get_jwt_identity())
+        g.current_user = db.session.get(User, current_user_id) if current_user_id is not None else None
+        if g.current_user is not None:
+            role_cache.set(g.current_user.id, g.current_user.role)
+    return g.current_user
+
+def _resolve_role(current_user_id):
+    """
+    依序從 JWT 角色 claim (若啟用)、行程內快取、資料庫取得使用者角色。
+    使用者不存在時回傳 None。
+    """
+    if current_app.config.get('JWT_ROLE_CLAIM_ENABLED'):
+        claim_role = get_jwt().get('role')
+        if claim_role:
+            return claim_role
+
+    cached_role = role_cache.get(current_user_id)
+    if cached_role is not None:
+        return cached_role
+
+    user = get_current_user()
+    return user.role if user else None
 
 def admin_required():
     """
@@ -41,16 +138,16 @@ def admin_required():
             if current_user_id is None:
                 # 這種情況理論上不應該發生，如果 @jwt_required() 正確工作的話。
                 # 但作為額外檢查。
-                print(f"--- Admin access DENIED: No JWT identity found after @jwt_required. This is unexpected. ---")
+                logger.error("admin_required 在 @jwt_required 之後仍取不到 JWT 身份")
                 return jsonify({"message": "未授權的訪問：缺少身份資訊"}), 401
 
-            user = User.query.get(current_user_id)
+            role = _resolve_role(_normalize_user_id(current_user_id))
 
-            if user and user.role == 'admin':
+            if role == 'admin':
                 return fn(*args, **kwargs)
             else:
-                user_role_for_log = user.role if user else "UserNotFoundInDB"
-                print(f"--- Admin access DENIED for user_id: {current_user_id}, role: {user_role_for_log}. Attempted to access: {request.endpoint} ---")
+                user_role_for_log = role if role else "UserNotFoundInDB"
+                logger.warning("拒絕非管理員存取", extra={"user_id": current_user_id, "role": user_role_for_log, "endpoint": request.endpoint})
                 return jsonify({"message": "無權限訪問，需要管理員權限"}), 403
         return decorator
     return wrapper
@@ -0,0 +1,87 @@
+# backend/utils/batch_users.py
+
+from utils.bulk_import import VALID_ROLES
+
+# 批次修改允許變更的欄位
+BATCH_UPDATE_FIELDS = ('name', 'email', 'role')
+
+
+class BatchTooLargeError(ValueError):
+    """批次處理的使用者數超過 USERS_BATCH_MAX_IDS。"""
+
+
+def parse_batch_ids(data):
+    """
+    取出請求中的 ids 列表 (去除重複並保留順序)；未提供時回傳 None。
+    格式錯誤時拋出 ValueError。
+    """
+    ids = data.get('ids')
+    if ids is None:
+        return None
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValueError("ids 必須為整數陣列")
+    return list(dict.fromkeys(ids))
+
+
+def clean_changes(changes, allow_email=True):
+    """
+    檢查並正規化單筆修改內容，回傳只包含有值欄位的 dict。
+    沒有任何可修改欄位或角色無效時拋出 ValueError。
+    """
+    if not isinstance(changes, dict):
+        raise ValueError("修改內容必須為 JSON 物件")
+    unknown = [k for k in changes if k not in BATCH_UPDATE_FIELDS and k != 'id']
+    if unknown:
+        raise ValueError(f"不支援修改的欄位：{', '.join(unknown)}")
+    cleaned = {}
+    for field in BATCH_UPDATE_FIELDS:
+        value = changes.get(field)
+        if value is None or str(value).strip() == '':
+            continue
+        cleaned[field] = str(value).strip()
+    if 'email' in cleaned and not allow_email:
+        raise ValueError("套用到多位使用者的相同修改不可包含 email (Email 必須唯一)")
+    if 'role' in cleaned and cleaned['role'] not in VALID_ROLES:
+        raise ValueError(f"無效的角色：{cleaned['role']}")
+    if not cleaned:
+        raise ValueError(f"請至少提供一個要修改的欄位：{', '.join(BATCH_UPDATE_FIELDS)}")
+    return cleaned
+
+
+def parse_batch_updates(data):
+    """
+    解析批次修改請求，回傳 (ids, 共同修改, 逐筆修改, 無效項目)，兩種格式擇一：
+    - {"updates": [{"id": 1, "name": ...}, ...]}：逐筆指定修改內容 (可修改 email)
+    - {"ids": [...], "set": {...}} 或只有 {"set": {...}} 搭配查詢參數篩選：同一份修改套用到所有使用者
+    逐筆修改中格式錯誤的項目不會拋出例外，而是以 {id: 錯誤訊息} 回傳於 invalid。
+    """
+    if 'updates' in data:
+        updates = data['updates']
+        if not isinstance(updates, list):
+            raise ValueError("updates 必須為陣列")
+        per_id = {}
+        invalid = {}
+        for item in updates:
+            user_id = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(user_id, int) or isinstance(user_id, bool):
+                raise ValueError("updates 的每一項都必須包含整數 id")
+            if user_id in per_id or user_id in invalid:
+                invalid[user_id] = "同一個 id 重複出現"
+                per_id.pop(user_id, None)
+                continue
+            try:
+                per_id[user_id] = clean_changes(item)
+            except ValueError as e:
+                invalid[user_id] = str(e)
+        return None, None, per_id, invalid
+
+    if 'set' not in data:
+        raise ValueError("請提供 updates，或 set 搭配 ids / 篩選條件")
+    return parse_batch_ids(data), clean_changes(data['set'], allow_email=False), None, {}
+
+
+def id_result(user_id, status, message=None):
+    result = {"id": user_id, "status": status}
+    if message:
+        result["message"] = message
+    return result
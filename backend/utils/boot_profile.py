@@ -0,0 +1,105 @@
+# backend/utils/boot_profile.py
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子行程中量測 import app 與 create_app() 的耗時，結果以標記開頭的一行 JSON 輸出 (避免與日誌混在一起)
+_RESULT_MARKER = '__BOOT_PROFILE__'
+_BOOT_SCRIPT = f"""
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+finished = time.perf_counter()
+print({_RESULT_MARKER!r} + json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (finished - imported) * 1000,
+    'phases': application.extensions['boot_timer'].phases,
+}}))
+"""
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+class BootTimer:
+    """記錄 create_app() 各階段的耗時 (毫秒)，存放在 app.extensions['boot_timer']，供 flask boot-profile 顯示。"""
+
+    def __init__(self):
+        self._last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        """記錄從上一個 mark (或建立計時器) 到現在的耗時。"""
+        now = time.perf_counter()
+        self.phases.append([phase, round((now - self._last) * 1000, 2)])
+        self._last = now
+
+
+def _run_boot(importtime=False):
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', _BOOT_SCRIPT]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(_RESULT_MARKER):
+            return json.loads(line[len(_RESULT_MARKER):]), completed.stderr
+    raise RuntimeError(f"啟動量測失敗 (exit {completed.returncode})：{completed.stderr.strip()[-2000:]}")
+
+
+def measure_boot(repeat=5):
+    """
+    在全新的子行程中執行 import app + create_app() repeat 次 (與 worker 啟動相同)，
+    回傳各次的中位數 (毫秒) 與最後一次的各階段耗時。
+    第一次執行前的 .pyc 編譯不計入：先執行一次暖機。
+    """
+    _run_boot()
+    runs = [_run_boot()[0] for _ in range(max(1, repeat))]
+    return {
+        'import_ms': round(statistics.median(r['import_ms'] for r in runs), 1),
+        'create_app_ms': round(statistics.median(r['create_app_ms'] for r in runs), 1),
+        'total_ms': round(statistics.median(r['import_ms'] + r['create_app_ms'] for r in runs), 1),
+        'runs': len(runs),
+        'phases': runs[-1]['phases'],
+    }
+
+
+def profile_imports(top=15):
+    """
+    以 python -X importtime 啟動一次，回傳：
+    - packages：依頂層套件加總的 import 耗時 (self time，毫秒)
+    - app_imports：app.py 直接匯入的各模組的累計耗時 (包含其間接匯入的套件)
+    -X importtime 本身有額外負擔，數字只用於比較相對大小。
+    """
+    _, stderr = _run_boot(importtime=True)
+    packages = {}
+    app_imports = []
+    app_depth = None
+    # importtime 以後序輸出 (子模組在父模組之前)，以縮排深度判斷 app 的直接子模組
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append((int(match.group(1)), int(match.group(2)), (len(match.group(3)) - 1) // 2, match.group(4)))
+    for self_us, cumulative_us, depth, name in entries:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+        if name == 'app':
+            app_depth = depth
+    if app_depth is not None:
+        app_index = next(i for i, entry in enumerate(entries) if entry[3] == 'app' and entry[2] == app_depth)
+        # app 的直接子模組是 app 之前、深度為 app_depth + 1 且尚未遇到更淺層模組的那一段
+        for self_us, cumulative_us, depth, name in reversed(entries[:app_index]):
+            if depth <= app_depth:
+                break
+            if depth == app_depth + 1:
+                app_imports.append((name, cumulative_us))
+    return {
+        'packages': [[name, round(us / 1000, 1)] for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]],
+        'app_imports': [[name, round(us / 1000, 1)] for name, us in sorted(app_imports, key=lambda item: -item[1])[:top]],
+    }
@@ -0,0 +1,99 @@
+# backend/utils/bulk_import.py
+
+import csv
+import io
+
+IMPORT_FIELDS = ('name', 'username', 'email', 'password', 'role')
+VALID_ROLES = ('admin', 'user')
+
+
+def read_import_rows(request):
+    """
+    從請求中讀出待匯入的使用者資料列 (dict 列表)。
+
+    支援三種格式：
+    - JSON 陣列：[{"name": ..., "username": ..., ...}, ...]
+    - JSON 物件：{"users": [...]}
+    - multipart 上傳的 CSV 檔案 (欄位名稱 file)，第一行為欄位名稱
+    格式錯誤時拋出 ValueError。
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        try:
+            text = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError("CSV 檔案必須為 UTF-8 編碼")
+        reader = csv.DictReader(io.StringIO(text))
+        missing = [f for f in IMPORT_FIELDS if f != 'role' and f not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV 缺少欄位：{', '.join(missing)}")
+        return [dict(row) for row in reader]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        raise ValueError("請提供使用者 JSON 陣列或上傳 CSV 檔案")
+    if not all(isinstance(row, dict) for row in data):
+        raise ValueError("使用者資料列必須為 JSON 物件")
+    return data
+
+
+def validate_new_user(name, username, email, password, role, min_password_length):
+    """
+    新增使用者 (單筆與批次匯入共用) 的欄位檢查，回傳錯誤訊息；通過時回傳 None。
+    密碼原樣使用，不去除前後空白。
+    """
+    if not all([name, username, email, password]):
+        return "請提供所有必要欄位：姓名、帳號、Email、密碼"
+    if role not in VALID_ROLES:
+        return f"無效的角色：{role}"
+    if len(password) < min_password_length:
+        return f"密碼長度至少需要 {min_password_length} 個字元"
+    return None
+
+
+def validate_import_rows(rows, min_password_length):
+    """
+    檢查必要欄位、角色、密碼長度與批次內重複的帳號 / Email (規則與單筆新增相同)。
+
+    回傳 (valid, results)：valid 為 (列號, 正規化後資料) 列表，
+    results 為 {列號: 錯誤結果}，只包含驗證失敗的資料列。
+    除了密碼以外的欄位都會去除前後空白。帳號與 Email 的重複以 identity_key() 比對 (不分大小寫)，
+    與 MySQL 預設 collation 的唯一索引一致。
+    """
+    valid = []
+    results = {}
+    seen_usernames = {}
+    seen_emails = {}
+    for index, row in enumerate(rows):
+        cleaned = {f: (str(row.get(f)).strip() if row.get(f) is not None else '') for f in IMPORT_FIELDS if f != 'password'}
+        cleaned['password'] = str(row.get('password')) if row.get('password') is not None else ''
+        cleaned['role'] = cleaned['role'] or 'user'
+        username = cleaned['username']
+        error = validate_new_user(cleaned['name'], username, cleaned['email'], cleaned['password'], cleaned['role'], min_password_length)
+        if error:
+            results[index] = error_result(index, username, error)
+        elif identity_key(username) in seen_usernames:
+            results[index] = error_result(index, username, f"帳號與第 {seen_usernames[identity_key(username)]} 列重複")
+        elif identity_key(cleaned['email']) in seen_emails:
+            results[index] = error_result(index, username, f"電子郵件與第 {seen_emails[identity_key(cleaned['email'])]} 列重複")
+        else:
+            seen_usernames[identity_key(username)] = index
+            seen_emails[identity_key(cleaned['email'])] = index
+            valid.append((index, cleaned))
+    return valid, results
+
+
+def identity_key(value):
+    """帳號 / Email 的比對鍵：不分大小寫 (MySQL 的 utf8mb4_unicode_ci 唯一索引視為相同)。"""
+    return value.casefold()
+
+
+def error_result(index, username, message):
+    return {"row": index, "username": username, "status": "error", "message": message}
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
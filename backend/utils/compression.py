@@ -0,0 +1,326 @@
+# backend/utils/compression.py
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from utils.metrics import register_metrics_source
+
+try:
+    import brotli
+except ImportError: # 選用套件，未安裝時不提供 br
+    brotli = None
+
+try:
+    import zstandard
+except ImportError: # 選用套件，未安裝時不提供 zstd
+    zstandard = None
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.finish()
+
+    def compressobj(self):
+        return _ZlibStream(zlib.compressobj(self.level, zlib.DEFLATED, 31)) # wbits=31：gzip 格式
+
+
+class _ZlibStream:
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, quality=5):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def compressobj(self):
+        return _BrotliStream(brotli.Compressor(quality=self.quality))
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level=3):
+        self.level = level
+        self._local = threading.local() # ZstdCompressor 不可在多個執行緒間同時使用
+
+    def _compressor(self):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor
+
+    def compress(self, data):
+        return self._compressor().compress(data)
+
+    def compressobj(self):
+        return _ZstdStream(zstandard.ZstdCompressor(level=self.level).compressobj())
+
+
+class _ZstdStream:
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_codecs(config):
+    """依設定建立已安裝套件的壓縮器：{Content-Encoding 名稱: codec}。"""
+    codecs = {'gzip': GzipCodec(config.get('COMPRESSION_GZIP_LEVEL', 6))}
+    if brotli is not None:
+        codecs['br'] = BrotliCodec(config.get('COMPRESSION_BROTLI_QUALITY', 5))
+    if zstandard is not None:
+        codecs['zstd'] = ZstdCodec(config.get('COMPRESSION_ZSTD_LEVEL', 3))
+    return codecs
+
+
+class CompressedBodyCache:
+    """
+    以 (ETag, 編碼, 內容長度, CRC32) 為鍵的壓縮結果 LRU 快取，總大小不超過 max_bytes。
+    CRC32 讓 ETag 相同但內容不同 (例如 ETag 未涵蓋的欄位已變動) 時不會取到錯誤的內容。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 4: # 單一內容不可佔用過多快取
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._items[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _EncodingStats:
+    __slots__ = ('responses', 'streamed', 'cache_hits', 'bytes_in', 'bytes_out', 'cpu_seconds')
+
+    def __init__(self):
+        self.responses = 0
+        self.streamed = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+
+class ResponseCompression:
+    """
+    依 Accept-Encoding 協商 zstd / br / gzip 壓縮回應內容 (after_request)。
+
+    - 只壓縮 200 回應、設定的 mimetype，且內容至少 min_size 位元組；串流回應 (匯出) 無法預知大小，一律壓縮
+    - 伺服器偏好順序為 COMPRESSION_ALGORITHMS (預設 zstd, br, gzip)，用戶端的 q 值優先；未安裝的套件自動略過
+    - 串流回應逐塊壓縮並在每塊之後 flush，用戶端可以邊下載邊解壓縮
+    - 帶 ETag 的回應把壓縮結果快取在行程內，內容相同的重複請求不必再次壓縮
+    - 依端點與編碼統計壓縮前後的位元組數與 CPU 時間 (/api/metrics/ 的 compression)
+    ETag 皆為弱 ETag (utils/conditional.py)，壓縮後的內容仍可用同一個 ETag 回應 304。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.min_size = 1024
+        self.mimetypes = frozenset()
+        self.codecs = {}
+        self.preference = []
+        self.cache = None
+        self.skipped_small = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESSION_ENABLED', True)
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.mimetypes = frozenset(app.config.get('COMPRESSION_MIMETYPES', ()))
+        self.codecs = available_codecs(app.config)
+        self.preference = [name for name in app.config.get('COMPRESSION_ALGORITHMS', ('zstd', 'br', 'gzip'))
+                           if name in self.codecs]
+        cache_bytes = app.config.get('COMPRESSION_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes else None
+        if not self.enabled or not self.preference:
+            return
+        app.after_request(self._after_request)
+        register_metrics_source('compression', self.stats)
+
+    def _negotiate(self):
+        accepted = request.accept_encodings
+        if not accepted:
+            return None
+        return accepted.best_match(self.preference)
+
+    def _after_request(self, response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough # send_file 等直接傳遞檔案的回應
+            or response.mimetype not in self.mimetypes
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+        # 是否壓縮取決於 Accept-Encoding，快取 (瀏覽器、代理) 需要以此區分
+        response.vary.add('Accept-Encoding')
+        if not response.is_streamed and response.calculate_content_length() < self.min_size:
+            self.skipped_small += 1
+            return response
+        encoding = self._negotiate()
+        if encoding is None:
+            return response
+
+        codec = self.codecs[encoding]
+        endpoint = request.endpoint or 'unmatched'
+        if response.is_streamed:
+            response.response = self._compress_stream(response.iter_encoded(), response.response, codec, endpoint)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            response.set_data(self._compress_body(body, codec, endpoint, response.headers.get('ETag')))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compress_body(self, body, codec, endpoint, etag):
+        key = (etag, codec.name, len(body), zlib.crc32(body)) if etag and self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._observe(endpoint, codec.name, len(body), len(cached), 0.0, cache_hit=True)
+                return cached
+        started = time.thread_time()
+        compressed = codec.compress(body)
+        self._observe(endpoint, codec.name, len(body), len(compressed), time.thread_time() - started)
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+    def _compress_stream(self, chunks, original, codec, endpoint):
+        compressor = codec.compressobj()
+        bytes_in = bytes_out = 0
+        cpu_seconds = 0.0
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                data = compressor.compress(chunk) + compressor.flush()
+                cpu_seconds += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(data)
+                yield data
+            started = time.thread_time()
+            data = compressor.finish()
+            cpu_seconds += time.thread_time() - started
+            bytes_out += len(data)
+            yield data
+        finally:
+            # 取代了 response.response，原本的 iterable (例如 stream_with_context) 由這裡關閉
+            close = getattr(original, 'close', None)
+            if close is not None:
+                close()
+            self._observe(endpoint, codec.name, bytes_in, bytes_out, cpu_seconds, streamed=True)
+
+    def _observe(self, endpoint, encoding, bytes_in, bytes_out, cpu_seconds, streamed=False, cache_hit=False):
+        with self._lock:
+            stats = self._stats.get((endpoint, encoding))
+            if stats is None:
+                stats = self._stats[(endpoint, encoding)] = _EncodingStats()
+            stats.responses += 1
+            stats.streamed += streamed
+            stats.cache_hits += cache_hit
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            stats.cpu_seconds += cpu_seconds
+
+    def stats(self):
+        """每個端點、每種編碼的壓縮效益：節省的位元組數、壓縮比，以及每節省 1 MB 花費的 CPU 毫秒數。"""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, encoding), stats in sorted(self._stats.items()):
+                saved = stats.bytes_in - stats.bytes_out
+                endpoints.setdefault(endpoint, {})[encoding] = {
+                    "responses": stats.responses,
+                    "streamed": stats.streamed,
+                    "cache_hits": stats.cache_hits,
+                    "bytes_in": stats.bytes_in,
+                    "bytes_out": stats.bytes_out,
+                    "bytes_saved": saved,
+                    "ratio": round(stats.bytes_out / stats.bytes_in, 4) if stats.bytes_in else None,
+                    "cpu_ms": round(stats.cpu_seconds * 1000, 3),
+                    "cpu_ms_per_mb_saved": round(stats.cpu_seconds * 1000 / (saved / 1048576), 3) if saved > 0 else None,
+                }
+        return {
+            "encodings": self.preference,
+            "min_size": self.min_size,
+            "skipped_small": self.skipped_small,
+            "cache_entries": len(self.cache) if self.cache is not None else 0,
+            "cache_bytes": self.cache.size if self.cache is not None else 0,
+            "endpoints": endpoints,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.skipped_small = 0
+
+
+response_compression = ResponseCompression()
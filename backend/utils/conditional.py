@@ -0,0 +1,57 @@
+# backend/utils/conditional.py
+
+import datetime
+import hashlib
+
+from flask import request, make_response
+
+
+def make_etag(*parts):
+    """
+    由版本資訊 (例如 updated_at、筆數) 產生弱 ETag。
+    使用弱 ETag (W/"...")：同一份內容經壓縮等轉換後仍視為相同版本。
+    """
+    digest = hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def to_http_datetime(value):
+    """
+    資料庫的 DATETIME 沒有時區資訊，一律視為 UTC；HTTP 日期只到秒，去除微秒。
+    updated_at 由資料庫的 NOW() 產生，MySQL 連線的 time_zone 不是 UTC 時 Last-Modified 會偏移該時差，
+    單筆資源的 If-Modified-Since 可能因此誤判；請讓資料庫以 UTC 運作 (例如 default-time-zone='+00:00')。
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    依 If-None-Match / If-Modified-Since 判斷用戶端快取是否仍有效。
+    兩者同時存在時只看 If-None-Match (RFC 7232 §6)。
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag.removeprefix('W/').strip('"'))
+    if request.if_modified_since and last_modified is not None:
+        return to_http_datetime(last_modified) <= request.if_modified_since
+    return False
+
+
+def conditional_response(etag, last_modified=None):
+    """快取仍有效時回傳 304 回應 (不含內容)，否則回傳 None 由呼叫端產生完整回應。"""
+    if not is_not_modified(etag, last_modified):
+        return None
+    response = make_response('', 304)
+    return add_validators(response, etag, last_modified)
+
+
+def add_validators(response, etag, last_modified=None):
+    """加上 ETag / Last-Modified，並要求用戶端每次使用快取前都先驗證 (輪詢時可取得 304)。"""
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.last_modified = to_http_datetime(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,45 @@
+# backend/utils/db_probe.py
+
+import logging
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def check_database(engine):
+    """
+    執行 SELECT 1 檢查資料庫是否可連線。
+    回傳 (是否成功, 錯誤訊息或 None)。
+    """
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def wait_for_database(engine, deadline=30.0, initial_delay=0.1, max_delay=2.0):
+    """
+    以指數退避 (0.1s, 0.2s, 0.4s ... 最多 max_delay) 探測資料庫，直到可連線或超過 deadline 秒。
+
+    Returns:
+        bool: 在期限內連線成功時為 True。
+    """
+    started = time.monotonic()
+    delay = initial_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        ok, error = check_database(engine)
+        if ok:
+            return True
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            logger.error("資料庫在期限內仍無法連線", extra={"deadline": deadline, "attempts": attempt, "error": str(error)})
+            return False
+        logger.warning("資料庫尚未就緒，稍後重試", extra={"attempt": attempt, "retry_in": round(min(delay, remaining), 1), "error": str(error)})
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
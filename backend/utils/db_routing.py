@@ -0,0 +1,245 @@
+# backend/utils/db_routing.py
+
+import itertools
+import logging
+import os
+import threading
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+
+from utils.metrics import register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+# config.py 以 replica_0、replica_1 ... 為 SQLALCHEMY_BINDS 的鍵建立副本的 engine
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+def _is_read(clause):
+    """只有一般的 SELECT 可以送往副本；SELECT ... FOR UPDATE、寫入、flush (clause 為 None) 與原始 SQL 一律視為寫入。"""
+    return (
+        clause is not None
+        and getattr(clause, 'is_select', False)
+        and getattr(clause, '_for_update_arg', None) is None
+    )
+
+
+class RoutingSession(Session):
+    """
+    依請求狀態選擇 engine 的 Session (models.py 的 db 使用此類別)。
+    只有標記為 use_replica() 的請求會把查詢送往副本，其餘 (包含背景執行緒與 CLI) 維持原本的主資料庫。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # 沒有 SQL 也不是 flush 的呼叫 (例如 get_bind().dialect) 使用主資料庫，且不影響之後的路由
+        if bind is None and has_app_context() and (clause is not None or self._flushing):
+            engine = replica_router.engine_for(clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_lag_seconds(connection):
+    """
+    回傳副本落後主資料庫的秒數；複寫已中斷時回傳 None。
+    MySQL 讀取 SHOW REPLICA STATUS (8.0.22 以前為 SHOW SLAVE STATUS，需要 REPLICATION CLIENT 權限)，
+    沒有複寫狀態 (不是副本) 或其他資料庫只確認可連線並視為沒有延遲。
+    """
+    if connection.dialect.name != 'mysql':
+        connection.execute(text('SELECT 1'))
+        return 0.0
+    try:
+        row = connection.execute(text('SHOW REPLICA STATUS')).mappings().first()
+        column = 'Seconds_Behind_Source'
+    except exc.DBAPIError:
+        row = connection.execute(text('SHOW SLAVE STATUS')).mappings().first()
+        column = 'Seconds_Behind_Master'
+    if row is None:
+        return 0.0
+    lag = row.get(column)
+    return float(lag) if lag is not None else None
+
+
+class ReplicaRouter:
+    """
+    唯讀副本的輪詢選擇與健康檢查。
+
+    - 標記為 use_replica() 的請求，第一個 SELECT 時以輪詢方式選一個健康的副本，同一請求後續的讀取都使用它
+    - 請求中出現任何寫入 (或 flush) 後，後續的查詢都回到主資料庫 (讀取自己剛寫入的資料)
+    - 背景執行緒每 check_interval 秒檢查副本可否連線與複寫延遲，延遲超過 max_lag 秒或連線失敗的副本暫停使用；
+      查詢時的連線錯誤也會立即把副本標記為不健康。沒有健康的副本時改用主資料庫
+    """
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.bind_keys = []
+        self.max_lag = 5.0
+        self.check_interval = 5.0
+        self._healthy = {}
+        self._lag = {}
+        self._errors = {}
+        self._counter = itertools.count()
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.retries = 0
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.bind_keys = sorted(key for key in (app.config.get('SQLALCHEMY_BINDS') or {})
+                                if key.startswith(REPLICA_BIND_PREFIX))
+        self.max_lag = app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5.0)
+        self.check_interval = app.config.get('DB_REPLICA_CHECK_INTERVAL', 5.0)
+        # 第一次健康檢查完成前先假設可用，連線失敗時會立即標記
+        self._healthy = dict.fromkeys(self.bind_keys, True)
+        self._lag = dict.fromkeys(self.bind_keys)
+        self._errors = dict.fromkeys(self.bind_keys)
+        if not self.bind_keys:
+            return
+        with app.app_context():
+            for key in self.bind_keys:
+                # 查詢時的連線錯誤立即標記副本為不健康，不必等下一次健康檢查
+                event.listen(db.engines[key], 'handle_error', self._error_listener(key))
+        register_metrics_source('db_replicas', self.stats)
+        app.before_request(self.ensure_started)
+
+    @property
+    def enabled(self):
+        return bool(self.bind_keys)
+
+    # ---- 請求中的路由 ----
+
+    def engine_for(self, clause):
+        """回傳這次查詢要使用的副本 engine；應使用主資料庫時回傳 None。"""
+        if not g.get('db_use_replica'):
+            return None
+        if not _is_read(clause):
+            g.db_use_replica = False # 寫入後同一請求的讀取都回到主資料庫
+            return None
+        key = g.get('db_replica_key')
+        if key is None:
+            key = self._choose()
+            if key is None:
+                g.db_use_replica = False
+                return None
+            g.db_replica_key = key
+        return self.db.engines[key]
+
+    def _choose(self):
+        healthy = [key for key in self.bind_keys if self._healthy.get(key)]
+        if not healthy:
+            self.primary_fallbacks += 1
+            return None
+        self.replica_reads += 1
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_unhealthy(self, key, error):
+        if self._healthy.get(key):
+            logger.warning("唯讀副本無法使用，暫時改用其他副本或主資料庫", extra={"replica": key, "error": str(error)})
+        self._healthy[key] = False
+        self._errors[key] = str(error)
+
+    # ---- 健康檢查 ----
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            threading.Thread(target=self._run, name='db-replica-checker', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _error_listener(self, key):
+        def on_error(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                self.mark_unhealthy(key, context.original_exception)
+        return on_error
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                for key in self.bind_keys:
+                    self.check(key)
+                if self._stopping.wait(self.check_interval):
+                    break
+
+    def check(self, key):
+        try:
+            with self.db.engines[key].connect() as connection:
+                lag = replica_lag_seconds(connection)
+        except Exception as e:
+            self._lag[key] = None
+            self.mark_unhealthy(key, e)
+            return
+        self._lag[key] = lag
+        if lag is None or lag > self.max_lag:
+            self.mark_unhealthy(key, "複寫已中斷" if lag is None else f"複寫延遲 {lag:.0f} 秒")
+            return
+        if not self._healthy.get(key):
+            logger.info("唯讀副本已恢復", extra={"replica": key, "lag_seconds": lag})
+        self._healthy[key] = True
+        self._errors[key] = None
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self):
+        return {
+            "replicas": {
+                key: {"healthy": self._healthy.get(key), "lag_seconds": self._lag.get(key), "error": self._errors.get(key)}
+                for key in self.bind_keys
+            },
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+            "retries": self.retries,
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+def is_replica_error(error):
+    """
+    查詢副本時的連線錯誤。視圖以 except Exception 回應 500 時，先以此判斷並重新拋出，
+    讓 use_replica() 把副本標記為不健康後改用主資料庫重試。
+    """
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError)) and g.get('db_replica_key') is not None
+
+
+def use_replica():
+    """
+    唯讀端點的裝飾器：請求中的查詢送往唯讀副本 (未設定副本時沒有作用)。
+    標記存放在 flask.g，持續到請求結束 (包含 stream_with_context 的串流回應)。
+    放在 admin_required 之前 (外層)，admin_required 查詢目前使用者也會使用副本。
+    副本在查詢時斷線且錯誤未被視圖攔截 (見 is_replica_error) 時，把副本標記為不健康後改用主資料庫重新執行一次。
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if not replica_router.enabled or request.method == 'OPTIONS':
+                return fn(*args, **kwargs)
+            g.db_use_replica = True
+            try:
+                return fn(*args, **kwargs)
+            except (exc.OperationalError, exc.InterfaceError) as e:
+                key = g.pop('db_replica_key', None)
+                if key is None:
+                    raise
+                replica_router.mark_unhealthy(key, e)
+                replica_router.retries += 1
+                replica_router.db.session.rollback()
+                g.pop('current_user', None)
+                g.db_use_replica = False
+                return fn(*args, **kwargs)
+        return decorator
+    return wrapper
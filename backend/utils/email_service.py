@@ -1,35 +1,370 @@
 # backend/utils/email_service.py
 
-from flask_mail import Mail, Message
+import atexit
+import importlib
+import logging
+import os
+import queue
+import threading
+import time
+
 from flask import current_app
 
-# 初始化 Flask-Mail 實例，但不在這裡綁定 Flask app
-mail = Mail()
+from utils.metrics import LatencyStats, register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+# Flask-Mail (連同 smtplib 與 email 套件) 在第一次寄信時才匯入並綁定 app，不佔用 worker 的啟動時間
+_mail = None
+_mail_lock = threading.Lock()
+
+
+def get_mail():
+    """回傳已綁定目前 app 的 Flask-Mail 實例 (第一次呼叫時才匯入 Flask-Mail)。"""
+    global _mail
+    app = current_app._get_current_object()
+    if _mail is None or 'mail' not in app.extensions:
+        with _mail_lock:
+            if _mail is None:
+                from flask_mail import Mail
+                _mail = Mail()
+            if 'mail' not in app.extensions:
+                _mail.init_app(app)
+    return _mail
+
+
+class EmailDeliveryError(Exception):
+    """
+    後端在寄出一部分郵件後失敗：sent 為已被伺服器接受的封數 (依序為 messages 的前 sent 封)，
+    重試時只重送其餘的郵件，收件人不會重複收到。
+    其他例外視為整批都未寄出。
+    """
+
+    def __init__(self, sent, error):
+        super().__init__(str(error))
+        self.sent = sent
+        self.error = error
+
+
+class SMTPBackend:
+    """
+    透過 Flask-Mail 發送郵件，並在多批郵件之間保持同一條 SMTP 連線。
+    連線閒置超過 idle_timeout 秒後關閉，下次發送時再重新建立。
+    一個實例只有一條連線，不可在多個執行緒間共用；EmailQueue 為每個寄送執行緒各建立一個後端。
+    後端的 send_messages(messages) 依序寄送，中途失敗時拋出 EmailDeliveryError 告知已寄出的封數。
+    """
+
+    def __init__(self, idle_timeout=60):
+        self.idle_timeout = idle_timeout
+        self._connection = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        connection = get_mail().connect()
+        connection.__enter__()
+        self._connection = connection
+
+    def send_messages(self, messages):
+        if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        sent = 0
+        try:
+            if self._connection is None:
+                self._connect()
+            for message in messages:
+                self._connection.send(message)
+                sent += 1
+        except Exception as e:
+            # 連線可能已被伺服器中斷，丟棄後由呼叫端重試尚未寄出的郵件
+            self.close()
+            raise EmailDeliveryError(sent, e) from e
+        self._last_used = time.monotonic()
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+
+class MemoryBackend:
+    """把郵件存在記憶體中而不實際寄出，用於測試與本地開發。"""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send_messages(self, messages):
+        self.outbox.extend(messages)
+
+    def close(self):
+        pass
+
+
+class ConsoleBackend:
+    """把郵件內容印到標準輸出而不實際寄出。"""
+
+    def send_messages(self, messages):
+        for message in messages:
+            logger.info("[ConsoleBackend] 郵件", extra={"to": message.recipients, "subject": message.subject})
+
+    def close(self):
+        pass
+
+
+EMAIL_BACKENDS = {
+    'smtp': SMTPBackend,
+    'memory': MemoryBackend,
+    'console': ConsoleBackend,
+}
+
+
+def resolve_email_backend(name):
+    """
+    依名稱取得郵件後端類別：'smtp'、'memory'、'console'，
+    或以 'package.module:ClassName' 指定自訂類別 (需實作 send_messages / close)。
+    """
+    if name in EMAIL_BACKENDS:
+        return EMAIL_BACKENDS[name]
+    module_name, _, class_name = name.partition(':')
+    if not class_name:
+        raise ValueError(f"未知的郵件後端：{name}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_email_backend(name):
+    """依名稱建立郵件後端實例。"""
+    return resolve_email_backend(name)()
+
+
+class EmailQueue:
+    """
+    背景郵件寄送佇列。
+
+    send_email() 只把訊息放進有上限的佇列後立即返回，由背景執行緒批次取出，
+    透過可替換的後端 (預設為保持連線的 SMTPBackend) 寄送，失敗時以指數退避重試。
+    每個寄送執行緒各自擁有一個後端實例 (一條 SMTP 連線)，多個執行緒不會在同一條連線上交錯送出 SMTP 指令。
+    背景執行緒在第一次寄信時才啟動 (並在 fork 後的子行程中重新啟動)，
+    因此可以安全地搭配 gunicorn --preload 等 pre-fork 伺服器。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.backend_name = None
+        self.backend_class = None
+        self.backends = []
+        self.sync_backends = [] # EMAIL_ASYNC=False 時各請求執行緒的後端
+        self._local = threading.local()
+        self.maxsize = 0
+        self._queue = None
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.send_latency = LatencyStats()
+        self.delivery_latency = LatencyStats()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('EMAIL_ASYNC', True)
+        self.backend_name = app.config.get('EMAIL_BACKEND', 'smtp')
+        self.maxsize = app.config.get('EMAIL_QUEUE_MAXSIZE', 1000)
+        self.workers = app.config.get('EMAIL_QUEUE_WORKERS', 1)
+        self.batch_size = app.config.get('EMAIL_BATCH_SIZE', 20)
+        self.max_retries = app.config.get('EMAIL_MAX_RETRIES', 3)
+        self.retry_backoff = app.config.get('EMAIL_RETRY_BACKOFF', 2.0)
+        # 在這裡先解析後端類別，設定錯誤時啟動即失敗；實例由各寄送執行緒各自建立
+        self.backend_class = resolve_email_backend(self.backend_name)
+        self._local = threading.local()
+        self.sync_backends = []
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        register_metrics_source('email', self.stats)
+
+    def _ensure_workers(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork 之後父行程的執行緒不會存在於子行程，佇列也要重新建立
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._stopping.clear()
+            self._threads = []
+            self.backends = []
+            for i in range(self.workers):
+                backend = self.backend_class()
+                thread = threading.Thread(target=self._run, args=(backend,), name=f'email-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+                self.backends.append(backend)
+            self._pid = os.getpid()
+
+    def enqueue(self, message):
+        """將訊息放入佇列；佇列已滿時回傳 False 而不阻塞請求。"""
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((message, time.monotonic()))
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def free_slots(self):
+        """佇列剩餘的空間 (未限制大小時回傳 None)，供批次寄送在排入前判斷是否放得下。"""
+        if self.maxsize <= 0:
+            return None
+        self._ensure_workers()
+        return max(0, self.maxsize - self._queue.qsize())
+
+    def _next_batch(self):
+        item = self._queue.get(timeout=1)
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, backend):
+        with self.app.app_context():
+            while not (self._stopping.is_set() and self._queue.empty()):
+                try:
+                    batch = self._next_batch()
+                except queue.Empty:
+                    continue
+                self._deliver(batch, backend)
+                for _ in batch:
+                    self._queue.task_done()
+            backend.close()
+
+    def _delivered(self, items, started):
+        finished = time.monotonic()
+        self.send_latency.observe(finished - started)
+        for _, enqueued_at in items:
+            self.delivery_latency.observe(finished - enqueued_at)
+        self.sent += len(items)
+
+    def _deliver(self, batch, backend):
+        remaining = list(batch)
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                backend.send_messages([message for message, _ in remaining])
+            except Exception as e:
+                # 已被伺服器接受的郵件不再重送，只重試其餘的
+                sent = e.sent if isinstance(e, EmailDeliveryError) else 0
+                if sent:
+                    self._delivered(remaining[:sent], started)
+                    remaining = remaining[sent:]
+                if attempt < self.max_retries:
+                    self.retried += 1
+                    delay = self.retry_backoff * (2 ** attempt)
+                    logger.warning("批次寄送郵件失敗，稍後重試", extra={"count": len(remaining), "attempt": attempt + 1, "retry_in": delay, "error": str(e)})
+                    time.sleep(delay)
+                    continue
+                self.failed += len(remaining)
+                logger.error("批次寄送郵件失敗，已放棄", extra={"count": len(remaining), "error": str(e)})
+                return
+            self._delivered(remaining, started)
+            return
+
+    def send_now(self, message):
+        """
+        在目前執行緒中以設定的後端同步寄出一封郵件 (EMAIL_ASYNC=False)，失敗時拋出例外。
+        每個請求執行緒各自保有一個後端實例 (SMTPBackend 在閒置逾時前重複使用連線)。
+        """
+        backend = getattr(self._local, 'backend', None)
+        if backend is None or self._local.pid != os.getpid():
+            backend = self._local.backend = self.backend_class()
+            self._local.pid = os.getpid()
+            with self._lock:
+                self.sync_backends.append(backend)
+        started = time.monotonic()
+        backend.send_messages([message])
+        self.send_latency.observe(time.monotonic() - started)
+        self.sent += 1
+
+    def flush(self, timeout=10):
+        """等待佇列中的郵件寄出 (最多 timeout 秒)，回傳佇列是否已清空。"""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def shutdown(self, timeout=10):
+        self.flush(timeout)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        for backend in self.sync_backends:
+            backend.close()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend_name,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_maxsize": self.maxsize,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "send_latency": self.send_latency.snapshot(),
+            "delivery_latency": self.delivery_latency.snapshot(),
+        }
+
+
+email_queue = EmailQueue()
+atexit.register(email_queue.shutdown)
+
+
+def init_email(app):
+    """初始化背景郵件佇列 (Flask-Mail 與 SMTP 連線在第一次寄信時才建立)。"""
+    email_queue.init_app(app)
+
 
 def send_email(to, subject, template):
     """
     發送電子郵件的通用函數。
 
+    啟用 EMAIL_ASYNC (預設) 時只把郵件放入背景佇列並立即返回，
+    回傳值表示是否成功排入佇列；停用時同步寄送，回傳值表示是否寄送成功。
+
     Args:
         to (str): 收件人的電子郵件地址。
         subject (str): 郵件主題。
         template (str): 郵件內容 (HTML 或純文字)。
     """
     try:
-        with current_app.app_context(): # 確保在應用程式上下文中發送郵件
-            # 創建郵件訊息物件
-            msg = Message(
-                subject,
-                sender=current_app.config['MAIL_DEFAULT_SENDER'],
-                recipients=[to]
-            )
-            msg.html = template
-
-            # 發送郵件
-            mail.send(msg)
-            print(f"郵件已成功發送至 {to}")
-            return True
+        from flask_mail import Message
+
+        # 創建郵件訊息物件
+        msg = Message(
+            subject,
+            sender=current_app.config['MAIL_DEFAULT_SENDER'],
+            recipients=[to]
+        )
+        msg.html = template
+
+        if email_queue.enabled:
+            if email_queue.enqueue(msg):
+                return True
+            logger.error("郵件佇列已滿，無法排入郵件", extra={"to": to})
+            return False
+
+        # 同步寄送，與佇列使用相同的 EMAIL_BACKEND
+        email_queue.send_now(msg)
+        logger.info("郵件已發送", extra={"to": to})
+        return True
     except Exception as e:
-        print(f"發送郵件至 {to} 失敗: {e}")
+        logger.exception("發送郵件失敗", extra={"to": to})
         return False
-
@@ -0,0 +1,244 @@
+# backend/utils/hash_executor.py
+
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from utils.metrics import LatencyStats, register_metrics_source
+from utils.password_hashing import password_hasher
+
+
+class HashingOverloadedError(Exception):
+    """雜湊執行池已滿或等待逾時；由 app 的 errorhandler 轉為 503 + Retry-After。"""
+
+    def __init__(self, retry_after=1):
+        super().__init__("密碼雜湊服務忙碌中")
+        self.retry_after = retry_after
+
+
+def _init_worker(hasher_settings):
+    # 子行程內的 password_hasher 需要與主行程相同的演算法與成本參數
+    password_hasher.configure(**hasher_settings)
+
+
+def _hash_in_worker(password_plaintext):
+    return password_hasher.hash(password_plaintext)
+
+
+def _hash_chunk_in_worker(passwords):
+    return [password_hasher.hash(p) for p in passwords]
+
+
+def _verify_in_worker(password_hash, password_plaintext):
+    return password_hasher.verify(password_hash, password_plaintext)
+
+
+class HashExecutor:
+    """
+    將密碼雜湊與驗證交給有上限的 ProcessPoolExecutor 執行，避免 CPU 密集的
+    scrypt/pbkdf2 在請求執行緒中佔住 GIL。
+
+    同時等待中的工作數超過 max_pending 時不再排隊，直接拋出 HashingOverloadedError，
+    讓過載的登入尖峰以 503 快速失敗，而不是堆積成大量逾時。
+    未啟用 (HASH_EXECUTOR_ENABLED=False，預設) 時登入與單筆雜湊直接在目前執行緒中計算；
+    批次雜湊 (hash_many) 不受此設定影響，一律使用行程池平行計算。
+    """
+
+    # 預估少於此秒數的批次雜湊直接在目前執行緒計算，不值得為此啟動行程池
+    inline_seconds = 0.5
+
+    def __init__(self):
+        self.enabled = False
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = 10
+        self.retry_after = 1
+        self.start_method = 'spawn'
+        self._hasher_settings = None
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._hash_seconds = None
+        self.completed = 0
+        self.rejected = 0
+        self.latency = LatencyStats()
+
+    def init_app(self, app):
+        self.shutdown()
+        self.enabled = app.config.get('HASH_EXECUTOR_ENABLED', False)
+        self.workers = app.config.get('HASH_EXECUTOR_WORKERS') or os.cpu_count() or 1
+        self.max_pending = app.config.get('HASH_EXECUTOR_MAX_PENDING') or self.workers * 4
+        self.timeout = app.config.get('HASH_EXECUTOR_TIMEOUT', 10)
+        self.retry_after = app.config.get('HASH_EXECUTOR_RETRY_AFTER', 1)
+        self.start_method = app.config.get('HASH_EXECUTOR_START_METHOD', 'spawn')
+        self._hasher_settings = dict(password_hasher.settings)
+        self._hash_seconds = None
+        register_metrics_source('hash_executor', self.stats)
+
+    def _get_executor(self):
+        # 執行池在第一次使用時才建立，且 fork 後的子行程 (例如 gunicorn worker) 會各自建立
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # multiprocessing 只在需要行程池時才匯入 (預設停用時 worker 啟動不需要)
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker,
+                        initargs=(self._hasher_settings,)
+                    )
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _discard_broken_executor(self, executor):
+        """子行程異常結束 (例如被 OOM killer 終止) 後行程池無法再使用，捨棄後由下一次呼叫重新建立。"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._pid = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.rejected += 1
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloadedError(self.retry_after)
+        started = time.monotonic()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenExecutor:
+            slots.release()
+            self._discard_broken_executor(executor)
+            raise HashingOverloadedError(self.retry_after)
+        except BaseException:
+            slots.release()
+            raise
+        # 名額在工作真正結束 (完成或取消) 時才歸還：逾時的請求雖已放棄等待，
+        # 已開始執行的雜湊仍佔用行程池，歸還前不再接受新的工作，max_pending 才是真正的上限
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.rejected += 1
+            raise HashingOverloadedError(self.retry_after)
+        except BrokenExecutor:
+            self._discard_broken_executor(executor)
+            raise HashingOverloadedError(self.retry_after)
+        self.latency.observe(time.monotonic() - started)
+        self.completed += 1
+        return result
+
+    def hash(self, password_plaintext):
+        if not self.enabled:
+            return password_hasher.hash(password_plaintext)
+        return self._submit(_hash_in_worker, password_plaintext)
+
+    def verify(self, password_hash, password_plaintext):
+        if not self.enabled:
+            return password_hasher.verify(password_hash, password_plaintext)
+        return self._submit(_verify_in_worker, password_hash, password_plaintext)
+
+    def hash_seconds(self):
+        """單次雜湊的秒數 (第一次呼叫時以目前的演算法與成本參數實際計算一次)。"""
+        if self._hash_seconds is None:
+            started = time.perf_counter()
+            password_hasher.hash('hash-cost-calibration')
+            self._hash_seconds = time.perf_counter() - started
+        return self._hash_seconds
+
+    def bulk_parallelism(self):
+        """hash_many 同時計算的工作數；無法建立行程池 (例如沒有 /dev/shm) 時為 1。"""
+        try:
+            self._get_executor()
+        except (ImportError, OSError, NotImplementedError):
+            return 1
+        return min(self.workers, max(1, self.max_pending // 2))
+
+    def estimate_many_seconds(self, count):
+        """預估 hash_many 雜湊 count 個密碼所需的秒數，供呼叫端在開始前拒絕過大的批次。"""
+        inline = count * self.hash_seconds()
+        if inline <= self.inline_seconds:
+            return inline
+        return inline / self.bulk_parallelism()
+
+    def hash_many(self, passwords, chunksize=16):
+        """
+        批次雜湊多個密碼 (例如批次匯入使用者)，回傳與輸入順序相同的雜湊列表。
+
+        不論 HASH_EXECUTOR_ENABLED 是否啟用都使用行程池 (預估少於 inline_seconds 秒時在目前執行緒計算)。
+        每 chunksize 個密碼為一件工作，與登入共用 max_pending 個排隊名額，且同時最多只佔用一半的名額 (至少 1 個)，
+        其餘名額保留給登入與單筆建立；等不到名額超過 timeout 秒時拋出 HashingOverloadedError。
+        無法建立行程池時在目前執行緒中依序計算，呼叫端應先以 estimate_many_seconds() 限制批次大小。
+        """
+        passwords = list(passwords)
+        if len(passwords) <= 1 or len(passwords) * self.hash_seconds() <= self.inline_seconds:
+            return [password_hasher.hash(p) for p in passwords]
+        try:
+            self._get_executor()
+        except (ImportError, OSError, NotImplementedError):
+            return [password_hasher.hash(p) for p in passwords]
+        executor = self._get_executor()
+        slots = self._slots
+        window = max(1, self.max_pending // 2)
+        chunks = [passwords[start:start + chunksize] for start in range(0, len(passwords), chunksize)]
+        results = [None] * len(chunks)
+        pending = {}
+        started = time.monotonic()
+        try:
+            for index, chunk in enumerate(chunks):
+                if len(pending) >= window:
+                    self._collect(pending, results, wait(pending, return_when=FIRST_COMPLETED).done)
+                if not slots.acquire(timeout=self.timeout):
+                    self.rejected += 1
+                    raise HashingOverloadedError(self.retry_after)
+                try:
+                    future = executor.submit(_hash_chunk_in_worker, chunk)
+                except BaseException:
+                    slots.release()
+                    raise
+                future.add_done_callback(lambda _: slots.release())
+                pending[future] = index
+            self._collect(pending, results, wait(pending).done)
+        except BrokenExecutor:
+            self._discard_broken_executor(executor)
+            raise HashingOverloadedError(self.retry_after)
+        finally:
+            # 失敗時取消尚未開始的工作，不繼續佔用行程池
+            for future in pending:
+                future.cancel()
+        self.latency.observe(time.monotonic() - started)
+        self.completed += len(passwords)
+        return [password_hash for chunk_hashes in results for password_hash in chunk_hashes]
+
+    @staticmethod
+    def _collect(pending, results, done):
+        for future in done:
+            results[pending.pop(future)] = future.result()
+
+    def shutdown(self):
+        executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._pid = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+        }
+
+
+hash_executor = HashExecutor()
@@ -0,0 +1,239 @@
+# backend/utils/instrumentation.py
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.metrics import collect_metrics, register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+# 直方圖的固定分界 (秒)，與 Prometheus client 的預設值相近
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """固定分界的累積直方圖 (非執行緒安全，由 RequestInstrumentation 的鎖保護)。"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        """回傳 [(分界, 累積次數)]，最後一項為 '+Inf'。"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((bound, running))
+        result.append(('+Inf', self.count))
+        return result
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = Counter() # {(method, status): 次數}
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.db_duration = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.n_plus_one = 0
+
+
+def _normalize_sql(statement):
+    """去除多餘空白，讓同一條 SQL 在不同參數下視為相同語句 (參數本身已是佔位符)。"""
+    return re.sub(r'\s+', ' ', statement).strip()
+
+
+class RequestInstrumentation:
+    """
+    記錄每個端點的請求時間、資料庫時間與 SQL 執行次數。
+
+    - 請求時間：before_request 到 after_request (串流回應不含輸出內容的時間)
+    - 資料庫時間 / SQL 次數：透過 SQLAlchemy 的 before/after_cursor_execute 事件累計到 flask.g
+    - N+1：同一請求內同一條 SQL 執行達 N_PLUS_ONE_THRESHOLD 次時記錄警告並計數
+    指標以端點名稱 (request.endpoint) 為標籤，不使用 URL，避免標籤數量無限增加。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.n_plus_one_threshold = 10
+        self.slow_request_ms = 1000
+        self.server_timing = True
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', True)
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', 1000)
+        self.server_timing = app.config.get('SERVER_TIMING_HEADER', True)
+        if not self.enabled:
+            return
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+            self._listening = True
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        register_metrics_source('requests', self.stats)
+
+    def _before_request(self):
+        g._instr_started = time.perf_counter()
+        g._instr_db_time = 0.0
+        g._instr_statements = Counter()
+
+    def _after_request(self, response):
+        started = g.pop('_instr_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        db_time = g.pop('_instr_db_time', 0.0)
+        statements = g.pop('_instr_statements', Counter())
+        query_count = sum(statements.values())
+        endpoint = request.endpoint or 'unmatched'
+
+        repeated = [(sql, n) for sql, n in statements.items() if n >= self.n_plus_one_threshold]
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests[(request.method, response.status_code)] += 1
+            stats.duration.observe(elapsed)
+            stats.db_duration.observe(db_time)
+            stats.queries.observe(query_count)
+            if repeated:
+                stats.n_plus_one += 1
+
+        for sql, n in repeated:
+            logger.warning("疑似 N+1 查詢", extra={
+                'endpoint': endpoint, 'repeat': n, 'statement': sql[:200],
+            })
+        elapsed_ms = elapsed * 1000
+        if self.slow_request_ms and elapsed_ms >= self.slow_request_ms:
+            logger.warning("慢請求", extra={
+                'endpoint': endpoint, 'method': request.method, 'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 2), 'db_ms': round(db_time * 1000, 2), 'queries': query_count,
+            })
+        else:
+            logger.debug("請求完成", extra={
+                'endpoint': endpoint, 'method': request.method, 'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 2), 'db_ms': round(db_time * 1000, 2), 'queries': query_count,
+            })
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f"app;dur={elapsed_ms:.2f}, db;dur={db_time * 1000:.2f};desc=\"{query_count} queries\""
+            )
+        return response
+
+    def stats(self):
+        """JSON 格式的摘要 (/api/metrics/ 的 'requests' 分組)。"""
+        with self._lock:
+            result = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                count = stats.duration.count
+                result[endpoint] = {
+                    "count": count,
+                    "avg_ms": round(stats.duration.sum / count * 1000, 3) if count else 0.0,
+                    "db_avg_ms": round(stats.db_duration.sum / count * 1000, 3) if count else 0.0,
+                    "queries_avg": round(stats.queries.sum / count, 2) if count else 0.0,
+                    "n_plus_one": stats.n_plus_one,
+                }
+            return result
+
+    def render_prometheus(self):
+        """以 Prometheus text exposition format (0.0.4) 輸出所有端點指標與其他子系統的數值指標。"""
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines.append('# HELP napp_http_requests_total HTTP 請求次數')
+            lines.append('# TYPE napp_http_requests_total counter')
+            for endpoint, stats in endpoints:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'napp_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                    )
+            for name, attr, help_text in (
+                ('napp_http_request_duration_seconds', 'duration', '請求處理時間'),
+                ('napp_db_time_per_request_seconds', 'db_duration', '每個請求累計的資料庫時間'),
+                ('napp_db_queries_per_request', 'queries', '每個請求執行的 SQL 次數'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for endpoint, stats in endpoints:
+                    histogram = getattr(stats, attr)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram.count}')
+            lines.append('# HELP napp_n_plus_one_requests_total 偵測到 N+1 查詢的請求次數')
+            lines.append('# TYPE napp_n_plus_one_requests_total counter')
+            for endpoint, stats in endpoints:
+                lines.append(f'napp_n_plus_one_requests_total{{endpoint="{endpoint}"}} {stats.n_plus_one}')
+
+        # 其他子系統 (郵件佇列、連線池、限流器...) 的數值指標以 gauge 輸出
+        for group, values in sorted(collect_metrics().items()):
+            if group == 'requests':
+                continue
+            for key, value in _flatten(values, f'napp_{group}'):
+                lines.append(f'# TYPE {key} gauge')
+                lines.append(f'{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _flatten(values, prefix):
+    """把巢狀 dict 攤平成 (指標名稱, 數值)，只保留數值與布林值。"""
+    if isinstance(values, bool):
+        yield prefix, int(values)
+    elif isinstance(values, (int, float)):
+        yield prefix, values
+    elif isinstance(values, dict):
+        for key, value in sorted(values.items(), key=lambda item: str(item[0])):
+            name = re.sub(r'[^a-zA-Z0-9_]', '_', str(key))
+            yield from _flatten(value, f'{prefix}_{name}')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_instr_statements' in g:
+        conn.info.setdefault('_instr_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_instr_query_start')
+    if not starts or not has_request_context() or '_instr_statements' not in g:
+        return
+    g._instr_db_time += time.perf_counter() - starts.pop()
+    g._instr_statements[_normalize_sql(statement)] += 1
+
+
+def _handle_error(exception_context):
+    # SQL 執行失敗時 after_cursor_execute 不會觸發，丟棄對應的開始時間
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('_instr_query_start'):
+        connection.info['_instr_query_start'].pop()
+
+
+request_instrumentation = RequestInstrumentation()
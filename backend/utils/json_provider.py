@@ -0,0 +1,81 @@
+# backend/utils/json_provider.py
+
+import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError: # 選用套件，未安裝時使用標準函式庫
+    orjson = None
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask 預設的 JSON provider，但 datetime / date 輸出為 ISO 8601 (與 User.to_dict() 相同)，
+    而不是 Flask 預設的 HTTP 日期格式，讓兩種 provider 的輸出一致。
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonJSONProvider(StdlibJSONProvider):
+    """
+    以 orjson 編碼 / 解碼 JSON (需要安裝 orjson)。
+
+    orjson 直接以 C 實作序列化 dict / list / datetime，大型列表的 CPU 時間約為標準函式庫的數分之一。
+    輸出為 UTF-8 (不跳脫非 ASCII 字元)；orjson 不支援的值 (例如超過 64 位元的整數) 改用標準函式庫編碼。
+    """
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def _dumps_bytes(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def loads(self, s, **kwargs):
+        # orjson.JSONDecodeError 是 json.JSONDecodeError 的子類別，錯誤處理與標準函式庫相同
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        # 直接使用 orjson 產生的 bytes，省去一次 str 轉換
+        return self._app.response_class(self._dumps_bytes(obj, **dump_args) + b'\n', mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    'stdlib': StdlibJSONProvider,
+    'orjson': OrjsonJSONProvider,
+}
+
+
+def init_json_provider(app):
+    """
+    依 JSON_PROVIDER 設定 app.json：auto (已安裝 orjson 時使用，否則使用標準函式庫)、orjson 或 stdlib。
+    """
+    name = app.config.get('JSON_PROVIDER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"不支援的 JSON_PROVIDER：{name}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson 需要安裝 orjson 套件")
+    provider = JSON_PROVIDERS[name](app)
+    provider.sort_keys = app.config.get('JSON_SORT_KEYS', True)
+    app.json = provider
+    return provider
@@ -0,0 +1,142 @@
+# backend/utils/logging_config.py
+
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+# LogRecord 內建的屬性；其餘透過 extra={...} 傳入的欄位會輸出為結構化欄位
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# 第三方套件的 DEBUG 紀錄 (每次取得 / 歸還連線都會輸出) 量太大，至少維持在 WARNING；
+# 連線池的 logger 名稱取自類別所在模組，因此 InstrumentedQueuePool 需另外列出
+_NOISY_LOGGERS = ('sqlalchemy', 'utils.pool_metrics.InstrumentedQueuePool')
+
+
+class JsonFormatter(logging.Formatter):
+    """每筆紀錄輸出為一行 JSON，extra 欄位一併輸出。"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """人類可讀的單行格式，extra 欄位以 key=value 附加在訊息後面。"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = ' '.join(
+            f"{key}={value}" for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith('_')
+        )
+        return f"{line} {extras}" if extras else line
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class BufferedHandler(logging.handlers.QueueHandler):
+    """
+    非同步的日誌 handler：請求執行緒只把紀錄放進佇列，由背景執行緒寫到 stdout，
+    避免同步寫入 stdout 拖慢請求。背景執行緒在第一次寫入時啟動，fork 後的子行程會自行重啟。
+    佇列已滿時丟棄紀錄並計數，而不是阻塞請求。
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # QueueHandler 預設會把 traceback 併入 message 並清除 exc_info (為了能 pickle 到其他行程)；
+        # 這個佇列只在本行程內使用，因此只先組好訊息，保留 exc_info / exc_text 讓 JsonFormatter 輸出獨立的欄位。
+        # traceback 在請求執行緒中先轉成文字，背景執行緒寫出時不再需要原本的 frame
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # 停止背景執行緒前會先寫完佇列中的紀錄；flush() 可能在執行中被呼叫 (logging.shutdown 也會呼叫)，不可停止執行緒
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+        super().close()
+
+
+def configure_logging(app):
+    """
+    依 LOG_LEVEL / LOG_FORMAT (json 或 text) / LOG_BUFFERED 設定根 logger。
+    正式環境可設定 LOG_LEVEL=WARNING 關閉逐筆請求紀錄。
+    """
+    level = getattr(logging, str(app.config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter())
+
+    if app.config.get('LOG_BUFFERED', True):
+        handler = BufferedHandler(stream_handler, app.config.get('LOG_BUFFER_SIZE', 10000))
+        atexit.register(handler.close)
+    else:
+        handler = stream_handler
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, '_napp_handler', False)]:
+        root.removeHandler(existing)
+    handler._napp_handler = True
+    root.addHandler(handler)
+    root.setLevel(level)
+    app.logger.setLevel(level)
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
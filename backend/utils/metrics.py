@@ -0,0 +1,61 @@
+# backend/utils/metrics.py
+
+import threading
+
+# 各子系統 (郵件佇列、連線池、限流器...) 註冊自己的指標收集函數，
+# 由 /api/metrics 端點統一輸出。收集函數回傳可 JSON 序列化的 dict。
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def register_metrics_source(name, collector):
+    """
+    註冊一個指標來源。
+
+    Args:
+        name (str): 指標分組名稱，例如 'email'。
+        collector (callable): 無參數函數，回傳該分組目前的指標 dict。
+    """
+    with _sources_lock:
+        _sources[name] = collector
+
+
+def collect_metrics():
+    """呼叫所有已註冊的收集函數，回傳 {分組名稱: 指標 dict}。"""
+    with _sources_lock:
+        sources = list(_sources.items())
+    result = {}
+    for name, collector in sources:
+        try:
+            result[name] = collector()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
+
+
+class LatencyStats:
+    """執行緒安全的簡易延遲統計 (次數、總和、最大值、最近一次)，單位為秒。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "max_ms": round(self.max * 1000, 3),
+                "last_ms": round(self.last * 1000, 3),
+            }
@@ -0,0 +1,89 @@
+# backend/utils/pagination.py
+
+import base64
+import binascii
+import datetime
+import json
+
+from sqlalchemy import and_, or_, func, text
+
+
+class InvalidCursorError(ValueError):
+    """游標格式錯誤或與目前排序條件不符時拋出。"""
+
+
+def encode_cursor(sort_key, sort_value, row_id):
+    """
+    將最後一筆資料的排序值與 id 編碼成不透明 (opaque) 的游標字串。
+
+    Args:
+        sort_key (str): 排序欄位名稱，會一併編碼以避免游標被誤用在其他排序上。
+        sort_value: 最後一筆資料的排序欄位值。
+        row_id (int): 最後一筆資料的主鍵，作為排序值相同時的穩定 tie-breaker。
+    """
+    if isinstance(sort_value, datetime.datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_key, sort_value, row_id], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_key):
+    """
+    解碼 encode_cursor() 產生的游標，回傳 (sort_value, row_id)。
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise InvalidCursorError('無效的分頁游標')
+    if key != sort_key or not isinstance(row_id, int):
+        raise InvalidCursorError('分頁游標與目前的排序條件不符')
+    if sort_key == 'created_at' and value is not None:
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursorError('無效的分頁游標')
+    return value, row_id
+
+
+def keyset_filter(sort_column, id_column, sort_value, row_id, descending=False):
+    """
+    產生 keyset 分頁條件：(sort_column, id) 嚴格排在游標之後。
+
+    使用展開的 OR/AND 形式而非 row-value 比較，讓 MySQL 可以直接在
+    (sort_column, id) 複合索引上做範圍掃描。當排序欄位就是主鍵時只比較 id。
+    """
+    if sort_column is id_column:
+        return id_column < row_id if descending else id_column > row_id
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < row_id))
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > row_id))
+
+
+def escape_like(value):
+    """跳脫 LIKE 萬用字元，讓使用者輸入只作為前綴比對。"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def estimate_table_rows(session, table_name):
+    """
+    從 information_schema 讀取 InnoDB 的估計列數，避免對整張表執行 COUNT(*)。
+    非 MySQL 資料庫 (例如本地測試用的 SQLite) 則退回精確計數。
+    """
+    bind = session.get_bind()
+    if bind.dialect.name == 'mysql':
+        estimate = session.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+            ),
+            {'table_name': table_name}
+        ).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return session.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+
+
+def count_query(session, query):
+    """對已套用篩選條件的查詢執行 COUNT(*)，不載入任何資料列。"""
+    return session.execute(query.with_only_columns(func.count()).order_by(None)).scalar()
@@ -0,0 +1,104 @@
+# backend/utils/password_hashing.py
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+ARGON2_PREFIX = '$argon2'
+
+
+class PasswordHasher:
+    """
+    可設定演算法與成本參數的密碼雜湊器。
+
+    支援 werkzeug 的 pbkdf2 / scrypt (雜湊字串格式為 'method:參數$salt$hash')，
+    以及安裝 argon2-cffi 後可用的 argon2id。驗證時依雜湊字串本身的格式選擇演算法，
+    因此舊參數產生的雜湊仍可驗證，並可透過 needs_rehash() 判斷是否需要升級。
+    """
+
+    def __init__(self, method='scrypt', pbkdf2_iterations=600000, pbkdf2_hash='sha256',
+                 scrypt_n=2 ** 15, scrypt_r=8, scrypt_p=1,
+                 argon2_time_cost=3, argon2_memory_cost=65536, argon2_parallelism=4,
+                 salt_length=16):
+        self.configure(
+            method=method, pbkdf2_iterations=pbkdf2_iterations, pbkdf2_hash=pbkdf2_hash,
+            scrypt_n=scrypt_n, scrypt_r=scrypt_r, scrypt_p=scrypt_p,
+            argon2_time_cost=argon2_time_cost, argon2_memory_cost=argon2_memory_cost,
+            argon2_parallelism=argon2_parallelism, salt_length=salt_length
+        )
+
+    def configure(self, method, pbkdf2_iterations, pbkdf2_hash, scrypt_n, scrypt_r, scrypt_p,
+                  argon2_time_cost, argon2_memory_cost, argon2_parallelism, salt_length):
+        if method not in ('pbkdf2', 'scrypt', 'argon2'):
+            raise ValueError(f"不支援的密碼雜湊演算法：{method}")
+        # 保留原始設定，讓 hash_executor 可以在子行程中重建相同的雜湊器
+        self.settings = dict(
+            method=method, pbkdf2_iterations=pbkdf2_iterations, pbkdf2_hash=pbkdf2_hash,
+            scrypt_n=scrypt_n, scrypt_r=scrypt_r, scrypt_p=scrypt_p,
+            argon2_time_cost=argon2_time_cost, argon2_memory_cost=argon2_memory_cost,
+            argon2_parallelism=argon2_parallelism, salt_length=salt_length
+        )
+        self.method = method
+        self.salt_length = salt_length
+        self.pbkdf2_method = f"pbkdf2:{pbkdf2_hash}:{int(pbkdf2_iterations)}"
+        self.scrypt_method = f"scrypt:{int(scrypt_n)}:{int(scrypt_r)}:{int(scrypt_p)}"
+        self.argon2_params = {
+            'time_cost': int(argon2_time_cost),
+            'memory_cost': int(argon2_memory_cost),
+            'parallelism': int(argon2_parallelism),
+        }
+        self._argon2 = None
+        if method == 'argon2':
+            self._argon2 = self._argon2_hasher()
+
+    def init_app(self, app):
+        """依 app.config 的 PASSWORD_* 設定重新設定雜湊器。"""
+        self.configure(
+            method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            pbkdf2_iterations=app.config.get('PASSWORD_PBKDF2_ITERATIONS', 600000),
+            pbkdf2_hash=app.config.get('PASSWORD_PBKDF2_HASH', 'sha256'),
+            scrypt_n=app.config.get('PASSWORD_SCRYPT_N', 2 ** 15),
+            scrypt_r=app.config.get('PASSWORD_SCRYPT_R', 8),
+            scrypt_p=app.config.get('PASSWORD_SCRYPT_P', 1),
+            argon2_time_cost=app.config.get('PASSWORD_ARGON2_TIME_COST', 3),
+            argon2_memory_cost=app.config.get('PASSWORD_ARGON2_MEMORY_COST', 65536),
+            argon2_parallelism=app.config.get('PASSWORD_ARGON2_PARALLELISM', 4),
+            salt_length=app.config.get('PASSWORD_SALT_LENGTH', 16),
+        )
+
+    def _argon2_hasher(self):
+        try:
+            from argon2 import PasswordHasher as Argon2PasswordHasher
+        except ImportError:
+            raise RuntimeError("使用 argon2 雜湊需要安裝 argon2-cffi 套件")
+        return Argon2PasswordHasher(**self.argon2_params)
+
+    @property
+    def werkzeug_method(self):
+        return self.pbkdf2_method if self.method == 'pbkdf2' else self.scrypt_method
+
+    def hash(self, password_plaintext):
+        if self.method == 'argon2':
+            return self._argon2.hash(password_plaintext)
+        return generate_password_hash(password_plaintext, method=self.werkzeug_method, salt_length=self.salt_length)
+
+    def verify(self, password_hash, password_plaintext):
+        if password_hash.startswith(ARGON2_PREFIX):
+            from argon2.exceptions import VerificationError, InvalidHashError
+            hasher = self._argon2 or self._argon2_hasher()
+            try:
+                return hasher.verify(password_hash, password_plaintext)
+            except (VerificationError, InvalidHashError):
+                return False
+        return check_password_hash(password_hash, password_plaintext)
+
+    def needs_rehash(self, password_hash):
+        """雜湊字串的演算法或成本參數與目前設定不同時回傳 True。"""
+        if self.method == 'argon2':
+            if not password_hash.startswith(ARGON2_PREFIX):
+                return True
+            return self._argon2.check_needs_rehash(password_hash)
+        if password_hash.startswith(ARGON2_PREFIX):
+            return True
+        return password_hash.split('$', 1)[0] != self.werkzeug_method
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,137 @@
+# backend/utils/pool_metrics.py
+
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from utils.metrics import LatencyStats, register_metrics_source
+
+
+class PoolMetrics:
+    """
+    資料庫連線池的事件計數 (每個 worker 行程各自統計)。
+
+    - checkouts / checkins：從連線池取出 / 歸還連線的次數
+    - connects：建立新實體連線的次數 (持續增加代表連線被回收或失效後重建)
+    - invalidations / soft_invalidations：連線因錯誤或 pre-ping 失敗被作廢的次數
+    - timeouts：等待超過 pool_timeout 仍取不到連線的次數 (連線池耗盡)
+    - wait：取得連線所花的時間 (含必要時建立新連線)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.max_checked_out = 0
+        self.wait = LatencyStats()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def observe_checked_out(self, checked_out):
+        with self._lock:
+            if checked_out > self.max_checked_out:
+                self.max_checked_out = checked_out
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "max_checked_out": self.max_checked_out,
+                "wait": self.wait.snapshot(),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """記錄取得連線等待時間與逾時次數的 QueuePool。"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection_record = super()._do_get()
+            pool_metrics.observe_checked_out(self.checkedout())
+            return connection_record
+        except exc.TimeoutError:
+            pool_metrics.incr('timeouts')
+            raise
+        finally:
+            pool_metrics.wait.observe(time.perf_counter() - started)
+
+
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.incr('connects')
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.incr('checkouts')
+
+
+@event.listens_for(InstrumentedQueuePool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.incr('checkins')
+
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.incr('invalidations')
+
+
+@event.listens_for(InstrumentedQueuePool, 'soft_invalidate')
+def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.incr('soft_invalidations')
+
+
+def pool_status(engine):
+    """目前連線池的狀態 (非 QueuePool 時只回傳類別名稱)。"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    return status
+
+
+def init_pool_metrics(app, db):
+    """
+    在 db.init_app(app) 之前呼叫：未指定 poolclass 時改用 InstrumentedQueuePool，
+    並註冊 'db_pool' 指標來源。SQLite 記憶體資料庫等不使用 QueuePool 的設定維持原樣。
+    """
+    if not app.config.get('DB_POOL_METRICS', True):
+        return
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri.startswith('sqlite') and (':memory:' in uri or uri in ('sqlite://', 'sqlite:///')):
+        return
+    # 複製一份再修改，避免改到 Config 類別上共用的 dict
+    engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    engine_options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+    def collect():
+        with app.app_context():
+            status = pool_status(db.engine)
+        status.update(pool_metrics.snapshot())
+        return status
+
+    register_metrics_source('db_pool', collect)
@@ -0,0 +1,216 @@
+# backend/utils/rate_limiter.py
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify, current_app
+
+from utils.metrics import register_metrics_source
+
+
+def parse_rate(rate):
+    """把 '5/60' (60 秒內最多 5 次) 解析為 (5, 60)；空字串或 None 表示不限制。"""
+    if not rate:
+        return None
+    count, _, seconds = str(rate).partition('/')
+    return int(count), float(seconds or 60)
+
+
+class MemoryStore:
+    """
+    行程內的滑動視窗計數器 (sliding window counter)。
+
+    以固定視窗計數，並以上一個視窗的計數依重疊比例加權，近似真正的滑動視窗，
+    每個鍵只需保存兩個計數與到期時間。到期時間為下一個視窗的結束時間 (之後兩個視窗的計數都不再影響結果)，
+    各規則的視窗長度不同 (60 / 300 / 3600 秒)，因此依每個鍵自己的到期時間判斷，而不是以觸發清除的規則判斷。
+    鍵依最近使用順序保存 (LRU)：新增時順便清除最久未使用且已到期的鍵，鍵數超過 max_keys 時
+    無條件移除最久未使用的鍵，記憶體用量與每次操作的成本都有上限。
+    只在單一行程內有效；多個 worker 時每個 worker 各自計數，請改用 RedisStore。
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._windows = OrderedDict() # {鍵: (視窗編號, 本視窗計數, 上一個視窗計數, 到期時間)}
+
+    def hit(self, key, limit, window, now=None):
+        """記錄一次請求，回傳 (是否允許, 建議的 Retry-After 秒數)。"""
+        now = time.time() if now is None else now
+        index = int(now // window)
+        expires_at = (index + 2) * window
+        with self._lock:
+            entry = self._windows.pop(key, None)
+            if entry is None or entry[0] < index - 1:
+                current, previous = 0, 0
+            elif entry[0] == index - 1:
+                current, previous = 0, entry[1]
+            else:
+                current, previous = entry[1], entry[2]
+            elapsed_ratio = (now % window) / window
+            estimated = previous * (1 - elapsed_ratio) + current
+            allowed = estimated < limit
+            # pop 後重新加入，鍵移到最近使用的一端
+            self._windows[key] = (index, current + 1 if allowed else current, previous, expires_at)
+            self._evict(now)
+        if not allowed:
+            return False, max(1, math.ceil(window - now % window))
+        return True, 0
+
+    def _evict(self, now):
+        # 最久未使用的一端若已到期就移除 (攤提成本)，超過上限時不論是否到期都移除
+        while self._windows:
+            key, entry = next(iter(self._windows.items()))
+            if entry[3] > now and len(self._windows) <= self.max_keys:
+                break
+            self._windows.popitem(last=False)
+
+    def __len__(self):
+        return len(self._windows)
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class RedisStore:
+    """
+    以 Redis 共用計數的滑動視窗計數器，讓多個 worker / 多台主機共享同一份限流狀態。
+    需要安裝 redis 套件 (pip install redis)。
+    """
+
+    def __init__(self, url, prefix='napp:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL 使用 Redis 時需要安裝 redis 套件")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        index = int(now // window)
+        current_key = f"{self.prefix}{key}:{index}"
+        previous_key = f"{self.prefix}{key}:{index - 1}"
+        pipe = self._redis.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(window * 2))
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+        elapsed_ratio = (now % window) / window
+        # INCR 已先計入本次請求，因此比較時扣回 1
+        estimated = int(previous or 0) * (1 - elapsed_ratio) + (current - 1)
+        if estimated >= limit:
+            return False, max(1, math.ceil(window - now % window))
+        return True, 0
+
+    def reset(self):
+        for key in self._redis.scan_iter(f"{self.prefix}*"):
+            self._redis.delete(key)
+
+
+class RateLimiter:
+    """依規則名稱 (例如 'login_ip') 與鍵 (IP、帳號) 做限流，並統計各規則的拒絕次數。"""
+
+    def __init__(self):
+        self.enabled = False
+        self.store = MemoryStore()
+        self.rules = {}
+        self.checks = {}
+        self.rejections = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        storage_url = app.config.get('RATE_LIMIT_STORAGE_URL')
+        if storage_url and storage_url.startswith('redis'):
+            self.store = RedisStore(storage_url)
+        else:
+            self.store = MemoryStore(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
+        self.rules = {
+            'login_ip': parse_rate(app.config.get('RATE_LIMIT_LOGIN_PER_IP')),
+            'login_username': parse_rate(app.config.get('RATE_LIMIT_LOGIN_PER_USERNAME')),
+            'forgot_password_ip': parse_rate(app.config.get('RATE_LIMIT_FORGOT_PASSWORD_PER_IP')),
+            'forgot_password_email': parse_rate(app.config.get('RATE_LIMIT_FORGOT_PASSWORD_PER_EMAIL')),
+        }
+        register_metrics_source('rate_limit', self.stats)
+
+    def _count(self, counter, rule):
+        with self._lock:
+            counter[rule] = counter.get(rule, 0) + 1
+
+    def hit(self, rule, key):
+        """回傳 (是否允許, Retry-After 秒數)；規則未設定或停用限流時一律允許。"""
+        rate = self.rules.get(rule)
+        if not self.enabled or rate is None or not key:
+            return True, 0
+        self._count(self.checks, rule)
+        allowed, retry_after = self.store.hit(f"{rule}:{key}", *rate)
+        if not allowed:
+            self._count(self.rejections, rule)
+        return allowed, retry_after
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "store": type(self.store).__name__,
+                "checks": dict(self.checks),
+                "rejections": dict(self.rejections),
+            }
+
+
+rate_limiter = RateLimiter()
+
+
+def client_ip():
+    """
+    取得用戶端 IP。RATE_LIMIT_TRUST_PROXY 為 True 時採用 X-Forwarded-For 從右邊數來第 RATE_LIMIT_PROXY_HOPS 個位址
+    (可信任的代理所附加的位址，與 werkzeug ProxyFix(x_for=N) 相同)；更左邊的位址由用戶端自行填寫，不可採信。
+    位址數少於代理層數 (請求未經過全部代理) 時使用連線的來源位址。
+    """
+    if current_app.config.get('RATE_LIMIT_TRUST_PROXY'):
+        hops = max(1, current_app.config.get('RATE_LIMIT_PROXY_HOPS', 1))
+        # 多個 X-Forwarded-For 標頭視為同一個逗號分隔的清單
+        forwarded = [address.strip() for header in request.headers.getlist('X-Forwarded-For')
+                     for address in header.split(',') if address.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr
+
+
+def json_field(name):
+    """產生從 JSON 請求內容取出欄位作為限流鍵的函數 (不分大小寫)。"""
+    def key_func():
+        data = request.get_json(silent=True) or {}
+        value = data.get(name) if isinstance(data, dict) else None
+        return str(value).strip().lower() if value else None
+    return key_func
+
+
+def rate_limit(*rules):
+    """
+    限流裝飾器，在視圖函數 (以及其中的資料庫查詢與密碼雜湊) 執行之前檢查。
+
+    Args:
+        rules: (規則名稱, 取得鍵的函數) 的組合，任一規則超過上限即回應 429。
+
+    用法：
+        @rate_limit(('login_ip', client_ip), ('login_username', json_field('username')))
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return fn(*args, **kwargs)
+            for rule, key_func in rules:
+                allowed, retry_after = rate_limiter.hit(rule, key_func())
+                if not allowed:
+                    response = jsonify({"message": "請求過於頻繁，請稍後再試"})
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response, 429
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
@@ -0,0 +1,120 @@
+# backend/utils/reset_tokens.py
+
+import datetime
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+
+from models import db, PasswordResetToken
+
+logger = logging.getLogger(__name__)
+
+
+def hash_reset_token(token):
+    """令牌的 SHA-256 摘要 (資料庫中只保存摘要，不保存明文令牌)。"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def create_reset_token(user, lifetime_seconds):
+    """
+    為使用者產生新的重設令牌並加入 session (由呼叫端 commit)，回傳明文令牌。
+    同一使用者先前尚未使用的令牌會一併作廢。
+    """
+    token = secrets.token_urlsafe(32)
+    db.session.execute(db.delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id))
+    db.session.add(PasswordResetToken(
+        user_id=user.id,
+        token_hash=hash_reset_token(token),
+        expires_at=datetime.datetime.now() + datetime.timedelta(seconds=lifetime_seconds)
+    ))
+    return token
+
+
+def find_valid_reset_token(token):
+    """以令牌摘要做唯一索引單點查詢，回傳尚未過期的 PasswordResetToken 或 None。"""
+    return db.session.execute(
+        db.select(PasswordResetToken).where(
+            PasswordResetToken.token_hash == hash_reset_token(token),
+            PasswordResetToken.expires_at > datetime.datetime.now()
+        )
+    ).scalar_one_or_none()
+
+
+def consume_reset_tokens(user_id):
+    """密碼重設成功後刪除該使用者的所有令牌 (由呼叫端 commit)。"""
+    db.session.execute(db.delete(PasswordResetToken).where(PasswordResetToken.user_id == user_id))
+
+
+def sweep_expired_tokens(batch_size=1000, max_batches=100):
+    """
+    分批刪除已過期的令牌，每批獨立提交以縮短鎖定時間。回傳刪除的筆數。
+    """
+    deleted = 0
+    for _ in range(max_batches):
+        expired_ids = db.session.execute(
+            db.select(PasswordResetToken.id)
+            .where(PasswordResetToken.expires_at <= datetime.datetime.now())
+            .limit(batch_size)
+        ).scalars().all()
+        if not expired_ids:
+            break
+        db.session.execute(db.delete(PasswordResetToken).where(PasswordResetToken.id.in_(expired_ids)))
+        db.session.commit()
+        deleted += len(expired_ids)
+        if len(expired_ids) < batch_size:
+            break
+    return deleted
+
+
+class ResetTokenSweeper:
+    """
+    每 interval 秒在背景執行緒中執行一次 sweep_expired_tokens()。
+    於第一個請求時啟動 (fork 後的 worker 會各自啟動)；也可改用 flask sweep-reset-tokens 搭配排程。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.interval = 900
+        self.batch_size = 1000
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('RESET_TOKEN_SWEEPER_ENABLED', True)
+        self.interval = app.config.get('RESET_TOKEN_SWEEP_INTERVAL', 900)
+        self.batch_size = app.config.get('RESET_TOKEN_SWEEP_BATCH_SIZE', 1000)
+        if self.enabled:
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            threading.Thread(target=self._run, name='reset-token-sweeper', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    deleted = sweep_expired_tokens(self.batch_size)
+                    if deleted:
+                        logger.info("已清除過期的密碼重設令牌", extra={"deleted": deleted})
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("清除過期密碼重設令牌失敗")
+
+    def stop(self):
+        self._stopping.set()
+
+
+reset_token_sweeper = ResetTokenSweeper()
@@ -0,0 +1,30 @@
+# backend/utils/row_serializer.py
+
+from models import User
+
+# 與 User.to_dict() 相同的欄位與順序 (不包含 password_hash 等敏感欄位)
+USER_PUBLIC_COLUMNS = ('id', 'name', 'username', 'email', 'role', 'created_at', 'updated_at')
+
+
+class RowSerializer:
+    """
+    以欄位為單位的序列化：查詢只選取需要的欄位，直接由 SQLAlchemy 的資料列 tuple 組出回應用的 dict，
+    不建立 ORM 物件 (不需 identity map、屬性 instrumentation 與 to_dict() 呼叫)。
+
+    datetime 保持原樣交給 JSON provider 編碼 (utils/json_provider.py 兩種 provider 都輸出 ISO 8601，
+    orjson 直接以 C 處理，省去每列每個時間欄位呼叫一次 isoformat())。
+    """
+
+    def __init__(self, columns, model=User):
+        self.columns = tuple(columns)
+        self.select_columns = tuple(getattr(model, c) for c in self.columns)
+
+    def serialize(self, rows):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+    def serialize_one(self, row):
+        return dict(zip(self.columns, row)) if row is not None else None
+
+
+user_row_serializer = RowSerializer(USER_PUBLIC_COLUMNS)
@@ -0,0 +1,70 @@
+# backend/utils/table_versions.py
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from models import db, TableVersion
+from utils.db_routing import RoutingSession
+
+# 寫入時需要遞增版本號的資料表 (使用者列表的 ETag 使用 users 的版本號)
+TRACKED_TABLES = frozenset({'users'})
+
+
+def bump_versions(connection, table_names):
+    """
+    在目前的交易中把資料表的版本號加 1，與寫入一起提交或回滾。
+    注意：同一張表的並行寫入會在版本號這一列上依序執行 (列鎖持續到提交)，只適合寫入頻率不高的資料表。
+    """
+    for table_name in sorted(table_names):
+        updated = connection.execute(
+            db.update(TableVersion).where(TableVersion.table_name == table_name)
+            .values(version=TableVersion.version + 1)
+        ).rowcount
+        if not updated: # flask init-db 之前建立的資料庫還沒有這一列
+            connection.execute(db.insert(TableVersion).values(table_name=table_name, version=1))
+
+
+def current_version(table_name):
+    """讀取資料表目前的版本號 (尚未寫入過時為 0)。"""
+    return db.session.execute(
+        db.select(TableVersion.version).where(TableVersion.table_name == table_name)
+    ).scalar() or 0
+
+
+def ensure_version_rows():
+    """建立受追蹤資料表的版本號列 (flask init-db 呼叫)，避免第一次寫入時並行新增同一列。"""
+    existing = set(db.session.scalars(db.select(TableVersion.table_name)))
+    for table_name in TRACKED_TABLES - existing:
+        try:
+            with db.session.begin_nested():
+                db.session.add(TableVersion(table_name=table_name, version=0))
+        except IntegrityError:
+            pass
+    db.session.commit()
+
+
+def _after_flush(session, flush_context):
+    # after_flush 時 new / dirty / deleted 仍是 flush 前的狀態
+    changed = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.deleted) + [o for o in session.dirty if session.is_modified(o)]
+        if getattr(obj, '__table__', None) is not None and obj.__table__.name in TRACKED_TABLES
+    }
+    if changed:
+        bump_versions(session.connection(), changed)
+
+
+def _do_orm_execute(orm_execute_state):
+    # db.session.execute(insert / update / delete) 不經過 flush，在執行前於同一個交易中遞增
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and table.name in TRACKED_TABLES:
+        bump_versions(orm_execute_state.session.connection(), {table.name})
+
+
+def init_table_versions():
+    """註冊 Session 事件：ORM flush 與 DML 陳述式寫入受追蹤的資料表時遞增版本號。"""
+    if not event.contains(RoutingSession, 'after_flush', _after_flush):
+        event.listen(RoutingSession, 'after_flush', _after_flush)
+        event.listen(RoutingSession, 'do_orm_execute', _do_orm_execute)
@@ -0,0 +1,401 @@
+# backend/utils/token_revocation.py
+
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, RevokedToken
+from utils.metrics import register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+
+class TimeBucketedDenylist:
+    """
+    行程內的 JWT 撤銷清單，以 jti 為鍵做 O(1) 查詢。
+
+    每筆撤銷紀錄依令牌的到期時間 (exp) 放入固定寬度的時間桶，桶的結束時間過後整桶刪除：
+    令牌過期後 JWT 本身就會被拒絕，不需要再記得它已撤銷。記憶體用量因此只與
+    「令牌有效期限內被撤銷的數量」成正比。清除採攤提方式，在查詢時最多每個桶寬做一次。
+
+    除了單一令牌，也可撤銷某位使用者在某個時間點之前簽發的所有令牌 (重設密碼、刪除帳號)。
+    """
+
+    def __init__(self, bucket_seconds=60):
+        self.bucket_seconds = bucket_seconds
+        self._lock = threading.Lock()
+        self._jtis = {} # {jti: exp}
+        self._users = {} # {user_id: (revoked_before, exp)}
+        self._buckets = {} # {桶編號: [('jti', jti) 或 ('user', user_id)]}
+        self._next_purge = 0.0
+
+    def _bucket(self, exp):
+        return int(exp // self.bucket_seconds)
+
+    def add(self, jti, exp):
+        with self._lock:
+            if exp <= time.time() or jti in self._jtis:
+                return
+            self._jtis[jti] = exp
+            self._buckets.setdefault(self._bucket(exp), []).append(('jti', jti))
+
+    def add_user(self, user_id, revoked_before, exp):
+        """撤銷 user_id 在 revoked_before (epoch 秒) 之前簽發的令牌，紀錄保留到 exp。"""
+        with self._lock:
+            previous = self._users.get(user_id)
+            if previous and previous[0] >= revoked_before:
+                return
+            self._users[user_id] = (revoked_before, exp)
+            self._buckets.setdefault(self._bucket(exp), []).append(('user', user_id))
+
+    def contains(self, jti, user_id=None, issued_at=None, now=None):
+        now = time.time() if now is None else now
+        if now >= self._next_purge:
+            self.purge(now)
+        if jti in self._jtis:
+            return True
+        if user_id is not None and issued_at is not None:
+            entry = self._users.get(user_id)
+            if entry is not None and issued_at < entry[0]:
+                return True
+        return False
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        current = self._bucket(now)
+        with self._lock:
+            for index in [i for i in self._buckets if i < current]:
+                for kind, key in self._buckets.pop(index):
+                    if kind == 'jti':
+                        exp = self._jtis.get(key)
+                        if exp is not None and exp <= now:
+                            del self._jtis[key]
+                    else:
+                        entry = self._users.get(key)
+                        if entry is not None and entry[1] <= now:
+                            del self._users[key]
+            self._next_purge = (current + 1) * self.bucket_seconds
+
+    def __len__(self):
+        return len(self._jtis) + len(self._users)
+
+    def clear(self):
+        with self._lock:
+            self._jtis.clear()
+            self._users.clear()
+            self._buckets.clear()
+
+
+class MemoryRevocationStore:
+    """
+    只在本行程內生效的撤銷紀錄，僅適用於單一 worker 或開發環境：
+    其他 worker 不會知道撤銷，worker 回收後撤銷清單也會遺失 (gunicorn 多 worker 時拒絕啟動)。
+    """
+
+    def publish(self, kind, key, value, exp, exclusive=False):
+        return True
+
+    def subscribe(self):
+        return lambda callback: None
+
+    def load(self):
+        return []
+
+
+class DatabaseRevocationStore:
+    """
+    以資料庫的 revoked_tokens 資料表在多個 worker / 主機間同步撤銷紀錄 (預設，不需要額外的服務)。
+
+    撤銷時新增一筆紀錄；worker 啟動時載入未過期的紀錄，之後每 sync_interval 秒查詢 id 較大的新紀錄，
+    驗證令牌時只查行程內的撤銷清單，不查資料庫。其他 worker 最多延遲 sync_interval 秒才看到撤銷；
+    refresh 令牌輪替以唯一索引保證同一個令牌只能換發一次，不受延遲影響。
+    AUTO_INCREMENT 的 id 不保證依提交順序出現 (較小的 id 可能較晚提交)，
+    因此每次查詢都往回涵蓋 settle_seconds 秒內看過的 id 範圍，重複套用同一筆紀錄不影響結果。
+    同步執行緒每 sweep_interval 秒分批刪除已過期的紀錄。
+    """
+
+    def __init__(self, app, sync_interval=1.0, settle_seconds=5.0, sweep_interval=300, sweep_batch_size=1000):
+        self.app = app
+        self.sync_interval = sync_interval
+        self.settle_seconds = settle_seconds
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+
+    @staticmethod
+    def _entry(row):
+        if row.kind == 'jti':
+            return {'kind': 'jti', 'key': row.subject, 'value': None, 'exp': row.exp}
+        return {'kind': 'user', 'key': row.subject, 'value': row.revoked_before, 'exp': row.exp}
+
+    def publish(self, kind, key, value, exp, exclusive=False):
+        """
+        寫入撤銷紀錄，回傳是否為第一次撤銷。同一筆紀錄已存在時 exclusive=True 回傳 False，
+        否則視為成功 (例如重複登出)。
+        """
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(db.insert(RevokedToken).values(
+                    kind=kind, subject=str(key), revoked_before=int(value or 0), exp=int(exp)
+                ))
+        except IntegrityError:
+            return not exclusive
+        return True
+
+    def subscribe(self):
+        """記下目前最大的 id 後回傳接收函數；呼叫端在此之後才 load()，期間新增的紀錄不會遺漏。"""
+        with self.app.app_context():
+            start_id = db.session.execute(db.select(db.func.max(RevokedToken.id))).scalar() or 0
+            db.session.remove()
+
+        def listen(callback):
+            # (查詢時間, 當時看過的最大 id)：下限取 settle_seconds 秒之前看過的最大 id
+            seen = collections.deque([(time.monotonic(), start_id)])
+            last_sweep = time.monotonic()
+            with self.app.app_context():
+                while True:
+                    time.sleep(self.sync_interval)
+                    now = time.monotonic()
+                    while len(seen) > 1 and seen[1][0] <= now - self.settle_seconds:
+                        seen.popleft()
+                    entries, max_id = self.fetch_since(seen[0][1])
+                    for entry in entries:
+                        callback(entry)
+                    seen.append((now, max(seen[-1][1], max_id)))
+                    if now - last_sweep >= self.sweep_interval:
+                        self.sweep()
+                        last_sweep = now
+                    db.session.remove()
+        return listen
+
+    def fetch_since(self, after_id):
+        """回傳 id 大於 after_id 的紀錄與其中最大的 id (沒有新紀錄時為 after_id)。"""
+        rows = db.session.execute(
+            db.select(RevokedToken).where(RevokedToken.id > after_id).order_by(RevokedToken.id)
+        ).scalars().all()
+        return [self._entry(row) for row in rows], (rows[-1].id if rows else after_id)
+
+    def load(self):
+        with self.app.app_context():
+            rows = db.session.execute(
+                db.select(RevokedToken).where(RevokedToken.exp > int(time.time()))
+            ).scalars().all()
+            entries = [self._entry(row) for row in rows]
+            db.session.remove()
+        return entries
+
+    def sweep(self, max_batches=100):
+        """分批刪除已過期的紀錄，每批獨立提交。回傳刪除的筆數。"""
+        deleted = 0
+        for _ in range(max_batches):
+            expired_ids = db.session.execute(
+                db.select(RevokedToken.id).where(RevokedToken.exp <= int(time.time())).limit(self.sweep_batch_size)
+            ).scalars().all()
+            if not expired_ids:
+                break
+            db.session.execute(db.delete(RevokedToken).where(RevokedToken.id.in_(expired_ids)))
+            db.session.commit()
+            deleted += len(expired_ids)
+            if len(expired_ids) < self.sweep_batch_size:
+                break
+        return deleted
+
+
+class RedisRevocationStore:
+    """
+    以 Redis 在多個 worker / 主機間同步撤銷紀錄。需要安裝 redis 套件 (pip install redis)。
+
+    撤銷時寫入一個會在令牌到期時自動過期的鍵，並透過 pub/sub 通知其他 worker；
+    worker 啟動時先訂閱頻道，再以 SCAN 載入既有紀錄，之後由背景執行緒接收通知。
+    驗證令牌時只查行程內的撤銷清單，不會對 Redis 發出請求。
+    """
+
+    def __init__(self, url, prefix='napp:revoked:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("JWT_REVOCATION_STORAGE_URL 使用 Redis 時需要安裝 redis 套件")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.channel = f"{prefix}events"
+
+    def publish(self, kind, key, value, exp, exclusive=False):
+        """寫入撤銷紀錄並通知其他 worker；exclusive=True 時以 SET NX 保證同一個鍵只撤銷一次。"""
+        ttl = max(1, int(exp - time.time()))
+        message = json.dumps({'kind': kind, 'key': key, 'value': value, 'exp': exp})
+        redis_key = f"{self.prefix}{kind}:{key}"
+        if exclusive:
+            if not self._redis.set(redis_key, message, ex=ttl, nx=True):
+                return False
+            self._redis.publish(self.channel, message)
+            return True
+        pipe = self._redis.pipeline()
+        pipe.set(redis_key, message, ex=ttl)
+        pipe.publish(self.channel, message)
+        pipe.execute()
+        return True
+
+    def subscribe(self):
+        """先送出 SUBSCRIBE 再回傳接收函數：呼叫端在訂閱之後才 load()，期間發布的通知會留在連線上。"""
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+
+        def listen(callback):
+            for message in pubsub.listen():
+                try:
+                    callback(json.loads(message['data']))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("無法解析撤銷通知", extra={"data": str(message.get('data'))[:200]})
+        return listen
+
+    def load(self):
+        entries = []
+        for redis_key in self._redis.scan_iter(f"{self.prefix}jti:*"):
+            raw = self._redis.get(redis_key)
+            if raw:
+                entries.append(json.loads(raw))
+        for redis_key in self._redis.scan_iter(f"{self.prefix}user:*"):
+            raw = self._redis.get(redis_key)
+            if raw:
+                entries.append(json.loads(raw))
+        return entries
+
+
+def create_revocation_store(app):
+    """依設定建立撤銷紀錄的儲存：JWT_REVOCATION_STORAGE_URL 為 redis://... 時使用 Redis，否則依 JWT_REVOCATION_STORE。"""
+    storage_url = app.config.get('JWT_REVOCATION_STORAGE_URL')
+    if storage_url and storage_url.startswith('redis'):
+        return RedisRevocationStore(storage_url)
+    store = app.config.get('JWT_REVOCATION_STORE', 'database')
+    if store == 'memory':
+        return MemoryRevocationStore()
+    if store == 'database':
+        return DatabaseRevocationStore(app, sync_interval=app.config.get('JWT_REVOCATION_SYNC_INTERVAL', 1.0))
+    raise ValueError(f"未知的 JWT_REVOCATION_STORE：{store}")
+
+
+class TokenRevocation:
+    """
+    JWT 撤銷：登出、更新令牌 (refresh) 輪替，以及重設密碼 / 刪除帳號後讓舊令牌失效。
+    由 JWTManager 的 token_in_blocklist_loader 呼叫 is_revoked()，驗證時不查資料庫。
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.denylist = TimeBucketedDenylist()
+        self.store = MemoryRevocationStore()
+        self.max_lifetime = 86400
+        self.revoked_tokens = 0
+        self.revoked_users = 0
+        self.rejected = 0
+        self._pid = None
+        self._lock = threading.Lock()
+        self._exclusive_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('JWT_REVOCATION_ENABLED', True)
+        self.max_lifetime = max(app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600),
+                                app.config.get('JWT_REFRESH_TOKEN_EXPIRES', 86400))
+        self.denylist = TimeBucketedDenylist(app.config.get('JWT_REVOCATION_BUCKET_SECONDS', 60))
+        self.store = create_revocation_store(app)
+        self._pid = None
+        register_metrics_source('token_revocation', self.stats)
+
+    def _subscribe_and_load(self):
+        """先訂閱再載入既有紀錄 (兩者之間發生的撤銷由訂閱收到)，回傳接收函數；失敗時回傳 None。"""
+        try:
+            listen = self.store.subscribe()
+            for entry in self.store.load():
+                self._apply(entry)
+            return listen
+        except Exception:
+            logger.exception("載入撤銷紀錄失敗")
+            return None
+
+    def _ensure_synced(self):
+        """每個 worker 第一次使用時訂閱並載入既有紀錄，再啟動同步執行緒 (fork 後重新執行)。"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.denylist.clear()
+            listen = self._subscribe_and_load()
+            threading.Thread(target=self._sync, args=(listen,), name='token-revocation-sync', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _sync(self, listen):
+        while True:
+            if listen is not None:
+                try:
+                    listen(self._apply)
+                    return
+                except Exception:
+                    logger.exception("撤銷紀錄同步中斷，5 秒後重新連線")
+            time.sleep(5)
+            # 中斷期間可能漏接通知，重新訂閱後重新載入一次
+            listen = self._subscribe_and_load()
+
+    def _apply(self, entry):
+        if entry['kind'] == 'jti':
+            self.denylist.add(entry['key'], entry['exp'])
+        else:
+            self.denylist.add_user(entry['key'], entry['value'], entry['exp'])
+
+    def revoke_token(self, payload, exclusive=False):
+        """
+        撤銷單一令牌 (已解碼的 JWT payload)，回傳是否由這次呼叫撤銷。
+        exclusive=True 時若令牌已被撤銷 (包括其他 worker 剛撤銷、尚未同步到本行程的) 則回傳 False，
+        用於 refresh 令牌輪替：同一個 refresh 令牌只能換發一次。
+        """
+        self._ensure_synced()
+        if exclusive:
+            # 本行程內的檢查與寫入需一併完成 (MemoryRevocationStore 沒有唯一性保證)
+            with self._exclusive_lock:
+                if self.denylist.contains(payload['jti']):
+                    return False
+                revoked = self.store.publish('jti', payload['jti'], None, payload['exp'], exclusive=True)
+                self.denylist.add(payload['jti'], payload['exp'])
+        else:
+            revoked = self.store.publish('jti', payload['jti'], None, payload['exp'])
+            self.denylist.add(payload['jti'], payload['exp'])
+        if revoked:
+            self.revoked_tokens += 1
+        return revoked
+
+    def revoke_user(self, user_id, revoked_before=None):
+        """撤銷使用者在 revoked_before (預設為現在) 之前簽發的所有令牌。"""
+        self._ensure_synced()
+        # JWT 的 iat 以整數秒表示；撤銷當下同一秒內簽發的令牌 (例如緊接著重新登入) 仍然有效
+        revoked_before = int(revoked_before if revoked_before is not None else time.time())
+        exp = revoked_before + self.max_lifetime
+        # JWT 的 sub 依 PyJWT 版本可能是整數或字串，統一以字串為鍵
+        self.denylist.add_user(str(user_id), revoked_before, exp)
+        self.store.publish('user', str(user_id), revoked_before, exp)
+        self.revoked_users += 1
+
+    def is_revoked(self, payload):
+        if not self.enabled:
+            return False
+        self._ensure_synced()
+        revoked = self.denylist.contains(payload.get('jti'), str(payload.get('sub')), payload.get('iat'))
+        if revoked:
+            self.rejected += 1
+        return revoked
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "store": type(self.store).__name__,
+            "entries": len(self.denylist),
+            "revoked_tokens": self.revoked_tokens,
+            "revoked_users": self.revoked_users,
+            "rejected": self.rejected,
+        }
+
+
+token_revocation = TokenRevocation()
@@ -0,0 +1,71 @@
+# backend/utils/user_export.py
+
+import csv
+import datetime
+import io
+import json
+
+# 匯出時允許輸出的欄位 (刻意不包含 password_hash / reset_token 等敏感欄位)
+EXPORTABLE_COLUMNS = ('id', 'name', 'username', 'email', 'role', 'created_at', 'updated_at')
+
+
+def parse_export_columns(columns_arg):
+    """
+    解析 ?columns=id,username,email 參數，回傳欄位名稱的 tuple。
+    未指定時回傳所有可匯出欄位；包含不支援的欄位時拋出 ValueError。
+    """
+    if not columns_arg:
+        return EXPORTABLE_COLUMNS
+    columns = tuple(dict.fromkeys(c.strip() for c in columns_arg.split(',') if c.strip()))
+    unknown = [c for c in columns if c not in EXPORTABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支援匯出的欄位：{', '.join(unknown)}")
+    if not columns:
+        raise ValueError("請至少指定一個匯出欄位")
+    return columns
+
+
+def _format_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_ndjson(rows, columns, chunk_rows=500):
+    """
+    將資料列轉成 NDJSON (每行一個 JSON 物件)。
+    每累積 chunk_rows 列才 yield 一次，避免產生大量過小的 chunk。
+    """
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(
+            {col: _format_value(value) for col, value in zip(columns, row)},
+            ensure_ascii=False, separators=(',', ':')
+        ))
+        if len(buffer) >= chunk_rows:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def iter_csv(rows, columns, chunk_rows=500):
+    """
+    將資料列轉成 CSV (第一行為欄位名稱)。
+    重複使用同一個 StringIO 緩衝區，記憶體用量只與 chunk_rows 有關。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([_format_value(value) for value in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
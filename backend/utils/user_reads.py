@@ -0,0 +1,76 @@
+# backend/utils/user_reads.py
+
+from collections import namedtuple
+
+from models import User, db
+from utils.hash_executor import hash_executor
+from utils.password_hashing import password_hasher
+from utils.row_serializer import USER_PUBLIC_COLUMNS, user_row_serializer
+
+_VIEW_COLUMNS = user_row_serializer.select_columns
+_CREDENTIAL_COLUMNS = _VIEW_COLUMNS + (User.password_hash,)
+
+
+class UserView(namedtuple('UserView', USER_PUBLIC_COLUMNS)):
+    """
+    唯讀路徑使用的精簡使用者資料 (只包含回應會用到的欄位)。
+
+    由欄位查詢的資料列直接建立，不經過 ORM：不進入 session 的 identity map、
+    沒有屬性 instrumentation，__slots__ = () 也不會為每筆資料建立 __dict__。
+    需要修改資料時請改用 db.session.get(User, id) 取得 ORM 物件。
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        # datetime 保持原樣，由 JSON provider 輸出為 ISO 8601 (與 User.to_dict() 相同)
+        return self._asdict()
+
+
+class UserCredentials(namedtuple('UserCredentials', USER_PUBLIC_COLUMNS + ('password_hash',))):
+    """登入驗證用：公開欄位加上 password_hash，to_dict() 不包含 password_hash。"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in USER_PUBLIC_COLUMNS}
+
+    def verify_password(self, password_plaintext):
+        if not self.password_hash or not password_plaintext:
+            return False
+        return hash_executor.verify(self.password_hash, password_plaintext)
+
+    def password_needs_rehash(self):
+        return bool(self.password_hash) and password_hasher.needs_rehash(self.password_hash)
+
+
+def user_view_query():
+    """只選取公開欄位的查詢，可再加上 where / order_by / limit。"""
+    return db.select(*_VIEW_COLUMNS)
+
+
+def get_user_view(user_id):
+    """依 id 取得 UserView，不存在時回傳 None。"""
+    row = db.session.execute(user_view_query().where(User.id == user_id)).first()
+    return UserView._make(row) if row is not None else None
+
+
+def get_user_views(user_ids):
+    """依 id 列表取得 UserView，依傳入的順序回傳 (不存在的 id 略過)。"""
+    if not user_ids:
+        return []
+    rows = {row.id: row for row in db.session.execute(user_view_query().where(User.id.in_(user_ids)))}
+    return [UserView._make(rows[user_id]) for user_id in user_ids if user_id in rows]
+
+
+def get_user_credentials(username):
+    """依帳號取得 UserCredentials (登入驗證用)，不存在時回傳 None。"""
+    row = db.session.execute(db.select(*_CREDENTIAL_COLUMNS).where(User.username == username)).first()
+    return UserCredentials._make(row) if row is not None else None
+
+
+def update_password_hash(user_id, password_plaintext):
+    """以單一 UPDATE 更新密碼雜湊，不需要先載入 ORM 物件 (updated_at 的 onupdate 一樣會生效)。"""
+    db.session.execute(
+        db.update(User).where(User.id == user_id)
+        .values(password_hash=hash_executor.hash(password_plaintext))
+        .execution_options(synchronize_session=False)
+    )
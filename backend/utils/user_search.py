@@ -0,0 +1,361 @@
+# backend/utils/user_search.py
+
+import bisect
+import datetime
+from array import array
+import logging
+import os
+import threading
+import time
+import unicodedata
+
+from models import User, UserDeletion, db
+from utils.metrics import LatencyStats, register_metrics_source
+from utils.pagination import escape_like
+from utils.row_serializer import user_row_serializer
+
+logger = logging.getLogger(__name__)
+
+# 欄位開頭與資料列結尾的分隔字元；normalize() 會移除所有控制字元，內容中不會出現這兩個字元
+FIELD_SEP = '\x1f'
+RECORD_SEP = '\x1e'
+_STRIP_CONTROL = dict.fromkeys(range(32))
+
+# MySQL ngram parser 的 ngram_token_size (預設 2)；較短的查詢無法使用 FULLTEXT 索引
+MYSQL_NGRAM_TOKEN_SIZE = 2
+
+
+def normalize(text):
+    """NFKC (全形英數轉半形) + casefold (不分大小寫)，並移除控制字元。"""
+    return unicodedata.normalize('NFKC', text or '').casefold().translate(_STRIP_CONTROL)
+
+
+def _record_text(name, username, email):
+    return f"{FIELD_SEP}{normalize(name)}{FIELD_SEP}{normalize(username)}{FIELD_SEP}{normalize(email)}{RECORD_SEP}"
+
+
+class _Block:
+    """
+    一段連續的使用者紀錄 (最多 block_size 筆)。每筆紀錄是「\\x1f姓名\\x1f帳號\\x1fEmail\\x1e」，
+    整段串成一個字串，搜尋時以 str.find (C 實作) 掃描，再以 bisect 由位置找回紀錄。
+    修改時只重新串接這一段；已刪除的紀錄留下長度為 0 的空位，不移動其他紀錄。
+    """
+    __slots__ = ('ids', 'starts', 'haystack')
+
+    def __init__(self, ids=(), texts=()):
+        self.ids = array('i', ids)
+        self.starts = array('i')
+        position = 0
+        for text in texts:
+            self.starts.append(position)
+            position += len(text)
+        self.haystack = ''.join(texts)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _end(self, slot):
+        return self.starts[slot + 1] if slot + 1 < len(self.starts) else len(self.haystack)
+
+    def append(self, user_id, text):
+        self.ids.append(user_id)
+        self.starts.append(len(self.haystack))
+        self.haystack += text
+
+    def replace(self, user_id, text):
+        slot = self.ids.index(user_id)
+        start, end = self.starts[slot], self._end(slot)
+        if self.haystack[start:end] == text:
+            return
+        self.haystack = self.haystack[:start] + text + self.haystack[end:]
+        delta = len(text) - (end - start)
+        for i in range(slot + 1, len(self.starts)):
+            self.starts[i] += delta
+
+    def remove(self, user_id):
+        self.replace(user_id, '')
+        self.ids[self.ids.index(user_id)] = 0 # id 從 1 開始，0 表示空位
+
+    def scan(self, needle, limit, prefix_hits, substring_hits):
+        """
+        任一欄位以 needle 開頭的紀錄加入 prefix_hits，其餘包含 needle 的紀錄加入 substring_hits (各最多 limit 筆)。
+        prefix_hits 達到 limit 時回傳 True，不需要再掃描後面的段落。
+        每次迴圈都會加入一筆結果，Python 層的迴圈最多 2 × limit 次，其餘皆為 str.find 的 C 掃描。
+        """
+        haystack, starts, ids = self.haystack, self.starts, self.ids
+        prefix_needle = FIELD_SEP + needle
+        position = haystack.find(needle)
+        while position != -1:
+            if len(substring_hits) >= limit:
+                # 中間相符的結果已足夠，接下來只需要找欄位開頭相符的紀錄
+                return self._scan_prefix(prefix_needle, position, limit, prefix_hits)
+            slot = bisect.bisect_right(starts, position) - 1
+            end = self._end(slot)
+            # 第一次命中在欄位中間時，同一筆紀錄後面的欄位仍可能以 needle 開頭
+            if haystack[position - 1] == FIELD_SEP or haystack.find(prefix_needle, position, end) != -1:
+                prefix_hits.append(ids[slot])
+                if len(prefix_hits) >= limit:
+                    return True
+            else:
+                substring_hits.append(ids[slot])
+            # 同一筆紀錄只需要命中一次，直接從下一筆開始找
+            position = haystack.find(needle, end)
+        return False
+
+    def _scan_prefix(self, prefix_needle, position, limit, prefix_hits):
+        haystack, starts, ids = self.haystack, self.starts, self.ids
+        position = haystack.find(prefix_needle, position)
+        while position != -1:
+            slot = bisect.bisect_right(starts, position) - 1
+            prefix_hits.append(ids[slot])
+            if len(prefix_hits) >= limit:
+                return True
+            position = haystack.find(prefix_needle, self._end(slot))
+        return False
+
+
+class UserSearchIndex:
+    """
+    行程內的使用者搜尋索引 (姓名、帳號、Email 的子字串比對，不分大小寫與全形 / 半形)。
+
+    以分段的字串掃描取代 n-gram 倒排索引：10 萬名使用者的索引只有數 MB (n-gram 倒排表需要數十 MB)，
+    中文姓名以字元為單位比對，任意長度的查詢都適用。結果依序為「欄位開頭相符」再「欄位中間相符」。
+
+    每個 worker 在第一個請求時於背景執行緒建立索引，建立完成前 search() 回傳 None，由呼叫端改查資料庫。
+    本行程的新增 / 修改 / 刪除會立即更新索引；其他 worker 的修改 (以及批次匯入、批次修改)
+    由背景執行緒每 sync_interval 秒依 updated_at 增量同步，刪除則依 user_deletions 的 deleted_at 增量同步。
+    兩者都是索引上的範圍查詢，不掃描整個 users 資料表。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.sync_interval = 5
+        self.block_size = 512
+        self.deletion_retention = 86400
+        self._blocks = []
+        self._slots = {} # user id -> 所在的 _Block
+        self._ready = False
+        self._watermark = None # 已同步的最大 updated_at
+        self._deletion_watermark = None # 已同步的最大 deleted_at
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.build_seconds = None
+        self.last_sync = None
+        self.search_latency = LatencyStats()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('USER_SEARCH_INDEX_ENABLED', True)
+        self.sync_interval = app.config.get('USER_SEARCH_SYNC_INTERVAL', 5)
+        self.block_size = app.config.get('USER_SEARCH_BLOCK_SIZE', 512)
+        self.deletion_retention = app.config.get('USER_SEARCH_DELETION_RETENTION', 86400)
+        register_metrics_source('user_search', self.stats)
+        if self.enabled:
+            app.before_request(self.ensure_started)
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # fork 之後父行程的索引與執行緒不會延續到子行程，重新建立
+            with self._lock:
+                self._blocks, self._slots, self._ready, self._watermark = [], {}, False, None
+                self._deletion_watermark = None
+            self._stopping.clear()
+            threading.Thread(target=self._run, name='user-search-index', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    # 同步中斷的時間超過刪除紀錄的保留時間時，期間的刪除紀錄可能已被清除，改為重新建立
+                    if self._ready and time.time() - self.last_sync < self.deletion_retention:
+                        self.sync()
+                    else:
+                        self.rebuild()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("同步使用者搜尋索引失敗，索引建立完成前搜尋改查資料庫")
+                finally:
+                    db.session.remove()
+                if self._stopping.wait(self.sync_interval):
+                    break
+
+    def stop(self):
+        self._stopping.set()
+
+    # ---- 建立與同步 (在背景執行緒的 app context 中執行) ----
+
+    def rebuild(self):
+        """由資料庫完整建立索引後再替換，建立期間搜尋仍使用舊的索引 (或改查資料庫)。"""
+        started = time.perf_counter()
+        watermark = db.session.execute(db.select(db.func.max(User.updated_at))).scalar()
+        deletion_watermark = db.session.execute(db.select(db.func.max(UserDeletion.deleted_at))).scalar()
+        blocks, slots = [], {}
+        ids, texts = [], []
+
+        def flush():
+            block = _Block(ids, texts)
+            blocks.append(block)
+            slots.update(dict.fromkeys(ids, block))
+            ids.clear()
+            texts.clear()
+
+        rows = db.session.execute(
+            db.select(User.id, User.name, User.username, User.email).order_by(User.id)
+            .execution_options(yield_per=5000)
+        )
+        for user_id, name, username, email in rows:
+            ids.append(user_id)
+            texts.append(_record_text(name, username, email))
+            if len(ids) >= self.block_size:
+                flush()
+        if ids:
+            flush()
+        with self._lock:
+            self._blocks, self._slots, self._watermark, self._ready = blocks, slots, watermark, True
+            self._deletion_watermark = deletion_watermark
+        self.build_seconds = time.perf_counter() - started
+        self.last_sync = time.time()
+        logger.info("使用者搜尋索引已建立", extra={"users": len(slots), "build_ms": round(self.build_seconds * 1000, 1)})
+        # 建立期間的修改與刪除由下一次同步補上
+        self.sync()
+
+    def sync(self):
+        """依 updated_at 套用其他 worker 的新增 / 修改，再依 deleted_at 移除其他 worker 刪除的使用者。"""
+        query = db.select(User.id, User.name, User.username, User.email, User.updated_at)
+        if self._watermark is not None:
+            # DATETIME 只到秒，同一秒內稍晚的修改需要再讀一次 (upsert 可重複套用)；
+            # 多往前讀一秒，也避免 SQLite 以字串比較 '... 12:00:00' 與 '... 12:00:00.000000' 時漏掉同一秒的資料
+            query = query.where(User.updated_at >= self._watermark - datetime.timedelta(seconds=1))
+        watermark = self._watermark
+        for user_id, name, username, email, updated_at in db.session.execute(query):
+            self.upsert(user_id, name, username, email)
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        self._watermark = watermark
+
+        # 刪除紀錄在使用者查詢之後讀取：同步期間才刪除的使用者即使剛被 upsert，也會在這裡移除
+        query = db.select(UserDeletion.user_id, UserDeletion.deleted_at)
+        if self._deletion_watermark is not None:
+            query = query.where(UserDeletion.deleted_at >= self._deletion_watermark - datetime.timedelta(seconds=1))
+        deletion_watermark = self._deletion_watermark
+        for user_id, deleted_at in db.session.execute(query):
+            self.remove(user_id)
+            if deletion_watermark is None or deleted_at > deletion_watermark:
+                deletion_watermark = deleted_at
+        self._deletion_watermark = deletion_watermark
+
+        if time.time() >= self._next_purge:
+            self.purge_deletions()
+            self._next_purge = time.time() + min(3600, self.deletion_retention)
+        self.last_sync = time.time()
+
+    def purge_deletions(self):
+        """刪除超過保留時間的刪除紀錄；以資料庫時間 (已同步的 deleted_at) 為基準，不受主機時鐘差異影響。"""
+        if self._deletion_watermark is None:
+            return 0
+        cutoff = self._deletion_watermark - datetime.timedelta(seconds=self.deletion_retention)
+        result = db.session.execute(db.delete(UserDeletion).where(UserDeletion.deleted_at < cutoff))
+        db.session.commit()
+        return result.rowcount
+
+    def record_deletions(self, user_ids):
+        """
+        在刪除使用者的交易中寫入刪除紀錄 (由呼叫端 commit)，讓其他 worker 的索引移除這些使用者。
+        索引未啟用時不寫入 (沒有 worker 會讀取)。
+        """
+        if not self.enabled or not user_ids:
+            return
+        db.session.execute(db.insert(UserDeletion), [{'user_id': user_id} for user_id in user_ids])
+
+    # ---- 增量更新 ----
+
+    def upsert(self, user_id, name, username, email):
+        text = _record_text(name, username, email)
+        with self._lock:
+            block = self._slots.get(user_id)
+            if block is not None:
+                block.replace(user_id, text)
+                return
+            if not self._blocks or len(self._blocks[-1]) >= self.block_size:
+                self._blocks.append(_Block())
+            self._blocks[-1].append(user_id, text)
+            self._slots[user_id] = self._blocks[-1]
+
+    def upsert_user(self, user):
+        self.upsert(user.id, user.name, user.username, user.email)
+
+    def remove(self, user_id):
+        with self._lock:
+            block = self._slots.pop(user_id, None)
+            if block is not None:
+                block.remove(user_id) # 空位在下次重建索引 (worker 重啟) 時才會移除
+
+    # ---- 查詢 ----
+
+    def search(self, query, limit):
+        """
+        回傳最多 limit 個相符的使用者 id：先列出任一欄位以 query 開頭的使用者，再列出欄位中間包含 query 的使用者。
+        索引尚未建立完成時回傳 None。
+        """
+        if not self._ready:
+            return None
+        needle = normalize(query)
+        if not needle:
+            return []
+        started = time.perf_counter()
+        prefix_hits, substring_hits = [], []
+        with self._lock:
+            for block in self._blocks:
+                if block.scan(needle, limit, prefix_hits, substring_hits):
+                    break
+        self.search_latency.observe(time.perf_counter() - started)
+        return (prefix_hits + substring_hits)[:limit]
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "ready": self._ready,
+            "users": len(self._slots),
+            "blocks": len(self._blocks),
+            "build_ms": round(self.build_seconds * 1000, 1) if self.build_seconds is not None else None,
+            "seconds_since_sync": round(time.time() - self.last_sync, 1) if self.last_sync else None,
+            "search_latency": self.search_latency.snapshot(),
+        }
+
+
+def search_users_in_database(query, limit):
+    """
+    索引未啟用或尚未建立完成時的資料庫搜尋，回傳公開欄位的資料列。
+    MySQL 使用 ngram parser 的 FULLTEXT 索引 (ft_users_search) 做片語比對；
+    其他資料庫或短於 ngram_token_size 的查詢使用 LIKE '%...%'。
+    """
+    select_columns = user_row_serializer.select_columns
+    if db.engine.dialect.name == 'mysql' and len(query) >= MYSQL_NGRAM_TOKEN_SIZE:
+        phrase = '"' + query.replace('"', ' ') + '"'
+        statement = db.select(*select_columns).where(
+            db.text("MATCH (name, username, email) AGAINST (:phrase IN BOOLEAN MODE)").bindparams(phrase=phrase)
+        ).limit(limit)
+    else:
+        pattern = '%' + escape_like(query) + '%'
+        statement = db.select(*select_columns).where(db.or_(
+            User.name.like(pattern, escape='\\'),
+            User.username.like(pattern, escape='\\'),
+            User.email.like(pattern, escape='\\'),
+        )).order_by(User.id).limit(limit)
+    return db.session.execute(statement).all()
+
+
+user_search_index = UserSearchIndex()
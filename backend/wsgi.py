@@ -0,0 +1,9 @@
+# backend/wsgi.py
+#
+# 正式環境的 WSGI 入口，供 gunicorn 等 WSGI 伺服器載入：
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# 開發時仍可使用 python app.py 或 flask --app app:create_app run
+
+from app import create_app
+
+app = create_app()
@@ -14,10 +14,67 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(255) NOT NULL UNIQUE,
     password_hash VARCHAR(255) NOT NULL, -- 儲存雜湊後的密碼
     role ENUM('admin', 'user') DEFAULT 'user' NOT NULL,
-    reset_token VARCHAR(255) NULL,       -- 密碼重設令牌
-    reset_token_expires DATETIME NULL,    -- 密碼重設令牌過期時間
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_users_created_at_id (created_at, id), -- 使用者列表依建立時間的 keyset 分頁
+    INDEX idx_users_role_id (role, id),             -- 依角色篩選的使用者列表
+    INDEX idx_users_updated_at (updated_at),        -- 條件式 GET 的 MAX(updated_at)
+    FULLTEXT INDEX ft_users_search (name, username, email) WITH PARSER ngram -- 使用者搜尋 (中文以 ngram 切詞)
+);
+
+-- 密碼重設令牌：只儲存令牌的 SHA-256 摘要，以唯一索引做單點查詢
+-- (舊版資料庫 users 表中的 reset_token / reset_token_expires 欄位已不再使用，可自行移除：
+--  ALTER TABLE users DROP COLUMN reset_token, DROP COLUMN reset_token_expires;)
+CREATE TABLE IF NOT EXISTS password_reset_tokens (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    token_hash CHAR(64) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_password_reset_tokens_token_hash (token_hash),
+    INDEX idx_password_reset_tokens_user_id (user_id),
+    INDEX idx_password_reset_tokens_expires_at (expires_at),
+    CONSTRAINT fk_password_reset_tokens_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+
+-- 使用者管理操作的稽核紀錄：只新增不修改，由後端背景執行緒以多列 INSERT 批次寫入
+-- actor_id / target_id 不設外鍵，使用者刪除後紀錄仍保留
+CREATE TABLE IF NOT EXISTS audit_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    created_at DATETIME NOT NULL, -- 事件發生時間
+    actor_id INT NULL,
+    action VARCHAR(64) NOT NULL,
+    target_id INT NULL,
+    ip VARCHAR(45) NULL,
+    changes JSON NULL,
+    INDEX idx_audit_events_target_created_id (target_id, created_at, id), -- 依對象查詢
+    INDEX idx_audit_events_created_id (created_at, id)                    -- 依時間查詢
+);
+
+-- 使用者刪除紀錄：與刪除在同一個交易中寫入，各 worker 的搜尋索引依 deleted_at 增量移除已刪除的使用者
+CREATE TABLE IF NOT EXISTS user_deletions (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL, -- 不設外鍵，使用者已刪除
+    deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_user_deletions_deleted_at (deleted_at)
+);
+
+-- 資料表的版本號：每次寫入 users 時在同一個交易中加 1，使用者列表的 ETag 以此判斷內容是否變動
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT IGNORE INTO table_versions (table_name, version) VALUES ('users', 0);
+
+-- JWT 撤銷紀錄：各 worker 每隔 JWT_REVOCATION_SYNC_INTERVAL 秒讀取新增的紀錄，過期 (exp) 後分批刪除
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(8) NOT NULL,                -- 'jti' 或 'user'
+    subject VARCHAR(64) NOT NULL,            -- jti 或使用者 id
+    revoked_before BIGINT NOT NULL DEFAULT 0, -- 撤銷此時間 (epoch 秒) 之前簽發的令牌；單一令牌為 0
+    exp BIGINT NOT NULL,                      -- 紀錄可刪除的時間 (epoch 秒)
+    UNIQUE KEY uq_revoked_tokens_kind_subject (kind, subject, revoked_before),
+    INDEX ix_revoked_tokens_exp (exp)
 );
 
 -- 注意：預設管理員帳號 (admin / admin123) 的插入邏輯已在 Python 後端 app.py 中處理。
@@ -16,6 +16,7 @@ class _UserManagementScreenState extends State<UserManagementScreen> {
   List<User> _users = []; // 用於儲存使用者列表
   bool _isLoading = false; // 載入狀態
   String? _errorMessage; // 錯誤訊息
+  static const int _pageSize = 500; // 每頁筆數 (後端上限為 USERS_PAGE_SIZE_MAX)
 
   @override
   void initState() {
@@ -30,14 +31,28 @@ class _UserManagementScreenState extends State<UserManagementScreen> {
       _errorMessage = null;
     });
     try {
-      final response = await ApiService.get('users'); // 呼叫 API 獲取使用者列表
+      // 使用者列表以游標分頁 (每頁最多 _pageSize 筆)，依 next_cursor 逐頁取回全部使用者
+      final List<User> users = [];
+      bool validResponse = true;
+      String? cursor;
+      do {
+        final endpoint = cursor == null
+            ? 'users/?limit=$_pageSize'
+            : 'users/?limit=$_pageSize&cursor=${Uri.encodeQueryComponent(cursor)}';
+        final response = await ApiService.get(endpoint); // 呼叫 API 獲取一頁使用者列表
+        // 解析回應為 User 列表, 確保 response['users'] 是列表且元素是 Map
+        if (response['users'] is! List) {
+          validResponse = false;
+          break;
+        }
+        users.addAll((response['users'] as List)
+            .map((json) => User.fromJson(json as Map<String, dynamic>)));
+        cursor = response['has_more'] == true ? response['next_cursor'] as String? : null;
+      } while (cursor != null);
       if (mounted) { // 異步操作後檢查 widget 是否還在樹中
         setState(() {
-          // 解析回應為 User 列表, 確保 response['users'] 是列表且元素是 Map
-          if (response != null && response['users'] is List) {
-            _users = (response['users'] as List)
-                .map((json) => User.fromJson(json as Map<String, dynamic>))
-                .toList();
+          if (validResponse) {
+            _users = users;
           } else {
             _users = []; // 如果回應格式不對或沒有使用者資料，則清空
              _errorMessage = '無法獲取使用者資料或格式不正確';